@@ -0,0 +1,49 @@
+"""מדידת חיסכון הזיכרון של CompactHistory מול טבלת pandas רגילה.
+
+הרצה: python -m benchmarks.bench_compact_storage --symbols 3000 --years 10
+"""
+import argparse
+import time
+from src.analyzers.indicator_frame import IndicatorFrame
+from src.utils.compact_history import CompactHistory
+from tests.conftest import synthetic_history
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--symbols', type=int, default=3000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--sample', type=int, default=20, help='מספר המניות שנמדדות בפועל')
+    args = parser.parse_args()
+
+    n_bars = args.years * TRADING_DAYS_PER_YEAR
+    frame_bytes = compact_bytes = 0
+    to_compact_time = to_frame_time = 0.0
+
+    for seed in range(args.sample):
+        hist = synthetic_history(n_bars, seed)
+        full = hist.join(IndicatorFrame(hist).to_frame())
+        frame_bytes += full.memory_usage(deep=True).sum()
+
+        start = time.perf_counter()
+        compact = CompactHistory.from_frame(full.drop(columns=['Dividends', 'Stock Splits']))
+        to_compact_time += time.perf_counter() - start
+        compact_bytes += compact.nbytes
+
+        start = time.perf_counter()
+        compact.to_frame()
+        to_frame_time += time.perf_counter() - start
+
+    scale = args.symbols / args.sample
+    print(f"universe: {args.symbols} symbols x {n_bars} bars, {compact.indicators.shape[1]} indicators")
+    print(f"pandas float64 : {frame_bytes * scale / 2 ** 20:10.1f} MiB")
+    print(f"compact        : {compact_bytes * scale / 2 ** 20:10.1f} MiB")
+    print(f"saving         : {1 - compact_bytes / frame_bytes:10.1%}")
+    print(f"from_frame     : {to_compact_time / args.sample * 1e3:10.2f} ms/symbol")
+    print(f"to_frame       : {to_frame_time / args.sample * 1e3:10.2f} ms/symbol")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""השוואת המנוע המאוחד לחישוב האינדיקטורים עמודה-עמודה.
+
+הרצה: python -m benchmarks.bench_indicators --bars 500 2520 --repeat 20
+"""
+import argparse
+import time
+import numpy as np
+from src.analyzers.indicator_engine import compute_indicator_frame, FUSED_COLUMNS
+from src.analyzers.indicator_frame import IndicatorFrame
+from tests.conftest import synthetic_history
+
+
+def best_time(func, repeat: int) -> float:
+    """הזמן הטוב ביותר מתוך כמה הרצות"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bars', type=int, nargs='+', default=[500, 2520])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for n_bars in args.bars:
+        hist = synthetic_history(n_bars, seed=n_bars)
+
+        separate = best_time(lambda: IndicatorFrame(hist).to_frame(FUSED_COLUMNS), args.repeat)
+        fused = best_time(lambda: compute_indicator_frame(hist), args.repeat)
+
+        expected = IndicatorFrame(hist).to_frame(FUSED_COLUMNS).to_numpy()
+        actual = compute_indicator_frame(hist).to_numpy()
+        max_error = np.nanmax(np.abs(expected - actual) / np.maximum(1, np.abs(expected)))
+
+        print(f"{n_bars:6d} bars: separate {separate * 1e3:7.2f} ms | fused {fused * 1e3:7.2f} ms | "
+              f"speedup {separate / fused:5.1f}x | max rel. error {max_error:.1e}")
+
+
+if __name__ == '__main__':
+    main()
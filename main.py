@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from src.gui.main_window import MainWindow
+from src.analyzers.walk_forward import load_tuned_settings
 import logging
 from pathlib import Path
 from datetime import datetime
@@ -38,6 +39,9 @@ def main():
         logger = logging.getLogger(__name__)
         logger.info("Starting Stock Analyzer Application")
 
+        # פרמטרי ציון מכוונים מאופטימיזציית walk-forward, אם קיימים
+        load_tuned_settings()
+
         # יצירת חלון ראשי
         root = tk.Tk()
         root.title("מנתח המניות המתקדם")
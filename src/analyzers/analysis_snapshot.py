@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+
+def freeze(value: Any) -> Any:
+    """המרה רקורסיבית למבנים לקריאה בלבד"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """העתקה רקורסיבית חזרה ל-dict/list רגילים, עבור מי שצורך את התוצאה"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class AnalysisSnapshot:
+    """תמונת מצב של הניתוח - נבנית פעם אחת לכל גרסת נתונים ולא משתנה"""
+    symbol: str
+    fingerprint: tuple
+    created_at: datetime
+    last_close: float
+    indicators: Mapping[str, Optional[float]]
+    sentiment: Mapping[str, str]
+    risk_metrics: Mapping[str, float]
+    score: Mapping[str, Any]
+
+    @classmethod
+    def create(cls, symbol: str, fingerprint: tuple, last_close: float, indicators: dict,
+               sentiment: dict, risk_metrics: dict, score: dict) -> 'AnalysisSnapshot':
+        """יצירת תמונת מצב מתוצאות רגילות"""
+        return cls(
+            symbol=symbol,
+            fingerprint=fingerprint,
+            created_at=datetime.now(),
+            last_close=float(last_close),
+            indicators=freeze(indicators),
+            sentiment=freeze(sentiment),
+            risk_metrics=freeze(risk_metrics),
+            score=freeze(score)
+        )
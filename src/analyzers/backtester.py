@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from .indicator_engine import compute_indicator_frame
+from .risk_engine import TRADING_DAYS_PER_YEAR
+from ..config.settings import ANALYSIS_SETTINGS
+
+RECOMMENDATIONS = ["קנייה חזקה", "קנייה", "מכירה", "מכירה חלשה", "החזק"]
+BUY_SIGNALS = ["קנייה חזקה", "קנייה"]
+SELL_SIGNALS = ["מכירה", "מכירה חלשה"]
+
+
+def score_components(bars: pd.DataFrame, indicators: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """ציוני הרכיבים של calculate_final_score לכל נר, במעבר וקטורי אחד.
+
+    כל כלל זהה לחישוב על הנר האחרון; ערך חסר נותן 0 נקודות כמו ב-np.isnan שם.
+    """
+    if indicators is None:
+        indicators = compute_indicator_frame(bars)
+    close = bars['Close']
+    volume = bars['Volume']
+    rsi = indicators['RSI']
+    macd_bullish = indicators['MACD'] > indicators['MACD_Signal']
+    adx = indicators['ADX']
+    strong_trend = adx > 25
+
+    # טכני: RSI, MACD, רצועות Bollinger ומגמה
+    technical = (np.select([rsi.between(40, 60), rsi.between(30, 70), rsi.notna()], [5, 3, 1], 0)
+                 + np.where(macd_bullish, 10, 0)
+                 + np.where((indicators['BBANDS_Lower'] < close) & (close < indicators['BBANDS_Upper']), 5, 0)
+                 + np.where(strong_trend,
+                            np.where(indicators['AROON_Up'] > indicators['AROON_Down'], 10, -10), 0))
+
+    # מומנטום: נפח 5/20 ומגמת מחיר ביחס לנר שלפני 19 נרות (iloc[-20])
+    volume_trend = volume.rolling(5, min_periods=1).mean() / volume.rolling(20, min_periods=1).mean() - 1
+    price_trend = (close / close.shift(19) - 1) * 100
+    momentum = np.where(volume_trend > 0.1, 10, 0) + np.select([price_trend > 2, price_trend > 0], [15, 7], 0)
+
+    # מתקדם: עוצמת ADX ומגמת OBV
+    advanced = np.select([strong_trend, adx > 20], [15, 7], 0) + \
+        np.where(indicators['OBV'] > indicators['OBV'].shift(4), 10, 0)
+
+    # סנטימנט: כמו _compute_sentiment - RSI חסר נחשב ניטרלי
+    sentiment_volume = volume.rolling(10, min_periods=1).mean() / volume.rolling(30, min_periods=1).mean() - 1
+    sentiment = (np.where(~((rsi < 30) | (rsi > 70)), 7, 0)
+                 + np.where(macd_bullish, 7, 0)
+                 + np.where(sentiment_volume > 0.1, 6, 0))
+
+    return pd.DataFrame({
+        'technical': technical / 30,
+        'momentum': momentum / 25,
+        'advanced': advanced / 25,
+        'sentiment': sentiment / 20
+    }, index=bars.index)
+
+
+def final_scores(components: pd.DataFrame, weights: Optional[Dict[str, float]] = None) -> pd.Series:
+    """שקלול הרכיבים לציון סופי"""
+    weights = weights or ANALYSIS_SETTINGS['scoring']['weights']
+    return components[list(weights)] @ pd.Series(weights)
+
+
+def recommendations(scores: pd.Series, thresholds: Optional[Dict[str, float]] = None) -> pd.Series:
+    """המלצה לכל נר לפי ספי הציון - באותו סדר עדיפויות כמו calculate_final_score"""
+    thresholds = thresholds or ANALYSIS_SETTINGS['scoring']['thresholds']
+    values = scores.to_numpy()
+    labels = np.select([values > thresholds['strong_buy'], values > thresholds['buy'],
+                        values < thresholds['sell'], values < thresholds['weak_sell']],
+                       RECOMMENDATIONS[:4], RECOMMENDATIONS[4])
+    return pd.Series(pd.Categorical(labels, categories=RECOMMENDATIONS), index=scores.index)
+
+
+@dataclass
+class BacktestResult:
+    """תוצאת בק-טסט למניה אחת"""
+    frame: pd.DataFrame               # ציון, המלצה, פוזיציה, תשואות ושווי לכל נר
+    stats: Dict[str, float] = field(default_factory=dict)
+
+
+def run_backtest(bars: pd.DataFrame, indicators: Optional[pd.DataFrame] = None,
+                 components: Optional[pd.DataFrame] = None, weights: Optional[Dict[str, float]] = None,
+                 thresholds: Optional[Dict[str, float]] = None, cost_bps: Optional[float] = None,
+                 slippage_bps: Optional[float] = None, allow_short: Optional[bool] = None) -> BacktestResult:
+    """סימולציית מסחר על ההמלצות ההיסטוריות.
+
+    ההחלטה מתקבלת בסגירת נר t ומוחזקת מנר t + 1, כך שאין שימוש במידע עתידי.
+    "החזק" משאיר את הפוזיציה הקודמת. עמלה והחלקה נגבות על כל שינוי בפוזיציה.
+    """
+    settings = ANALYSIS_SETTINGS['backtest']
+    cost_bps = settings['cost_bps'] if cost_bps is None else cost_bps
+    slippage_bps = settings['slippage_bps'] if slippage_bps is None else slippage_bps
+    allow_short = settings['allow_short'] if allow_short is None else allow_short
+
+    if components is None:
+        components = score_components(bars, indicators)
+    score = final_scores(components, weights)
+    signal = recommendations(score, thresholds)
+
+    buy = signal.isin(BUY_SIGNALS).to_numpy()
+    sell = signal.isin(SELL_SIGNALS).to_numpy()
+    target = pd.Series(np.where(buy, 1.0, np.where(sell, -1.0 if allow_short else 0.0, np.nan)),
+                       index=bars.index).ffill().fillna(0.0)
+
+    position = target.shift(1).fillna(0.0)
+    turnover = position.diff().abs().fillna(position.abs())
+    asset_returns = bars['Close'].pct_change(fill_method=None).fillna(0.0)
+    returns = position * asset_returns - turnover * (cost_bps + slippage_bps) / 10000
+    equity = (1 + returns).cumprod()
+
+    frame = pd.DataFrame({
+        'score': score,
+        'recommendation': signal,
+        'position': position,
+        'returns': returns,
+        'equity': equity
+    })
+    return BacktestResult(frame=frame, stats=_backtest_stats(position.to_numpy(), returns.to_numpy(),
+                                                             equity.to_numpy(), asset_returns.to_numpy()))
+
+
+def _backtest_stats(position: np.ndarray, returns: np.ndarray, equity: np.ndarray,
+                    asset_returns: np.ndarray) -> Dict[str, float]:
+    """תשואה, שארפ, דרודאון ואחוז עסקאות מרוויחות"""
+    n = len(returns)
+    if n == 0:
+        return {}
+
+    # עסקה = רצף נרות עם אותה פוזיציה שאינה אפס; התשואה שלה היא מכפלת התשואות ברצף
+    changes = np.flatnonzero(np.diff(position, prepend=0.0) != 0)
+    starts = changes[position[changes] != 0]
+    ends = np.append(changes, n)[np.searchsorted(changes, starts, side='right')]
+    log_growth = np.concatenate([[0.0], np.cumsum(np.log1p(returns))])
+    trade_returns = np.expm1(log_growth[ends] - log_growth[starts])
+
+    std = returns.std(ddof=1) if n > 1 else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.sqrt(TRADING_DAYS_PER_YEAR) * returns.mean() / std
+
+    return {
+        'total_return': float(equity[-1] - 1),
+        'annual_return': float(equity[-1] ** (TRADING_DAYS_PER_YEAR / n) - 1),
+        'buy_and_hold': float(np.prod(1 + asset_returns) - 1),
+        'sharpe': float(sharpe),
+        'max_drawdown': float((equity / np.maximum.accumulate(equity) - 1).min()),
+        'trades': int(len(trade_returns)),
+        'hit_rate': float((trade_returns > 0).mean()) if len(trade_returns) else np.nan,
+        'exposure': float((position != 0).mean())
+    }
+
+
+def backtest_universe(histories: Dict[str, pd.DataFrame], **kwargs) -> pd.DataFrame:
+    """בק-טסט לכל המניות - שורה של סטטיסטיקות לכל מניה"""
+    rows = {symbol: run_backtest(bars, **kwargs).stats for symbol, bars in histories.items() if len(bars)}
+    return pd.DataFrame.from_dict(rows, orient='index')
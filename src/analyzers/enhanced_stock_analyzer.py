@@ -10,6 +10,20 @@ import logging
 from pathlib import Path
 from datetime import datetime, timedelta
 from .technical_indicators import TechnicalIndicators
+from .indicator_frame import IndicatorFrame
+from .analysis_snapshot import AnalysisSnapshot, thaw
+from .risk_engine import RiskEngine, rolling_risk, trading_days
+from .price_simulator import SimulationResult, simulate_prices
+from .backtester import BacktestResult, run_backtest
+from .pattern_detection import (PivotIndex, build_pivot_index, find_double_bottoms, find_breakout_runs,
+                                find_price_levels, find_head_shoulders, find_double_tops,
+                                find_triangles_channels)
+from ..config.settings import ANALYSIS_SETTINGS
+from ..utils.result_cache import memoize_on_bars, data_fingerprint
+from ..utils.compact_history import CompactHistory, PRICE_COLUMNS
+from ..utils.financial_store import FinancialStatementsStore, get_financial_store
+from .fundamental_analyzer import FundamentalIndicators, get_sector_distributions
+from .sector_index import SectorIndex, get_sector_index
 
 
 @dataclass
@@ -34,6 +48,31 @@ class TechnicalPattern:
     description: str
 
 
+def fundamental_values(metrics: pd.Series) -> Dict[str, float]:
+    """שורה מחתך מדדי היסוד כמילון בלי ערכים חסרים; הציון הכולל נקרא fundamental_score"""
+    metrics = metrics.rename({'overall_score': 'fundamental_score'})
+    return {name: float(value) for name, value in metrics.items() if not np.isnan(value)}
+
+
+def scoring_version() -> tuple:
+    """גרסת הגדרות הציון - משתנה כש-load_tuned_settings מעדכן משקולות או ספים בתהליך רץ"""
+    scoring = ANALYSIS_SETTINGS['scoring']
+    return tuple(sorted(scoring['weights'].items())), tuple(sorted(scoring['thresholds'].items()))
+
+
+PATTERN_DESCRIPTIONS = {
+    "Head and Shoulders": "תבנית ראש וכתפיים - היפוך מגמה כלפי מטה",
+    "Inverse Head and Shoulders": "תבנית ראש וכתפיים הפוכה - היפוך מגמה כלפי מעלה",
+    "Double Top": "תבנית Double Top - התנגדות כפולה",
+    "Ascending Triangle": "משולש עולה",
+    "Descending Triangle": "משולש יורד",
+    "Symmetrical Triangle": "משולש סימטרי",
+    "Rising Channel": "תעלה עולה",
+    "Falling Channel": "תעלה יורדת",
+    "Horizontal Channel": "תעלה אופקית",
+}
+
+
 class EnhancedStockAnalyzer:
     def __init__(self, symbol: str, market_index: str = "^TA125.TA", risk_free_rate: float = 0.04):
         """אתחול המנתח"""
@@ -73,11 +112,53 @@ class EnhancedStockAnalyzer:
         self.support_resistance_levels = {"support": [], "resistance": []}
         self.sector_comparison = {}
         self.price_predictions = {}
+        self.price_simulation: Optional[SimulationResult] = None
 
         # נתונים היסטוריים
+        self._indicators: Optional[IndicatorFrame] = None
+        self._pivots = None
+        self._snapshot: Optional[AnalysisSnapshot] = None
         self.hist = None
         self.market_hist = None
         self.sector_data = None
+        self.financial_statements: Dict[str, pd.DataFrame] = {}
+        self.fundamental_metrics: Dict[str, float] = {}
+
+    @property
+    def hist(self) -> Optional[pd.DataFrame]:
+        """נתוני המחירים ההיסטוריים"""
+        return self._hist
+
+    @hist.setter
+    def hist(self, value: Optional[pd.DataFrame]):
+        """החלפת נתוני המחירים מבטלת את האינדיקטורים שחושבו עליהם"""
+        self._hist = value
+        self._indicators = None
+        self._snapshot = None
+
+    @property
+    def indicators(self) -> IndicatorFrame:
+        """אינדיקטורים טכניים עצלים - מחושבים רק בגישה"""
+        if self._hist is None:
+            raise ValueError("No historical data available")
+
+        if self._indicators is None or self._indicators.is_stale(self._hist):
+            self._indicators = IndicatorFrame(self._hist)
+        return self._indicators
+
+    def to_compact(self, include_indicators: bool = True) -> CompactHistory:
+        """ייצוא ההיסטוריה לייצוג דחוס (float32/int32) לאחסון של יקום מניות גדול"""
+        if self.hist is None:
+            raise ValueError("No historical data available")
+
+        frame = self.hist[PRICE_COLUMNS + ['Volume']]
+        if include_indicators:
+            frame = frame.join(self.indicators.to_frame())
+        return CompactHistory.from_frame(frame)
+
+    def load_compact(self, compact: CompactHistory):
+        """טעינת היסטוריה מייצוג דחוס - האינדיקטורים יחושבו מחדש בדיוק מלא"""
+        self.hist = compact.to_frame(include_indicators=False)
 
     async def fetch_all_data(self):
         """משיכת כל הנתונים הנדרשים"""
@@ -118,23 +199,63 @@ class EnhancedStockAnalyzer:
     async def fetch_sector_data(self):
         """משיכת נתוני הסקטור"""
         try:
-            stock = yf.Ticker(self.symbol)
-            sector = stock.info.get('sector')
-            if sector:
-                # TODO: להוסיף לוגיקה למשיכת נתוני סקטור
-                pass
+            # מדדי הסקטורים נבנים מהיסטוריות היקום - הרשת נדרשת רק לסקטור של מניה לא מוכרת
+            index = get_sector_index()
+            if not self.apply_sector_index(index):
+                self.apply_sector_index(index, yf.Ticker(self.symbol).info.get('sector'))
         except Exception as e:
             self.logger.error(f"Error fetching sector data: {str(e)}")
 
+    def apply_sector_index(self, index: SectorIndex, sector: Optional[str] = None) -> bool:
+        """מדד הסקטור וההשוואה אליו, בלי גישה לרשת; ברירת המחדל היא השיוך השמור במדדים"""
+        sector = sector or index.sectors.get(self.symbol)
+        if not sector:
+            return False
+        self.sector_data = index.index(sector)
+        if self.hist is not None:
+            self.sector_comparison = index.compare(self.hist, sector)
+        return True
+
     async def fetch_financial_statements(self):
         """משיכת דוחות כספיים"""
         try:
-            stock = yf.Ticker(self.symbol)
-            # TODO: להוסיף ניתוח דוחות כספיים
-            pass
+            # המאגר המקומי ניגש לרשת רק כשצפויה תקופה חדשה
+            store = get_financial_store()
+            self.financial_statements = {
+                frequency: await asyncio.to_thread(store.update, self.symbol, frequency)
+                for frequency in ('quarterly', 'annual')
+            }
+
+            self.calculate_fundamental_metrics(store)
         except Exception as e:
             self.logger.error(f"Error fetching financial statements: {str(e)}")
 
+    def calculate_fundamental_metrics(self, store: Optional[FinancialStatementsStore] = None) -> Dict[str, float]:
+        """מדדי היסוד מהדוחות השמורים ומהסגירה האחרונה - בלי גישה לרשת.
+
+        הציון לפי סקטור מחושב מול ההתפלגויות השמורות של היקום (חיפוש בינארי), לא מול המניה עצמה.
+        """
+        if self.hist is None or len(self.hist) == 0:
+            return {}
+        store = store or get_financial_store()
+        inputs = store.fundamental_inputs({self.symbol: float(self.hist['Close'].iloc[-1])})
+        sectors = pd.Series({self.symbol: get_sector_index().sectors.get(self.symbol)}, dtype=object)
+        metrics = FundamentalIndicators.analyze_cross_section(inputs, sectors, get_sector_distributions())
+        self.fundamental_metrics = fundamental_values(metrics.iloc[0])
+        return self.fundamental_metrics
+
+    @property
+    def pivots(self) -> Optional[PivotIndex]:
+        """אינדקס נקודות מפנה משותף - נבנה פעם אחת לכל גרסת נתונים"""
+        if self.hist is None:
+            return None
+
+        fingerprint = data_fingerprint(self.hist)
+        if self._pivots is None or self._pivots[0] != fingerprint:
+            self._pivots = (fingerprint, build_pivot_index(self.hist['High'].to_numpy(),
+                                                           self.hist['Low'].to_numpy()))
+        return self._pivots[1]
+
     def identify_technical_patterns(self):
         """זיהוי תבניות טכניות"""
         patterns = []
@@ -142,15 +263,17 @@ class EnhancedStockAnalyzer:
             return patterns
 
         try:
+            # כל התבניות נקראות מאותו אינדקס נקודות מפנה
+            pivots = self.pivots
+
             # Double Bottom
-            double_bottom = self.find_double_bottom()
-            if double_bottom:
-                patterns.append(double_bottom)
+            patterns.extend(self.find_double_bottom(pivots))
 
             # Head and Shoulders
-            head_shoulders = self.find_head_shoulders()
-            if head_shoulders:
-                patterns.append(head_shoulders)
+            patterns.extend(self.find_head_shoulders(pivots))
+
+            # Double Top, משולשים ותעלות
+            patterns.extend(self.find_chart_patterns(pivots))
 
             # Breakouts
             breakouts = self.find_breakouts()
@@ -163,101 +286,119 @@ class EnhancedStockAnalyzer:
 
         return patterns
 
-    def find_double_bottom(self) -> Optional[TechnicalPattern]:
-        """זיהוי תבנית Double Bottom"""
+    def find_double_bottom(self, pivots: Optional[PivotIndex] = None) -> List[TechnicalPattern]:
+        """זיהוי כל תבניות ה-Double Bottom"""
         if self.hist is None or len(self.hist) < 40:
-            return None
+            return []
 
+        patterns = []
         try:
-            prices = self.hist['Low'].values
-            for i in range(20, len(prices) - 20):
-                # בדיקת מינימום מקומי
-                if (prices[i] < prices[i - 1] and prices[i] < prices[i + 1] and
-                        prices[i] < prices[i - 10:i].min() and
-                        prices[i] < prices[i + 1:i + 11].min()):
-
-                    # חיפוש מינימום שני דומה
-                    for j in range(i + 10, len(prices) - 10):
-                        if (abs(prices[i] - prices[j]) / prices[i] < 0.02 and
-                                prices[j] < prices[j - 1] and prices[j] < prices[j + 1]):
-                            return TechnicalPattern(
-                                pattern_type="Double Bottom",
-                                start_date=self.hist.index[i],
-                                end_date=self.hist.index[j],
-                                confidence=0.8,
-                                description="נמצאה תבנית Double Bottom"
-                            )
+            pivots = pivots or self.pivots
+            tolerance = 0.02
+            order = 10
+            minima, _ = pivots.extrema(order)
+            for first, second, difference in find_double_bottoms(pivots.lows, pivots.highs, order=order,
+                                                                 tolerance=tolerance, minima=minima):
+                patterns.append(TechnicalPattern(
+                    pattern_type="Double Bottom",
+                    start_date=self.hist.index[first],
+                    end_date=self.hist.index[second],
+                    confidence=0.6 + 0.2 * (1 - difference / tolerance),
+                    description=f"נמצאה תבנית Double Bottom ברמת {pivots.lows[first]:.2f}"
+                ))
         except Exception as e:
             self.logger.error(f"Error in double bottom detection: {str(e)}")
 
-        return None
+        return patterns
+
+    def find_head_shoulders(self, pivots: Optional[PivotIndex] = None) -> List[TechnicalPattern]:
+        """זיהוי תבנית Head and Shoulders (רגילה והפוכה)"""
+        if self.hist is None:
+            return []
+
+        try:
+            return self._pivot_patterns(find_head_shoulders(pivots or self.pivots))
+        except Exception as e:
+            self.logger.error(f"Error in head and shoulders detection: {str(e)}")
+            return []
 
-    def find_head_shoulders(self) -> Optional[TechnicalPattern]:
-        """זיהוי תבנית Head and Shoulders"""
-        # TODO: להוסיף לוגיקה לזיהוי תבנית
-        return None
+    def find_chart_patterns(self, pivots: Optional[PivotIndex] = None) -> List[TechnicalPattern]:
+        """זיהוי Double Top, משולשים ותעלות"""
+        if self.hist is None:
+            return []
+
+        try:
+            pivots = pivots or self.pivots
+            return self._pivot_patterns(find_double_tops(pivots) + find_triangles_channels(pivots))
+        except Exception as e:
+            self.logger.error(f"Error in chart pattern detection: {str(e)}")
+            return []
+
+    def _pivot_patterns(self, matches) -> List[TechnicalPattern]:
+        """המרת תוצאות הזיהוי לאובייקטי TechnicalPattern"""
+        return [
+            TechnicalPattern(
+                pattern_type=pattern_type,
+                start_date=self.hist.index[start],
+                end_date=self.hist.index[end],
+                confidence=confidence,
+                description=PATTERN_DESCRIPTIONS.get(pattern_type, pattern_type)
+            )
+            for pattern_type, start, end, confidence in matches
+        ]
 
     def find_breakouts(self) -> List[TechnicalPattern]:
-        """זיהוי פריצות"""
+        """זיהוי פריצות - נרות פריצה רצופים מאוחדים לאירוע אחד"""
         breakouts = []
         if self.hist is None:
             return breakouts
 
         try:
-            closes = self.hist['Close']
-            volumes = self.hist['Volume']
-
-            # חישוב ממוצע נע
-            ma20 = closes.rolling(window=20).mean()
-            vol_ma20 = volumes.rolling(window=20).mean()
-
-            # חיפוש פריצות
-            for i in range(20, len(closes)):
-                if (closes[i] > ma20[i] * 1.02 and  # פריצה של 2% מעל הממוצע
-                        volumes[i] > vol_ma20[i] * 1.5):  # נפח מסחר גבוה
-
-                    breakouts.append(TechnicalPattern(
-                        pattern_type="Breakout",
-                        start_date=closes.index[i - 1],
-                        end_date=closes.index[i],
-                        confidence=0.7,
-                        description="פריצה כלפי מעלה בנפח מסחר גבוה"
-                    ))
+            dates = self.hist.index
+            _, starts, ends = find_breakout_runs(self.hist['Close'].to_numpy(),
+                                                 self.hist['Volume'].to_numpy())
+
+            for start, end in zip(starts, ends):
+                breakouts.append(TechnicalPattern(
+                    pattern_type="Breakout",
+                    start_date=dates[start],
+                    end_date=dates[end],
+                    confidence=0.7,
+                    description=f"פריצה כלפי מעלה בנפח מסחר גבוה ({end - start + 1} ימים)"
+                ))
         except Exception as e:
             self.logger.error(f"Error finding breakouts: {str(e)}")
 
         return breakouts
 
-    def find_support_resistance(self):
+    def find_support_resistance(self, max_levels: int = 5):
         """מציאת רמות תמיכה והתנגדות"""
         if self.hist is None:
-            return
+            return self.support_resistance_levels
 
         try:
-            prices = self.hist['Close'].values
-            window = 20
-
-            for i in range(window, len(prices)):
-                window_prices = prices[i - window:i]
-                local_min = np.min(window_prices)
-                local_max = np.max(window_prices)
-
-                # בדיקת רמות תמיכה
-                if prices[i] == local_min:
-                    self.support_resistance_levels["support"].append({
-                        "price": prices[i],
-                        "date": self.hist.index[i]
-                    })
+            levels = {"support": [], "resistance": []}
+            last_close = self.hist['Close'].iloc[-1]
 
-                # בדיקת רמות התנגדות
-                if prices[i] == local_max:
-                    self.support_resistance_levels["resistance"].append({
-                        "price": prices[i],
-                        "date": self.hist.index[i]
+            prices, touches, strength, last_touch = find_price_levels(self.hist['High'].to_numpy(),
+                                                                      self.hist['Low'].to_numpy())
+            for price, count, level_strength, last in zip(prices, touches, strength, last_touch):
+                side = "support" if price < last_close else "resistance"
+                if len(levels[side]) < max_levels:
+                    levels[side].append({
+                        "price": float(price),
+                        "touches": int(count),
+                        "strength": float(level_strength),
+                        "date": self.hist.index[last].isoformat()
                     })
+
+            # החלפה ולא הוספה - קריאה חוזרת מחזירה את אותן רמות
+            self.support_resistance_levels = levels
         except Exception as e:
             self.logger.error(f"Error finding support/resistance: {str(e)}")
 
+        return self.support_resistance_levels
+
     def predict_prices(self):
         """חיזוי מחירים עתידיים"""
         if self.hist is None:
@@ -271,16 +412,21 @@ class EnhancedStockAnalyzer:
             # חישוב תנודתיות
             self.hist['Volatility'] = self.hist['Close'].rolling(window=20).std()
 
-            # חיזוי בסיסי למחר
-            last_price = self.hist['Close'].iloc[-1]
-            volatility = self.hist['Volatility'].iloc[-1]
+            # התפלגות מחירים עתידית מסימולציית מונטה קרלו
+            simulation = simulate_prices(self.hist['Close'])
+            self.price_simulation = simulation
+            low, high = min(simulation.bands.columns), max(simulation.bands.columns)
 
-            self.price_predictions = {
-                "next_day": {
-                    "lower": last_price - volatility,
-                    "prediction": last_price,
-                    "upper": last_price + volatility
+            def band(step):
+                return {
+                    "lower": simulation.band(step, low),
+                    "prediction": simulation.band(step, 0.5),
+                    "upper": simulation.band(step, high)
                 }
+
+            self.price_predictions = {
+                "next_day": band(1),
+                "horizon": {"days": simulation.horizon, **band(simulation.horizon)}
             }
         except Exception as e:
             self.logger.error(f"Error predicting prices: {str(e)}")
@@ -343,15 +489,15 @@ class EnhancedStockAnalyzer:
             # יצירת DataFrames לייצוא
             export_data = {}
 
-            # נתונים היסטוריים - הסרת אזורי זמן
-            hist_data = self.hist.copy()
-            hist_data.index = hist_data.index.tz_localize(None)  # הסרת אזור זמן
+            # נתונים היסטוריים - על ימי המסחר, בלי אזור זמן (אקסל לא תומך בו)
+            hist_data = self.hist.set_axis(trading_days(self.hist.index))
             export_data['Historical Data'] = hist_data
             self.logger.info("Historical data prepared")
 
             # אינדיקטורים טכניים
             tech_columns = ['RSI', 'MACD', 'MACD_Signal', 'ATR']
-            tech_data = hist_data[[col for col in tech_columns if col in hist_data.columns]].copy()
+            tech_data = self.indicators.to_frame(tech_columns)
+            tech_data.index = hist_data.index
             export_data['Technical Indicators'] = tech_data
             self.logger.info("Technical indicators prepared")
 
@@ -434,15 +580,51 @@ class EnhancedStockAnalyzer:
             self.logger.error(f"Error loading analysis: {str(e)}")
             raise
 
+    def snapshot(self) -> AnalysisSnapshot:
+        """תמונת מצב של הניתוח - נבנית פעם אחת לכל גרסת נתונים והגדרות ציון"""
+        if self.hist is None:
+            raise ValueError("No historical data available")
+
+        fingerprint = (data_fingerprint(self.hist), data_fingerprint(self.market_hist), self.risk_free_rate,
+                       scoring_version())
+        if self._snapshot is None or self._snapshot.fingerprint != fingerprint:
+            # כל האינדיקטורים נדרשים לציון - מחשבים אותם יחד במנוע המאוחד
+            latest = self.indicators.materialize().iloc[-1]
+            sentiment = self._compute_sentiment()
+
+            self._snapshot = AnalysisSnapshot.create(
+                symbol=self.symbol,
+                fingerprint=fingerprint,
+                last_close=self.hist['Close'].iloc[-1],
+                indicators={name: None if np.isnan(value) else float(value) for name, value in latest.items()},
+                sentiment=sentiment,
+                risk_metrics=self.calculate_risk_metrics(),
+                score=self._compute_final_score(sentiment)
+            )
+            self.logger.info(f"Built analysis snapshot for {self.symbol}")
+
+        return self._snapshot
+
     def analyze_sentiment(self):
         """ניתוח סנטימנט בסיסי"""
+        if self.hist is None:
+            return {}
+        try:
+            return thaw(self.snapshot().sentiment)
+        except Exception as e:
+            self.logger.error(f"Error analyzing sentiment: {str(e)}")
+            return {}
+
+    def _compute_sentiment(self):
+        """חישוב הסנטימנט מהאינדיקטורים"""
         if self.hist is None:
             return {}
 
         try:
             # חישוב מדדי מומנטום
-            rsi = TechnicalIndicators.RSI(self.hist['Close'])
-            macd, signal, _ = TechnicalIndicators.MACD(self.hist['Close'])
+            rsi = self.indicators['RSI']
+            macd = self.indicators['MACD']
+            signal = self.indicators['MACD_Signal']
 
             # ניתוח נפח מסחר
             volume_trend = self.hist['Volume'].tail(10).mean() / self.hist['Volume'].tail(30).mean() - 1
@@ -463,39 +645,24 @@ class EnhancedStockAnalyzer:
             self.logger.error(f"Error analyzing sentiment: {str(e)}")
             return {}
 
+    @memoize_on_bars('hist', 'market_hist', params=('risk_free_rate',))
     def calculate_risk_metrics(self):
         """חישוב מדדי סיכון"""
         if self.hist is None or self.market_hist is None:
             return {}
 
         try:
-            # חישוב תשואות
-            stock_returns = self.hist['Close'].pct_change().dropna()
-            market_returns = self.market_hist['Close'].pct_change().dropna()
-
-            # חישוב בטא
-            covariance = stock_returns.cov(market_returns)
-            market_variance = market_returns.var()
-            beta = covariance / market_variance
-
-            # חישוב שארפ
-            excess_returns = stock_returns - self.risk_free_rate / 252
-            sharpe = np.sqrt(252) * excess_returns.mean() / excess_returns.std()
-
-            # חישוב מקסימום דרודאון
-            cum_returns = (1 + stock_returns).cumprod()
-            rolling_max = cum_returns.expanding().max()
-            drawdowns = cum_returns / rolling_max - 1
-            max_drawdown = drawdowns.min()
-
-            # חישוב Value at Risk
-            var_95 = np.percentile(stock_returns, 5)
+            # יישור המניה ומדד הייחוס על אותו לוח מסחר
+            engine = RiskEngine.from_histories({self.symbol: self.hist}, self.market_hist,
+                                               risk_free_rate=self.risk_free_rate)
+            metrics = engine.metrics().loc[self.symbol]
 
             risk_metrics = {
-                'beta': beta,
-                'sharpe': sharpe,
-                'max_drawdown': max_drawdown,
-                'var_95': var_95
+                'beta': float(metrics['beta']),
+                'sharpe': float(metrics['sharpe']),
+                'volatility': float(metrics['volatility']),
+                'max_drawdown': float(metrics['max_drawdown']),
+                'var_95': float(metrics['var_95'])
             }
 
             return risk_metrics
@@ -504,39 +671,35 @@ class EnhancedStockAnalyzer:
             self.logger.error(f"Error calculating risk metrics: {str(e)}")
             return {}
 
+    def calculate_rolling_risk(self, window: Optional[int] = None) -> pd.DataFrame:
+        """חישוב סדרות סיכון מתגלגלות (בטא, שארפ, תנודתיות, דרודאון, VaR)"""
+        if self.hist is None:
+            raise ValueError("No historical data available")
+
+        if self.market_hist is None:
+            returns = pd.Series(self.hist['Close'].to_numpy(dtype=float), index=trading_days(self.hist.index))
+            return rolling_risk(returns.pct_change(fill_method=None), window=window,
+                                risk_free_rate=self.risk_free_rate)
+
+        engine = RiskEngine.from_histories({self.symbol: self.hist}, self.market_hist,
+                                           risk_free_rate=self.risk_free_rate)
+        return engine.rolling_metrics(self.symbol, window)
+
+    def backtest(self, **kwargs) -> BacktestResult:
+        """בק-טסט של ההמלצות של calculate_final_score על כל ההיסטוריה"""
+        if self.hist is None:
+            raise ValueError("No historical data available")
+        return run_backtest(self.hist, self.indicators.materialize(), **kwargs)
+
     def calculate_technical_indicators(self):
         """מחשב מדדים טכניים"""
         if self.hist is None:
             raise ValueError("No historical data available")
 
         try:
-            close_prices = self.hist['Close']
-            high_prices = self.hist['High']
-            low_prices = self.hist['Low']
-            volume = self.hist['Volume']
-
-            # מדדי מומנטום
-            self.hist['RSI'] = TechnicalIndicators.RSI(close_prices)
-            macd, signal, hist = TechnicalIndicators.MACD(close_prices)
-            self.hist['MACD'] = macd
-            self.hist['MACD_Signal'] = signal
-            self.hist['MACD_Hist'] = hist
-
-            # מדדי תנודתיות
-            self.hist['ATR'] = TechnicalIndicators.ATR(high_prices, low_prices, close_prices)
-            upper, middle, lower = TechnicalIndicators.BBANDS(close_prices)
-            self.hist['BBANDS_Upper'] = upper
-            self.hist['BBANDS_Middle'] = middle
-            self.hist['BBANDS_Lower'] = lower
-
-            # מדדי מגמה
-            self.hist['ADX'] = TechnicalIndicators.ADX(high_prices, low_prices, close_prices)
-            aroon_up, aroon_down = TechnicalIndicators.AROON(high_prices, low_prices)
-            self.hist['AROON_Up'] = aroon_up
-            self.hist['AROON_Down'] = aroon_down
-
-            # מדדי נפח
-            self.hist['OBV'] = TechnicalIndicators.OBV(close_prices, volume)
+            # כשצריך את כל הסט - מנוע מאוחד במקום חישוב עמודה-עמודה
+            frame = self.indicators.materialize()
+            self.hist[list(frame.columns)] = frame
 
             self.logger.info("Technical indicators calculated successfully")
 
@@ -547,6 +710,12 @@ class EnhancedStockAnalyzer:
 
     def generate_report(self) -> dict:
         """יצירת דוח מסכם"""
+        snapshot = None
+        if self.hist is not None:
+            try:
+                snapshot = self.snapshot()
+            except Exception as e:
+                self.logger.error(f"Error building analysis snapshot: {str(e)}")
         report = {
             'timestamp': datetime.now().isoformat(),
             'symbol': self.symbol,
@@ -566,8 +735,9 @@ class EnhancedStockAnalyzer:
                 'support_resistance': self.support_resistance_levels
             },
             'predictions': self.price_predictions,
-            'sentiment': self.analyze_sentiment(),
-            'risk_metrics': self.calculate_risk_metrics()
+            'sentiment': thaw(snapshot.sentiment) if snapshot else {},
+            'risk_metrics': thaw(snapshot.risk_metrics) if snapshot else {},
+            'fundamental_metrics': dict(self.fundamental_metrics)
         }
 
         return report
@@ -605,15 +775,34 @@ class EnhancedStockAnalyzer:
 
     def calculate_final_score(self):
         """מחשב ציון סופי ומגבש המלצה"""
+        try:
+            return thaw(self.snapshot().score)
+        except Exception as e:
+            self.logger.error(f"Error calculating final score: {str(e)}")
+            return self._failed_score()
+
+    def _failed_score(self) -> dict:
+        """תוצאת ציון כשהחישוב נכשל"""
+        return {
+            'המלצה': "לא ניתן לחשב",
+            'ציון_סופי': np.nan,
+            'ציונים_חלקיים': {},
+            'סיבות': ["שגיאה בחישוב הציון הסופי"],
+            'מדדים_טכניים': {}
+        }
+
+    def _compute_final_score(self, sentiment: dict) -> dict:
+        """חישוב הציון הסופי מהאינדיקטורים ומהסנטימנט"""
         try:
             scores = {}
             reasons = []
+            indicators = self.indicators
 
             # === ציון טכני (30%) ===
             technical_score = 0
 
             # RSI (5%)
-            rsi = self.hist['RSI'].iloc[-1]
+            rsi = indicators['RSI'].iloc[-1]
             if not np.isnan(rsi):
                 if 40 <= rsi <= 60:
                     technical_score += 5
@@ -624,25 +813,25 @@ class EnhancedStockAnalyzer:
                     technical_score += 1
 
             # MACD (10%)
-            if not np.isnan(self.hist['MACD'].iloc[-1]) and not np.isnan(self.hist['MACD_Signal'].iloc[-1]):
-                if self.hist['MACD'].iloc[-1] > self.hist['MACD_Signal'].iloc[-1]:
+            if not np.isnan(indicators['MACD'].iloc[-1]) and not np.isnan(indicators['MACD_Signal'].iloc[-1]):
+                if indicators['MACD'].iloc[-1] > indicators['MACD_Signal'].iloc[-1]:
                     technical_score += 10
                     reasons.append("איתות MACD חיובי")
 
             # Bollinger Bands (5%)
             last_close = self.hist['Close'].iloc[-1]
-            if (not np.isnan(self.hist['BBANDS_Lower'].iloc[-1]) and
-                    not np.isnan(self.hist['BBANDS_Upper'].iloc[-1])):
-                if (self.hist['BBANDS_Lower'].iloc[-1] < last_close <
-                        self.hist['BBANDS_Upper'].iloc[-1]):
+            if (not np.isnan(indicators['BBANDS_Lower'].iloc[-1]) and
+                    not np.isnan(indicators['BBANDS_Upper'].iloc[-1])):
+                if (indicators['BBANDS_Lower'].iloc[-1] < last_close <
+                        indicators['BBANDS_Upper'].iloc[-1]):
                     technical_score += 5
                     reasons.append("מחיר בתוך רצועות Bollinger")
 
             # מגמה (10%)
-            adx = self.hist['ADX'].iloc[-1] if 'ADX' in self.hist else np.nan
+            adx = indicators['ADX'].iloc[-1] if 'ADX' in indicators else np.nan
             if not np.isnan(adx):
                 if adx > 25:
-                    if self.hist['AROON_Up'].iloc[-1] > self.hist['AROON_Down'].iloc[-1]:
+                    if indicators['AROON_Up'].iloc[-1] > indicators['AROON_Down'].iloc[-1]:
                         technical_score += 10
                         reasons.append("מגמה חיובית חזקה")
                     else:
@@ -684,9 +873,9 @@ class EnhancedStockAnalyzer:
                     advanced_score += 7
 
             # OBV trend (10%)
-            if 'OBV' in self.hist:
-                obv_trend = (self.hist['OBV'].iloc[-1] >
-                             self.hist['OBV'].iloc[-5])
+            if 'OBV' in indicators:
+                obv_trend = (indicators['OBV'].iloc[-1] >
+                             indicators['OBV'].iloc[-5])
                 if obv_trend:
                     advanced_score += 10
                     reasons.append("מגמת נפח חיובית")
@@ -696,7 +885,6 @@ class EnhancedStockAnalyzer:
             # === ציון סנטימנט (20%) ===
             sentiment_score = 0
 
-            sentiment = self.analyze_sentiment()
             if sentiment.get('rsi_signal') == 'neutral':
                 sentiment_score += 7
             if sentiment.get('macd_signal') == 'bullish':
@@ -707,21 +895,18 @@ class EnhancedStockAnalyzer:
             scores['sentiment'] = sentiment_score / 20
 
             # === חישוב ציון סופי ===
-            final_score = (
-                    scores['technical'] * 0.3 +
-                    scores['momentum'] * 0.25 +
-                    scores['advanced'] * 0.25 +
-                    scores['sentiment'] * 0.2
-            )
+            scoring = ANALYSIS_SETTINGS['scoring']
+            final_score = sum(scores[category] * weight for category, weight in scoring['weights'].items())
 
             # === קביעת המלצה ===
-            if final_score > 0.7:
+            thresholds = scoring['thresholds']
+            if final_score > thresholds['strong_buy']:
                 recommendation = "קנייה חזקה"
-            elif final_score > 0.6:
+            elif final_score > thresholds['buy']:
                 recommendation = "קנייה"
-            elif final_score < 0.3:
+            elif final_score < thresholds['sell']:
                 recommendation = "מכירה"
-            elif final_score < 0.4:
+            elif final_score < thresholds['weak_sell']:
                 recommendation = "מכירה חלשה"
             else:
                 recommendation = "החזק"
@@ -732,18 +917,12 @@ class EnhancedStockAnalyzer:
                 'ציונים_חלקיים': scores,
                 'סיבות': reasons,
                 'מדדים_טכניים': {
-                    'RSI': float(self.hist['RSI'].iloc[-1]) if not np.isnan(self.hist['RSI'].iloc[-1]) else None,
-                    'MACD': float(self.hist['MACD'].iloc[-1]) if not np.isnan(self.hist['MACD'].iloc[-1]) else None,
-                    'ATR': float(self.hist['ATR'].iloc[-1]) if not np.isnan(self.hist['ATR'].iloc[-1]) else None
+                    'RSI': float(indicators['RSI'].iloc[-1]) if not np.isnan(indicators['RSI'].iloc[-1]) else None,
+                    'MACD': float(indicators['MACD'].iloc[-1]) if not np.isnan(indicators['MACD'].iloc[-1]) else None,
+                    'ATR': float(indicators['ATR'].iloc[-1]) if not np.isnan(indicators['ATR'].iloc[-1]) else None
                 }
             }
 
         except Exception as e:
             self.logger.error(f"Error calculating final score: {str(e)}")
-            return {
-                'המלצה': "לא ניתן לחשב",
-                'ציון_סופי': np.nan,
-                'ציונים_חלקיים': {},
-                'סיבות': ["שגיאה בחישוב הציון הסופי"],
-                'מדדים_טכניים': {}
-            }
\ No newline at end of file
+            return self._failed_score()
\ No newline at end of file
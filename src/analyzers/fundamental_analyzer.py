@@ -1,6 +1,12 @@
+import logging
+import pickle
+from pathlib import Path
 import numpy as np
 import pandas as pd
 from typing import Dict, Optional
+from ..config.settings import ANALYSIS_SETTINGS, SECTOR_DISTRIBUTIONS_FILE
+
+logger = logging.getLogger(__name__)
 
 
 class FundamentalIndicators:
@@ -60,8 +66,9 @@ class FundamentalIndicators:
         return ((current_value / previous_value) - 1) * 100 if previous_value != 0 else np.inf
 
     @staticmethod
-    def analyze_fundamentals(financial_data: Dict) -> Dict:
-        """ניתוח פונדמנטלי מקיף"""
+    def analyze_fundamentals(financial_data: Dict, percentiles: Optional['SectorPercentiles'] = None,
+                             sector: Optional[str] = None) -> Dict:
+        """ניתוח פונדמנטלי מקיף; percentiles ו-sector נדרשים רק לציון לפי סקטור"""
         results = {}
 
         try:
@@ -95,7 +102,9 @@ class FundamentalIndicators:
                 )
 
             # דירוג כולל
-            results['overall_score'] = FundamentalIndicators.calculate_overall_score(results)
+            results['overall_score'] = FundamentalIndicators.calculate_overall_score(
+                results, sector=sector, percentiles=percentiles
+            )
 
         except Exception as e:
             print(f"Error in fundamental analysis: {str(e)}")
@@ -104,35 +113,304 @@ class FundamentalIndicators:
         return results
 
     @staticmethod
-    def calculate_overall_score(metrics: Dict) -> float:
-        """חישוב ציון כולל למניה"""
-        scores = []
-        weights = {
-            'pe_ratio': 0.2,
-            'pb_ratio': 0.15,
-            'profit_margin': 0.2,
-            'current_ratio': 0.15,
-            'revenue_growth': 0.3
-        }
+    def _score_distributions(mode: Optional[str],
+                             percentiles: Optional['SectorPercentiles']) -> Optional['SectorPercentiles']:
+        """ההתפלגויות לציון לפי סקטור, או None לציון בספים קבועים.
+
+        mode=None לוקח את score_mode מההגדרות. במצב 'sector' בלי percentiles משמשות ההתפלגויות
+        השמורות; אם עוד לא נבנו, הציון חוזר לספים קבועים.
+        """
+        mode = mode or ANALYSIS_SETTINGS['fundamental']['score_mode']
+        if mode not in ('absolute', 'sector'):
+            raise ValueError(f"Unknown score mode: {mode}")
+        if mode == 'absolute':
+            return None
+        percentiles = percentiles or get_sector_distributions()
+        if not percentiles.fitted:
+            logger.warning("No sector distributions fitted yet - scoring with absolute thresholds")
+            return None
+        return percentiles
+
+    @staticmethod
+    def calculate_overall_score(metrics: Dict, mode: Optional[str] = None, sector: Optional[str] = None,
+                                percentiles: Optional['SectorPercentiles'] = None) -> float:
+        """חישוב ציון כולל למניה.
+
+        mode='absolute' - ספים קבועים, אותם כללים כמו בדירוג החתך.
+        mode='sector' - אחוזון כל מדד בתוך הסקטור, מול percentiles או ההתפלגויות השמורות.
+        """
+        percentiles = FundamentalIndicators._score_distributions(mode, percentiles)
+        if percentiles is not None:
+            return percentiles.score(metrics, sector)
+        return float(FundamentalIndicators.score_cross_section(pd.DataFrame([metrics]), mode='absolute').iloc[0])
+
+    @staticmethod
+    def fit_sector_distributions(metrics: pd.DataFrame, sectors: pd.Series) -> 'SectorPercentiles':
+        """בניית ההתפלגויות הממוינות לכל סקטור ומדד, לשימוש בציון לפי סקטור"""
+        return SectorPercentiles().fit(metrics, sectors)
+
+    @staticmethod
+    def _divide(numerator: np.ndarray, denominator: np.ndarray, on_zero: float) -> np.ndarray:
+        """חלוקה לפי עמודות: מכנה 0 נותן on_zero (כמו בפונקציות הסקלריות), ערך חסר נשאר NaN"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(denominator == 0, on_zero, numerator / denominator)
+        result[np.isnan(numerator) | np.isnan(denominator)] = np.nan
+        return result
+
+    @staticmethod
+    def analyze_cross_section(financial_data: pd.DataFrame, sectors: Optional[pd.Series] = None,
+                              percentiles: Optional['SectorPercentiles'] = None,
+                              mode: Optional[str] = None) -> pd.DataFrame:
+        """ניתוח פונדמנטלי לחתך של חברות - שורה לכל חברה, עמודה לכל שדה גולמי.
+
+        כל המכפילים מחושבים לעמודה שלמה בבת אחת. שדה גולמי חסר (או עמודה חסרה) נותן NaN,
+        ומכנה 0 נותן את אותו ערך כמו הפונקציה הסקלרית המתאימה (inf או 0).
+        overall_score לפי mode, כמו ב-score_cross_section. עם sectors נוסף גם ציון לפי סקטור -
+        מול percentiles אם ניתנו, אחרת מול החתך עצמו.
+        """
+        missing = np.full(len(financial_data), np.nan)
+
+        def field(name: str) -> np.ndarray:
+            if name not in financial_data:
+                return missing
+            return pd.to_numeric(financial_data[name], errors='coerce').to_numpy(dtype=float)
+
+        divide = FundamentalIndicators._divide
+        price = field('price')
+        equity = field('shareholder_equity')
+        current_assets = field('current_assets')
+        current_liabilities = field('current_liabilities')
+        pe_ratio = divide(price, field('eps'), np.inf)
+
+        results = pd.DataFrame({
+            'pe_ratio': pe_ratio,
+            'pb_ratio': divide(price, field('book_value'), np.inf),
+            'ps_ratio': divide(price, field('sales_per_share'), np.inf),
+            'peg_ratio': divide(pe_ratio, field('growth_rate'), np.inf),
+            'dividend_yield': divide(field('dividend_per_share'), price, 0) * 100,
+            'return_on_equity': divide(field('net_income'), equity, 0) * 100,
+            'debt_to_equity': divide(field('total_debt'), equity, np.inf),
+            'current_ratio': divide(current_assets, current_liabilities, np.inf),
+            'quick_ratio': divide(current_assets - field('inventory'), current_liabilities, np.inf),
+            'profit_margin': divide(field('net_income'), field('revenue'), 0) * 100,
+            'revenue_growth': (divide(field('current_revenue'), field('previous_revenue'), np.inf) - 1) * 100
+        }, index=financial_data.index)
+
+        results['overall_score'] = FundamentalIndicators.score_cross_section(
+            results, sectors=sectors, percentiles=percentiles, mode=mode
+        )
+        if sectors is not None:
+            percentiles = percentiles or FundamentalIndicators.fit_sector_distributions(results, sectors)
+            results['sector_score'] = percentiles.score_cross_section(results, sectors)
+        return results
+
+    @staticmethod
+    def score_cross_section(metrics: pd.DataFrame, weights: Optional[Dict[str, float]] = None,
+                            sectors: Optional[pd.Series] = None,
+                            percentiles: Optional['SectorPercentiles'] = None,
+                            mode: Optional[str] = None) -> pd.Series:
+        """ציון כולל לכל חברה בחתך, לפי אותו mode כמו calculate_overall_score.
+
+        מדד חסר (NaN) לא נכנס לשקלול; מדד אינסופי (מכנה 0) נחשב לא תקין ומקבל 0.
+        במצב 'sector' - ציון לפי אחוזון בסקטור (sectors) מול percentiles או ההתפלגויות השמורות.
+        """
+        weights = weights or ANALYSIS_SETTINGS['fundamental']['score_weights']
+        percentiles = FundamentalIndicators._score_distributions(mode, percentiles)
+        if percentiles is not None:
+            if sectors is None:
+                sectors = pd.Series(np.nan, index=metrics.index, dtype=object)
+            return percentiles.score_cross_section(metrics, sectors, weights)
+        total = np.zeros(len(metrics))
+        weight_sum = np.zeros(len(metrics))
 
         for metric, weight in weights.items():
             if metric not in metrics:
                 continue
+            value = pd.to_numeric(metrics[metric], errors='coerce').to_numpy(dtype=float)
+            present = ~np.isnan(value)
+            finite = np.isfinite(value)
+
+            with np.errstate(invalid='ignore'):
+                if metric == 'pe_ratio':
+                    good, fair = (0 < value) & (value < 15), (15 <= value) & (value < 25)
+                elif metric == 'pb_ratio':
+                    good, fair = (0 < value) & (value < 3), (3 <= value) & (value < 5)
+                elif metric == 'profit_margin':
+                    good, fair = value > 20, (10 <= value) & (value <= 20)
+                elif metric == 'current_ratio':
+                    good, fair = value > 2, (1 <= value) & (value <= 2)
+                elif metric == 'revenue_growth':
+                    good, fair = value > 20, (5 <= value) & (value <= 20)
+                else:
+                    continue
+
+            score = np.select([finite & good, finite & fair], [1.0, 0.5], 0.0)
+            total += np.where(present, score * weight, 0.0)
+            weight_sum += np.where(present, weight, 0.0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.Series(np.where(weight_sum > 0, total / weight_sum, np.nan), index=metrics.index)
+
+
+# כיוון כל מדד בדירוג: 1 = גבוה עדיף, -1 = נמוך עדיף
+PERCENTILE_DIRECTIONS = {
+    'pe_ratio': -1, 'pb_ratio': -1, 'ps_ratio': -1, 'peg_ratio': -1, 'debt_to_equity': -1,
+    'return_on_equity': 1, 'profit_margin': 1, 'current_ratio': 1, 'quick_ratio': 1,
+    'revenue_growth': 1, 'dividend_yield': 1
+}
+# מכפילים שבהם ערך אפס או שלילי (הפסד) הוא הגרוע ביותר
+_MULTIPLES = {'pe_ratio', 'pb_ratio', 'ps_ratio', 'peg_ratio'}
+ALL_SECTORS = '__all__'
+
+
+def _orient(metric: str, values) -> np.ndarray:
+    """הפיכת מדד כך שגבוה תמיד עדיף; ערך לא סופי (או מכפיל לא חיובי) הוא הגרוע ביותר, NaN נשאר חסר"""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid='ignore'):
+        oriented = values * PERCENTILE_DIRECTIONS[metric]
+        invalid = ~np.isfinite(values)
+        if metric in _MULTIPLES:
+            invalid |= values <= 0
+    return np.where(np.isnan(values), np.nan, np.where(invalid, -np.inf, oriented))
+
+
+class SectorPercentiles:
+    """התפלגות כל מדד בכל סקטור כמערך ממוין - אחוזון של חברה חדשה הוא חיפוש בינארי.
+
+    האחוזון הוא הדרגה הממוצעת חלקי מספר החברות (כמו rank(pct=True)), כך שחברה מתוך
+    היקום מקבלת בחיפוש בדיוק את האחוזון שקיבלה בדירוג הקבוצתי. סקטור קטן מ-min_sector_size
+    (או חברה בלי סקטור) מדורג מול כל היקום.
+    """
+
+    def __init__(self, min_sector_size: Optional[int] = None):
+        settings = ANALYSIS_SETTINGS['fundamental']
+        self.min_sector_size = min_sector_size or settings['min_sector_size']
+        self._sorted: Dict[tuple, np.ndarray] = {}
+
+    def _metrics(self, metrics: pd.DataFrame) -> list:
+        return [metric for metric in PERCENTILE_DIRECTIONS if metric in metrics]
+
+    def _groups(self, sectors: pd.Series) -> pd.Series:
+        """סקטור לכל חברה, או ALL_SECTORS אם הסקטור קטן מדי או חסר"""
+        sectors = sectors.fillna(ALL_SECTORS)
+        sizes = sectors.map(sectors.value_counts())
+        return sectors.where(sizes >= self.min_sector_size, ALL_SECTORS)
+
+    def fit(self, metrics: pd.DataFrame, sectors: pd.Series) -> 'SectorPercentiles':
+        """מיון ערכי כל מדד פעם אחת לכל סקטור"""
+        groups = self._groups(sectors.reindex(metrics.index)).to_numpy()
+        self._sorted = {}
+        for metric in self._metrics(metrics):
+            oriented = _orient(metric, metrics[metric])
+            present = ~np.isnan(oriented)
+            self._sorted[(ALL_SECTORS, metric)] = np.sort(oriented[present])
+            for sector in np.unique(groups[present]):
+                if sector != ALL_SECTORS:
+                    self._sorted[(sector, metric)] = np.sort(oriented[present & (groups == sector)])
+        return self
+
+    @property
+    def fitted(self) -> bool:
+        return bool(self._sorted)
+
+    @property
+    def sectors(self) -> list:
+        return sorted({sector for sector, _ in self._sorted} - {ALL_SECTORS})
+
+    def percentile(self, metric: str, value: float, sector: Optional[str] = None) -> float:
+        """אחוזון של ערך מול ההתפלגות השמורה - O(log n)"""
+        values = self._sorted.get((sector, metric))
+        if values is None:
+            values = self._sorted.get((ALL_SECTORS, metric))
+        oriented = float(_orient(metric, [value])[0]) if metric in PERCENTILE_DIRECTIONS else np.nan
+        if values is None or len(values) == 0 or np.isnan(oriented):
+            return np.nan
+        left = np.searchsorted(values, oriented, side='left')
+        right = np.searchsorted(values, oriented, side='right')
+        return float((left + right + (right > left)) / (2 * len(values)))
+
+    def rank(self, metrics: pd.DataFrame, sectors: pd.Series) -> pd.DataFrame:
+        """אחוזון כל מדד בתוך הסקטור לכל החברות בבת אחת (דירוג קבוצתי)"""
+        groups = self._groups(sectors.reindex(metrics.index))
+        columns = self._metrics(metrics)
+        oriented = pd.DataFrame({metric: _orient(metric, metrics[metric]) for metric in columns},
+                                index=metrics.index)
+        ranks = oriented.groupby(groups).rank(method='average', pct=True)
+        overall = oriented.rank(method='average', pct=True)
+        return ranks.where(groups != ALL_SECTORS, overall)
+
+    @staticmethod
+    def _weighted(percentiles: pd.DataFrame, weights: Dict[str, float]) -> pd.Series:
+        columns = [metric for metric in weights if metric in percentiles]
+        values = percentiles[columns].to_numpy(dtype=float)
+        weight = np.array([weights[metric] for metric in columns])
+        present = ~np.isnan(values)
+        total = np.where(present, values, 0.0) @ weight
+        weight_sum = present @ weight
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return pd.Series(np.where(weight_sum > 0, total / weight_sum, np.nan), index=percentiles.index)
+
+    def percentiles(self, metrics: pd.DataFrame, sectors: pd.Series) -> pd.DataFrame:
+        """אחוזון כל מדד מול ההתפלגויות השמורות לכל החברות - חיפוש בינארי וקטורי לכל סקטור"""
+        sectors = sectors.reindex(metrics.index).fillna(ALL_SECTORS).to_numpy()
+        result = {}
+        for metric in self._metrics(metrics):
+            oriented = _orient(metric, metrics[metric])
+            # סקטור בלי התפלגות משלו מדורג מול כל היקום, כמו ב-percentile
+            keys = np.array([sector if (sector, metric) in self._sorted else ALL_SECTORS for sector in sectors],
+                            dtype=object)
+            column = np.full(len(oriented), np.nan)
+            for key in np.unique(keys):
+                values = self._sorted.get((key, metric))
+                rows = np.flatnonzero((keys == key) & ~np.isnan(oriented))
+                if values is None or len(values) == 0 or len(rows) == 0:
+                    continue
+                left = np.searchsorted(values, oriented[rows], side='left')
+                right = np.searchsorted(values, oriented[rows], side='right')
+                column[rows] = (left + right + (right > left)) / (2 * len(values))
+            result[metric] = column
+        return pd.DataFrame(result, index=metrics.index)
+
+    def score_cross_section(self, metrics: pd.DataFrame, sectors: pd.Series,
+                            weights: Optional[Dict[str, float]] = None) -> pd.Series:
+        """ציון לפי סקטור לכל החברות - ממוצע משוקלל של האחוזונים מול ההתפלגויות השמורות"""
+        weights = weights or ANALYSIS_SETTINGS['fundamental']['score_weights']
+        return self._weighted(self.percentiles(metrics, sectors), weights)
+
+    def score(self, metrics: Dict, sector: Optional[str] = None, weights: Optional[Dict[str, float]] = None) -> float:
+        """ציון לפי סקטור לחברה אחת, מול ההתפלגויות השמורות"""
+        weights = weights or ANALYSIS_SETTINGS['fundamental']['score_weights']
+        percentiles = pd.DataFrame([{metric: self.percentile(metric, value, sector)
+                                     for metric, value in metrics.items() if metric in weights}])
+        return float(self._weighted(percentiles, weights).iloc[0])
+
+    def save(self, path=None):
+        """שמירת ההתפלגויות לדיסק"""
+        path = Path(path or SECTOR_DISTRIBUTIONS_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path=None) -> 'SectorPercentiles':
+        """טעינת ההתפלגויות מהדיסק, או התפלגויות ריקות"""
+        path = Path(path or SECTOR_DISTRIBUTIONS_FILE)
+        if path.exists():
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except Exception as e:
+                logger.error(f"Error loading sector distributions: {str(e)}")
+        return cls()
 
-            value = metrics[metric]
 
-            # חישוב ציון לכל מדד
-            if metric == 'pe_ratio':
-                score = 1.0 if 0 < value < 15 else 0.5 if 15 <= value < 25 else 0.0
-            elif metric == 'pb_ratio':
-                score = 1.0 if 0 < value < 3 else 0.5 if 3 <= value < 5 else 0.0
-            elif metric == 'profit_margin':
-                score = 1.0 if value > 20 else 0.5 if 10 <= value <= 20 else 0.0
-            elif metric == 'current_ratio':
-                score = 1.0 if value > 2 else 0.5 if 1 <= value <= 2 else 0.0
-            elif metric == 'revenue_growth':
-                score = 1.0 if value > 20 else 0.5 if 5 <= value <= 20 else 0.0
+# התפלגויות הסקטורים של היקום - נבנות ב-cli analyze ומשמשות לציון לפי סקטור
+sector_distributions: Optional[SectorPercentiles] = None
 
-            scores.append(score * weight)
 
-        return sum(scores) / sum(weights[m] for m in metrics.keys() if m in weights)
\ No newline at end of file
+def get_sector_distributions() -> SectorPercentiles:
+    """ההתפלגויות המשותפות - נטענות מהדיסק בשימוש הראשון"""
+    global sector_distributions
+    if sector_distributions is None:
+        sector_distributions = SectorPercentiles.load()
+    return sector_distributions
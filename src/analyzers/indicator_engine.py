@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from ..config.settings import ANALYSIS_SETTINGS
+
+# סדר העמודות בבלוק המאוחד
+FUSED_COLUMNS: List[str] = [
+    'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist',
+    'ATR', 'BBANDS_Upper', 'BBANDS_Middle', 'BBANDS_Lower',
+    'ADX', 'AROON_Up', 'AROON_Down', 'OBV', 'CMF', 'ROC'
+]
+
+
+def rolling_mean(values: np.ndarray, periods: int, out: np.ndarray) -> np.ndarray:
+    """ממוצע נע לאורך ציר 0 מסכומים מצטברים; חלון שמכיל ערך חסר מקבל NaN (כמו rolling של pandas)"""
+    out[:] = np.nan
+    n = len(values)
+    if periods > n:
+        return out
+
+    valid = np.isfinite(values)
+    zeros = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    missing = np.concatenate([zeros, np.cumsum(~valid, axis=0)])
+
+    window_sum = sums[periods:] - sums[:-periods]
+    window_missing = missing[periods:] - missing[:-periods]
+    out[periods - 1:] = np.where(window_missing == 0, window_sum / periods, np.nan)
+    return out
+
+
+def _ewm(values: np.ndarray, span: Optional[float] = None, alpha: Optional[float] = None) -> np.ndarray:
+    """ממוצע אקספוננציאלי (adjust=False) - לולאת C של pandas על כל העמודות יחד"""
+    return pd.DataFrame(values).ewm(span=span, alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def compute_indicator_block(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                            volume: np.ndarray, settings: Optional[Dict] = None) -> np.ndarray:
+    """חישוב מאוחד של כל סט האינדיקטורים לתוך בלוק רציף אחד.
+
+    הבלוק הוא (n, len(FUSED_COLUMNS)) בסדר Fortran, כך שכל עמודה רציפה בזיכרון.
+    ההפרשים, ה-True Range והסכומים המצטברים מחושבים פעם אחת ומשותפים בין האינדיקטורים.
+    """
+    settings = settings or ANALYSIS_SETTINGS['technical']
+    high, low, close, volume = (np.asarray(a, dtype=float) for a in (high, low, close, volume))
+    n = len(close)
+    col = {name: j for j, name in enumerate(FUSED_COLUMNS)}
+    out = np.empty((n, len(FUSED_COLUMNS)), order='F')
+    if n == 0:
+        return out
+    scratch = np.empty(n)
+
+    # מעבר משותף: סגירה קודמת, הפרשים ו-True Range
+    prev_close = np.empty(n)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    delta = close - prev_close
+
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+    # RSI + MACD - כל הממוצעים האקספוננציאליים
+    rsi_alpha = 1 / settings['rsi_periods']
+    smoothed = _ewm(np.column_stack([np.fmax(delta[1:], 0), np.fmax(-delta[1:], 0)]), alpha=rsi_alpha)
+    rsi = out[:, col['RSI']]
+    rsi[0] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(100, 1 + smoothed[:, 0] / smoothed[:, 1], out=rsi[1:])
+    np.subtract(100, rsi[1:], out=rsi[1:])
+
+    macd = out[:, col['MACD']]
+    np.subtract(_ewm(close, span=settings['macd_fast'])[:, 0],
+                 _ewm(close, span=settings['macd_slow'])[:, 0], out=macd)
+    out[:, col['MACD_Signal']] = _ewm(macd, span=settings['macd_signal'])[:, 0]
+    np.subtract(macd, out[:, col['MACD_Signal']], out=out[:, col['MACD_Hist']])
+
+    # ATR
+    rolling_mean(true_range, settings['atr_periods'], out[:, col['ATR']])
+
+    # Bollinger - ממוצע וסטיית תקן מסכומים מצטברים של מחיר מוזז
+    bb_periods = settings['bollinger_periods']
+    middle = out[:, col['BBANDS_Middle']]
+    shift = close[0] if n else 0.0
+    shifted = close - shift
+    rolling_mean(shifted, bb_periods, middle)
+    rolling_mean(shifted ** 2, bb_periods, scratch)
+    with np.errstate(invalid='ignore'):
+        std_dev = np.sqrt(np.maximum(scratch - middle ** 2, 0) * bb_periods / (bb_periods - 1))
+    middle += shift
+    np.add(middle, settings['bollinger_std'] * std_dev, out=out[:, col['BBANDS_Upper']])
+    np.subtract(middle, settings['bollinger_std'] * std_dev, out=out[:, col['BBANDS_Lower']])
+
+    # ADX - משתמש באותו True Range
+    adx_periods = settings['adx_periods']
+    up_move = np.empty(n)
+    down_move = np.empty(n)
+    up_move[0] = down_move[0] = np.nan
+    up_move[1:] = high[1:] - high[:-1]
+    down_move[1:] = low[:-1] - low[1:]
+    with np.errstate(invalid='ignore'):
+        pos_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        neg_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    tr_mean = rolling_mean(true_range, adx_periods, np.empty(n))
+    pos_di = rolling_mean(pos_dm, adx_periods, np.empty(n))
+    neg_di = rolling_mean(neg_dm, adx_periods, np.empty(n))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pos_di = 100 * pos_di / tr_mean
+        neg_di = 100 * neg_di / tr_mean
+        dx = 100 * np.abs(pos_di - neg_di) / (pos_di + neg_di)
+    rolling_mean(dx, adx_periods, out[:, col['ADX']])
+
+    # Aroon - מספר הימים מאז השיא/השפל בחלון של periods + 1
+    aroon_periods = settings['aroon_periods']
+    out[:, col['AROON_Up']] = np.nan
+    out[:, col['AROON_Down']] = np.nan
+    if n > aroon_periods:
+        since_high = aroon_periods - sliding_window_view(high, aroon_periods + 1).argmax(axis=1)
+        since_low = aroon_periods - sliding_window_view(low, aroon_periods + 1).argmin(axis=1)
+        out[aroon_periods:, col['AROON_Up']] = (aroon_periods - since_high) / aroon_periods * 100
+        out[aroon_periods:, col['AROON_Down']] = (aroon_periods - since_low) / aroon_periods * 100
+
+    # OBV
+    np.cumsum(np.where(delta < 0, -volume, volume), out=out[:, col['OBV']])
+
+    # CMF
+    cmf_periods = settings['cmf_periods']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        money_flow = ((close - low) - (high - close)) / (high - low) * volume
+        rolling_mean(money_flow, cmf_periods, scratch)
+        np.divide(scratch, rolling_mean(volume, cmf_periods, np.empty(n)), out=out[:, col['CMF']])
+
+    # ROC
+    roc_periods = settings['roc_periods']
+    roc = out[:, col['ROC']]
+    roc[:roc_periods] = np.nan
+    if n > roc_periods:
+        past = close[:-roc_periods]
+        roc[roc_periods:] = (close[roc_periods:] - past) / past * 100
+
+    return out
+
+
+def compute_indicator_frame(bars: pd.DataFrame, settings: Optional[Dict] = None) -> pd.DataFrame:
+    """עטיפת הבלוק המאוחד בטבלה עם האינדקס של הנרות, ללא העתקה"""
+    block = compute_indicator_block(bars['High'].to_numpy(), bars['Low'].to_numpy(),
+                                    bars['Close'].to_numpy(), bars['Volume'].to_numpy(), settings)
+    return pd.DataFrame(block, index=bars.index, columns=FUSED_COLUMNS, copy=False)
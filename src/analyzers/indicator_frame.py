@@ -0,0 +1,127 @@
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+from .technical_indicators import TechnicalIndicators
+from .indicator_engine import compute_indicator_frame
+from ..config.settings import ANALYSIS_SETTINGS
+from ..utils.result_cache import data_fingerprint
+
+
+def _momentum_rsi(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    return {'RSI': TechnicalIndicators.RSI(bars['Close'], periods=settings['rsi_periods'])}
+
+
+def _momentum_macd(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    macd, signal, hist = TechnicalIndicators.MACD(bars['Close'],
+                                                  fast=settings['macd_fast'],
+                                                  slow=settings['macd_slow'],
+                                                  signal=settings['macd_signal'])
+    return {'MACD': macd, 'MACD_Signal': signal, 'MACD_Hist': hist}
+
+
+def _volatility_atr(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    return {'ATR': TechnicalIndicators.ATR(bars['High'], bars['Low'], bars['Close'],
+                                           periods=settings['atr_periods'])}
+
+
+def _volatility_bbands(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    upper, middle, lower = TechnicalIndicators.BBANDS(bars['Close'],
+                                                      periods=settings['bollinger_periods'],
+                                                      num_std=settings['bollinger_std'])
+    return {'BBANDS_Upper': upper, 'BBANDS_Middle': middle, 'BBANDS_Lower': lower}
+
+
+def _trend_adx(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    return {'ADX': TechnicalIndicators.ADX(bars['High'], bars['Low'], bars['Close'],
+                                           periods=settings['adx_periods'])}
+
+
+def _trend_aroon(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    aroon_up, aroon_down = TechnicalIndicators.AROON(bars['High'], bars['Low'],
+                                                     periods=settings['aroon_periods'])
+    return {'AROON_Up': aroon_up, 'AROON_Down': aroon_down}
+
+
+def _volume_obv(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    return {'OBV': TechnicalIndicators.OBV(bars['Close'], bars['Volume'])}
+
+
+def _volume_cmf(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    return {'CMF': TechnicalIndicators.CMF(bars['High'], bars['Low'], bars['Close'], bars['Volume'],
+                                           periods=settings['cmf_periods'])}
+
+
+def _momentum_roc(bars: pd.DataFrame, settings: Dict) -> Dict[str, pd.Series]:
+    return {'ROC': TechnicalIndicators.ROC(bars['Close'], periods=settings['roc_periods'])}
+
+
+# כל קבוצה מחושבת יחד, כי העמודות שלה יוצאות מאותו חישוב
+INDICATOR_GROUPS: Dict[Callable, List[str]] = {
+    _momentum_rsi: ['RSI'],
+    _momentum_macd: ['MACD', 'MACD_Signal', 'MACD_Hist'],
+    _volatility_atr: ['ATR'],
+    _volatility_bbands: ['BBANDS_Upper', 'BBANDS_Middle', 'BBANDS_Lower'],
+    _trend_adx: ['ADX'],
+    _trend_aroon: ['AROON_Up', 'AROON_Down'],
+    _volume_obv: ['OBV'],
+    _volume_cmf: ['CMF'],
+    _momentum_roc: ['ROC'],
+}
+
+INDICATOR_COLUMNS: List[str] = [column for columns in INDICATOR_GROUPS.values() for column in columns]
+
+_COLUMN_BUILDERS = {column: builder for builder, columns in INDICATOR_GROUPS.items() for column in columns}
+
+
+class IndicatorFrame:
+    """מסגרת אינדיקטורים עצלה - כל אינדיקטור מחושב בגישה הראשונה ונשמר"""
+
+    def __init__(self, bars: pd.DataFrame, settings: Optional[Dict] = None):
+        self.bars = bars
+        self.settings = settings or ANALYSIS_SETTINGS['technical']
+        self.fingerprint = data_fingerprint(bars)
+        self._columns: Dict[str, pd.Series] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        """כל העמודות הזמינות"""
+        return list(INDICATOR_COLUMNS)
+
+    @property
+    def computed(self) -> List[str]:
+        """העמודות שכבר חושבו"""
+        return list(self._columns)
+
+    def __contains__(self, name: str) -> bool:
+        return name in _COLUMN_BUILDERS
+
+    def __getitem__(self, name: str) -> pd.Series:
+        if name not in self._columns:
+            if name not in _COLUMN_BUILDERS:
+                raise KeyError(f"Unknown indicator: {name}")
+
+            builder = _COLUMN_BUILDERS[name]
+            for column, series in builder(self.bars, self.settings).items():
+                self._columns[column] = series.reindex(self.bars.index)
+
+        return self._columns[name]
+
+    def materialize(self) -> pd.DataFrame:
+        """חישוב כל האינדיקטורים יחד במנוע המאוחד ושמירתם"""
+        frame = compute_indicator_frame(self.bars, self.settings)
+        for column in frame.columns:
+            self._columns[column] = frame[column]
+        return frame
+
+    def is_stale(self, bars: pd.DataFrame) -> bool:
+        """בדיקה האם הנרות השתנו מאז החישוב"""
+        return data_fingerprint(bars) != self.fingerprint
+
+    def invalidate(self):
+        """מחיקת כל האינדיקטורים שחושבו"""
+        self._columns.clear()
+        self.fingerprint = data_fingerprint(self.bars)
+
+    def to_frame(self, names: Optional[List[str]] = None) -> pd.DataFrame:
+        """החזרת העמודות המבוקשות כטבלה אחת"""
+        names = names or self.columns
+        return pd.DataFrame({name: self[name] for name in names}, index=self.bars.index)
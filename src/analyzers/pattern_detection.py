@@ -0,0 +1,364 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from .indicator_engine import rolling_mean
+
+
+def find_local_extrema(values: np.ndarray, order: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """מציאת כל המינימומים והמקסימומים המקומיים במעבר וקטורי אחד.
+
+    נקודה היא מינימום אם היא נמוכה ממש מכל ערך בטווח של order נרות לכל צד.
+    מחזיר (אינדקסי מינימום, אינדקסי מקסימום) ממוינים לפי זמן.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n < 2 * order + 1:
+        empty = np.array([], dtype=int)
+        return empty, empty
+
+    # מינימום/מקסימום של כל חלון באורך order - משמש גם לצד שמאל וגם לצד ימין
+    window_min = sliding_window_view(values, order).min(axis=1)
+    window_max = sliding_window_view(values, order).max(axis=1)
+
+    centers = np.arange(order, n - order)
+    center_values = values[centers]
+    is_min = (center_values < window_min[centers - order]) & (center_values < window_min[centers + 1])
+    is_max = (center_values > window_max[centers - order]) & (center_values > window_max[centers + 1])
+
+    return centers[is_min], centers[is_max]
+
+
+def _sparse_table(values: np.ndarray, func) -> List[np.ndarray]:
+    """טבלה דלילה לשאילתות טווח ב-O(1) - רמה k מחזיקה func על חלונות באורך 2^k"""
+    table = [np.asarray(values, dtype=float)]
+    length = 1
+    while 2 * length <= len(values):
+        previous = table[-1]
+        table.append(func(previous[:-length], previous[length:]))
+        length *= 2
+    return table
+
+
+def _range_query(table: List[np.ndarray], starts: np.ndarray, ends: np.ndarray, func) -> np.ndarray:
+    """func על values[start:end] לכל זוג, וקטורית (דורש end > start)"""
+    levels = np.floor(np.log2(ends - starts)).astype(int)
+    result = np.empty(len(starts))
+    for level in np.unique(levels):
+        mask = levels == level
+        row = table[level]
+        result[mask] = func(row[starts[mask]], row[ends[mask] - (1 << level)])
+    return result
+
+
+def _valley_pairs(prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """כל הזוגות (i, j) שכל המחירים ביניהם גבוהים ממש משניהם - מחסנית מונוטונית, O(m).
+
+    בכל זוג כזה אחד הצדדים הוא השפל הבא/הקודם שאינו גבוה מהשני, ולכן יש לכל היותר 2m זוגות.
+    """
+    first, second, stack = [], [], []
+    for j, price in enumerate(prices):
+        while stack and prices[stack[-1]] > price:
+            first.append(stack.pop())
+            second.append(j)
+        if stack and prices[stack[-1]] == price:
+            # שפל שווה חוסם את מי שמתחתיו במחסנית
+            first.append(stack.pop())
+            second.append(j)
+        elif stack:
+            first.append(stack[-1])
+            second.append(j)
+        stack.append(j)
+    return np.array(first, dtype=int), np.array(second, dtype=int)
+
+
+def find_double_bottoms(lows: np.ndarray, highs: np.ndarray = None, order: int = 10,
+                        tolerance: float = 0.02, min_separation: int = 10,
+                        min_rebound: float = 0.03, minima: np.ndarray = None) -> List[Tuple[int, int, float]]:
+    """מציאת כל תבניות ה-Double Bottom ב-O(n log n).
+
+    זוג נחשב תבנית אם:
+    - השפל הגבוה נמוך מ-(1 + tolerance) כפול השפל הנמוך
+    - יש ביניהם לפחות min_separation נרות
+    - כל המחירים ביניהם גבוהים משני השפלים
+    - השיא שביניהם גבוה ב-min_rebound לפחות מהשפל הגבוה
+    התנאי השלישי מחייב שגם כל השפלים המקומיים ביניהם גבוהים משניהם, כך שהמועמדים הם רק
+    O(m) הזוגות של מחסנית מונוטונית על השפלים - גם כשהרבה שפלים נמצאים בטווח הסבילות.
+    minima - שפלים מקומיים שחושבו מראש (למשל מ-PivotIndex); אחרת מחושבים כאן.
+    מחזיר רשימת (אינדקס ראשון, אינדקס שני, הפרש יחסי) ממוינת לפי זמן.
+    """
+    lows = np.asarray(lows, dtype=float)
+    highs = lows if highs is None else np.asarray(highs, dtype=float)
+    if minima is None:
+        minima, _ = find_local_extrema(lows, order)
+    minima = np.sort(np.asarray(minima, dtype=int))
+    if len(minima) < 2:
+        return []
+
+    first, second = _valley_pairs(lows[minima])
+    if len(first) == 0:
+        return []
+    starts, ends = minima[first], minima[second]
+
+    bottoms_low = np.minimum(lows[starts], lows[ends])
+    bottoms_high = np.maximum(lows[starts], lows[ends])
+    keep = (bottoms_high < bottoms_low * (1 + tolerance)) & (ends - starts >= max(min_separation, 2))
+    starts, ends, bottoms_high = starts[keep], ends[keep], bottoms_high[keep]
+    if len(starts) == 0:
+        return []
+
+    # בדיקות טווח בין שני השפלים - טבלאות דלילות, O(1) לכל זוג
+    lowest_between = _range_query(_sparse_table(lows, np.minimum), starts + 1, ends, np.minimum)
+    highest_between = _range_query(_sparse_table(highs, np.maximum), starts + 1, ends, np.maximum)
+
+    valid = (lowest_between > bottoms_high) & (highest_between >= bottoms_high * (1 + min_rebound))
+    starts, ends = starts[valid], ends[valid]
+    differences = np.abs(lows[starts] - lows[ends]) / np.minimum(lows[starts], lows[ends])
+
+    order_by_time = np.lexsort((ends, starts))
+    return [(int(starts[k]), int(ends[k]), float(differences[k])) for k in order_by_time]
+
+
+def find_breakout_runs(closes: np.ndarray, volumes: np.ndarray, window: int = 20,
+                       price_threshold: float = 1.02,
+                       volume_threshold: float = 1.5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """זיהוי פריצות במסכה בוליאנית, כשנרות פריצה רצופים מאוחדים לאירוע אחד.
+
+    הקלט הוא מערך (n,) למניה אחת או (n, k) לכמה מניות יחד.
+    מחזיר (עמודות, נר התחלה, נר סיום) - נר הסיום כלול באירוע.
+    """
+    closes = np.asarray(closes, dtype=float)
+    volumes = np.asarray(volumes, dtype=float)
+    if closes.ndim == 1:
+        closes, volumes = closes[:, None], volumes[:, None]
+
+    price_ma = rolling_mean(closes, window, np.empty_like(closes))
+    volume_ma = rolling_mean(volumes, window, np.empty_like(volumes))
+    with np.errstate(invalid='ignore'):
+        mask = (closes > price_ma * price_threshold) & (volumes > volume_ma * volume_threshold)
+    mask[:window] = False
+
+    # גבולות של רצפים - 1 בתחילת רצף, 1- אחרי סופו
+    padding = np.zeros((1, mask.shape[1]), dtype=np.int8)
+    edges = np.diff(np.concatenate([padding, mask.astype(np.int8), padding]), axis=0)
+    start_rows, start_columns = np.nonzero(edges.T == 1)[::-1]
+    end_rows, _ = np.nonzero(edges.T == -1)[::-1]
+
+    return start_columns, start_rows, end_rows - 1
+
+
+def find_price_levels(highs: np.ndarray, lows: np.ndarray, order: int = 10, tolerance: float = 0.015,
+                      half_life: int = 120) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """רמות מחיר מאשכולות של נגיעות - שיאים ושפלים מקומיים.
+
+    הנגיעות ממוינות לפי מחיר, וכל אשכול מתחיל בנגיעה הנמוכה שעוד לא שויכה (העוגן) ומכיל
+    רק נגיעות שגבוהות ממנה בפחות מ-tolerance - כך רמה אחת לא נמתחת לאורך מגמה של נגיעות צפופות.
+    חוזק רמה הוא סכום הנגיעות בה, כשכל נגיעה דועכת לפי half_life נרות, מנורמל ל-1.
+    מחזיר (מחיר, מספר נגיעות, חוזק, אינדקס נגיעה אחרונה) ממוינים לפי חוזק יורד.
+    """
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    minima, _ = find_local_extrema(lows, order)
+    _, maxima = find_local_extrema(highs, order)
+
+    touch_index = np.concatenate([minima, maxima])
+    touch_price = np.concatenate([lows[minima], highs[maxima]])
+    if len(touch_index) == 0:
+        empty = np.array([])
+        return empty, empty.astype(int), empty, empty.astype(int)
+
+    by_price = np.argsort(touch_price)
+    touch_index, touch_price = touch_index[by_price], touch_price[by_price]
+    # עוגן לכל אשכול - קפיצה לנגיעה הראשונה שמחוץ לרוחב המותר מהעוגן הקודם
+    anchors = [0]
+    while True:
+        next_anchor = int(np.searchsorted(touch_price, touch_price[anchors[-1]] * (1 + tolerance), side='left'))
+        if next_anchor >= len(touch_price):
+            break
+        anchors.append(next_anchor)
+    cluster = np.zeros(len(touch_price), dtype=int)
+    cluster[anchors[1:]] = 1
+    cluster = np.cumsum(cluster)
+
+    weights = 0.5 ** ((len(lows) - 1 - touch_index) / half_life)
+    touches = np.bincount(cluster)
+    strength = np.bincount(cluster, weights=weights)
+    prices = np.bincount(cluster, weights=touch_price * weights) / strength
+    last_touch = np.zeros(len(touches), dtype=int)
+    np.maximum.at(last_touch, cluster, touch_index)
+
+    ranking = np.argsort(-strength, kind='stable')
+    return prices[ranking], touches[ranking], strength[ranking] / strength.max(), last_touch[ranking]
+
+
+@dataclass
+class PivotIndex:
+    """אינדקס נקודות מפנה משותף לכל זיהוי התבניות של היסטוריה אחת"""
+    highs: np.ndarray
+    lows: np.ndarray
+    positions: np.ndarray             # מיקומי נקודות ה-zig-zag
+    prices: np.ndarray
+    kinds: np.ndarray                 # 1 לשיא, 1- לשפל - מתחלפים
+    _extrema: Dict[int, Tuple[np.ndarray, np.ndarray]] = field(default_factory=dict, repr=False)
+
+    def extrema(self, order: int) -> Tuple[np.ndarray, np.ndarray]:
+        """שפלים (מ-Low) ושיאים (מ-High) מקומיים - מחושבים פעם אחת לכל order"""
+        if order not in self._extrema:
+            minima, _ = find_local_extrema(self.lows, order)
+            _, maxima = find_local_extrema(self.highs, order)
+            self._extrema[order] = (minima, maxima)
+        return self._extrema[order]
+
+
+def build_pivot_index(highs: np.ndarray, lows: np.ndarray, order: int = 5,
+                      min_swing: float = 0.03) -> PivotIndex:
+    """בניית zig-zag מהקיצונים המקומיים - מעבר ליניארי אחד על המועמדים.
+
+    שיאים ושפלים מתחלפים; שני קיצונים מאותו סוג ברצף מתאחדים לקיצוני מביניהם,
+    ותנודה קטנה מ-min_swing מהנקודה הקודמת מדולגת.
+    """
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    index = PivotIndex(highs, lows, np.array([], dtype=int), np.array([]), np.array([], dtype=int))
+    minima, maxima = index.extrema(order)
+
+    candidates = np.concatenate([minima, maxima])
+    kinds = np.concatenate([-np.ones(len(minima), dtype=int), np.ones(len(maxima), dtype=int)])
+    by_time = np.lexsort((kinds, candidates))
+    candidates, kinds = candidates[by_time], kinds[by_time]
+    candidate_prices = np.where(kinds == 1, highs[candidates], lows[candidates])
+
+    positions, prices, pivot_kinds = [], [], []
+    for position, price, kind in zip(candidates, candidate_prices, kinds):
+        if pivot_kinds and pivot_kinds[-1] == kind:
+            # אותו סוג - שומרים את הקיצוני יותר
+            if (kind == 1 and price > prices[-1]) or (kind == -1 and price < prices[-1]):
+                positions[-1], prices[-1] = position, price
+        elif not pivot_kinds or abs(price / prices[-1] - 1) >= min_swing:
+            positions.append(position)
+            prices.append(price)
+            pivot_kinds.append(kind)
+
+    index.positions = np.array(positions, dtype=int)
+    index.prices = np.array(prices, dtype=float)
+    index.kinds = np.array(pivot_kinds, dtype=int)
+    return index
+
+
+def _pivot_windows(pivots: PivotIndex, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """חלונות של size נקודות מפנה רצופות - (מחירים, מיקומים, סוג הנקודה הראשונה)"""
+    if len(pivots.positions) < size:
+        return np.empty((0, size)), np.empty((0, size), dtype=int), np.empty(0, dtype=int)
+    return (sliding_window_view(pivots.prices, size), sliding_window_view(pivots.positions, size),
+            pivots.kinds[:len(pivots.kinds) - size + 1])
+
+
+def find_head_shoulders(pivots: PivotIndex, shoulder_tolerance: float = 0.05,
+                        neckline_tolerance: float = 0.05) -> List[Tuple[str, int, int, float]]:
+    """ראש וכתפיים (ו-הפוך) על חלונות של חמש נקודות מפנה.
+
+    מחזיר רשימת (סוג, נר התחלה, נר סיום, ביטחון).
+    """
+    prices, positions, first_kinds = _pivot_windows(pivots, 5)
+    results = []
+    for kind, name in ((1, "Head and Shoulders"), (-1, "Inverse Head and Shoulders")):
+        # בתבנית ההפוכה מחפשים את אותה צורה על המחירים ההפוכים
+        window = prices * kind
+        left, neck_left, head, neck_right, right = window.T
+        shoulders = np.abs(left - right) / np.abs(head)
+        neckline = np.abs(neck_left - neck_right) / np.abs(head)
+        valid = ((first_kinds == kind) & (head > left) & (head > right) &
+                 (shoulders < shoulder_tolerance) & (neckline < neckline_tolerance))
+
+        confidence = 0.9 - 0.2 * shoulders / shoulder_tolerance - 0.2 * neckline / neckline_tolerance
+        for k in np.flatnonzero(valid):
+            results.append((name, int(positions[k, 0]), int(positions[k, -1]), float(confidence[k])))
+    return results
+
+
+def find_double_tops(pivots: PivotIndex, tolerance: float = 0.02,
+                     min_drop: float = 0.03) -> List[Tuple[str, int, int, float]]:
+    """Double Top על חלונות של שיא-שפל-שיא"""
+    prices, positions, first_kinds = _pivot_windows(pivots, 3)
+    if len(prices) == 0:
+        return []
+    first, trough, second = prices.T
+    difference = np.abs(first - second) / np.maximum(first, second)
+    valid = ((first_kinds == 1) & (difference < tolerance) &
+             (trough <= np.minimum(first, second) * (1 - min_drop)))
+    confidence = 0.6 + 0.2 * (1 - difference / tolerance)
+    return [("Double Top", int(positions[k, 0]), int(positions[k, -1]), float(confidence[k]))
+            for k in np.flatnonzero(valid)]
+
+
+def _line_fit(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """שיפוע ו-R² של קו ריבועים פחותים לכל שורה"""
+    x_centered = x - x.mean(axis=1, keepdims=True)
+    y_centered = y - y.mean(axis=1, keepdims=True)
+    sxx = (x_centered ** 2).sum(axis=1)
+    syy = (y_centered ** 2).sum(axis=1)
+    sxy = (x_centered * y_centered).sum(axis=1)
+    slope = sxy / sxx
+    # קו שטוח (פיזור אפסי עד כדי שגיאת עיגול) מותאם במדויק
+    flat = syy <= 1e-12 * (y ** 2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r_squared = np.where(flat, 1.0, sxy ** 2 / (sxx * syy))
+    return slope, r_squared
+
+
+def find_triangles_channels(pivots: PivotIndex, size: int = 6,
+                            flat_slope: float = 0.0005) -> List[Tuple[str, int, int, float]]:
+    """משולשים ותעלות מקווי מגמה על השיאים והשפלים בכל חלון של size נקודות מפנה.
+
+    השיפועים מנורמלים למחיר הממוצע (שינוי יחסי לנר). חלונות רצופים עם אותו סיווג
+    מאוחדים לתבנית אחת.
+    """
+    if size % 2:
+        raise ValueError("Window size must be even so it holds as many peaks as troughs")
+
+    prices, positions, first_kinds = _pivot_windows(pivots, size)
+    if len(prices) == 0:
+        return []
+
+    # מפרידים כל חלון לשיאים ולשפלים - הנקודות מתחלפות, אז זה פשוט כל נקודה שנייה
+    starts_with_peak = (first_kinds == 1)[:, None]
+    even, odd = prices[:, 0::2], prices[:, 1::2]
+    even_x, odd_x = positions[:, 0::2].astype(float), positions[:, 1::2].astype(float)
+    peak_prices = np.where(starts_with_peak, even, odd)
+    peak_x = np.where(starts_with_peak, even_x, odd_x)
+    trough_prices = np.where(starts_with_peak, odd, even)
+    trough_x = np.where(starts_with_peak, odd_x, even_x)
+
+    scale = prices.mean(axis=1)
+    upper_slope, upper_fit = _line_fit(peak_x, peak_prices)
+    lower_slope, lower_fit = _line_fit(trough_x, trough_prices)
+    upper_slope, lower_slope = upper_slope / scale, lower_slope / scale
+
+    upper_flat = np.abs(upper_slope) < flat_slope
+    lower_flat = np.abs(lower_slope) < flat_slope
+    parallel = np.abs(upper_slope - lower_slope) < flat_slope
+
+    names = np.array(["", "Ascending Triangle", "Descending Triangle", "Symmetrical Triangle",
+                      "Rising Channel", "Falling Channel", "Horizontal Channel"])
+    classes = np.select(
+        [upper_flat & lower_flat,
+         upper_flat & (lower_slope > flat_slope),
+         lower_flat & (upper_slope < -flat_slope),
+         (upper_slope < -flat_slope) & (lower_slope > flat_slope),
+         parallel & (lower_slope > 0),
+         parallel & (upper_slope < 0)],
+        [6, 1, 2, 3, 4, 5], default=0)
+    confidence = 0.5 + 0.4 * np.minimum(upper_fit, lower_fit)
+
+    results = []
+    k = 0
+    while k < len(classes):
+        # איחוד חלונות רצופים עם אותו סיווג
+        end = k
+        while end + 1 < len(classes) and classes[end + 1] == classes[k]:
+            end += 1
+        if classes[k]:
+            results.append((str(names[classes[k]]), int(positions[k, 0]), int(positions[end, -1]),
+                            float(confidence[k:end + 1].mean())))
+        k = end + 1
+    return results
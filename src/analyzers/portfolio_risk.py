@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from typing import Dict, Optional
+from .risk_engine import RiskEngine, BENCHMARK
+from ..config.settings import ANALYSIS_SETTINGS
+
+
+class PortfolioRisk:
+    """VaR ו-CVaR של תיק - היסטורי, פרמטרי ומונטה קרלו, ופירוק ה-VaR לרכיבים.
+
+    הפוזיציות הן שווי כספי לכל מניה (שלילי = שורט), וכל ההפסדים מוחזרים באותן יחידות כסף
+    כמספר חיובי. מטריצת התשואות, הממוצעים ומטריצת השונות נבנים פעם אחת; החלפת פוזיציות
+    מחשבת מחדש רק מכפלות וקטור-מטריצה. ה-VaR ההיסטורי משתמש רק בימים שבהם לכל הפוזיציות
+    המוחזקות יש תשואה - יום חסר שהיה נספר כאפס היה מדלל את הזנב.
+    """
+
+    def __init__(self, returns: pd.DataFrame, positions: Dict[str, float], confidence: Optional[float] = None,
+                 covariance: Optional[pd.DataFrame] = None, min_observations: int = 20):
+        settings = ANALYSIS_SETTINGS['risk']
+        self.confidence = settings['var_confidence'] if confidence is None else confidence
+        self.min_observations = min_observations
+        self.returns = returns.drop(columns=[BENCHMARK], errors='ignore')
+        self.symbols = list(self.returns.columns)
+
+        values = self.returns.to_numpy(dtype=float)
+        self._valid = np.isfinite(values)
+        self._filled = np.where(self._valid, values, 0.0)
+        with np.errstate(invalid='ignore'):
+            self._mean = np.nanmean(np.where(self._valid, values, np.nan), axis=0) if len(values) \
+                else np.full(len(self.symbols), np.nan)
+
+        if covariance is None:
+            covariance = self.returns.cov()
+        covariance = covariance.reindex(index=self.symbols, columns=self.symbols).to_numpy(dtype=float)
+        # זוג בלי מספיק תצפיות משותפות נחשב בלתי מתואם
+        self._covariance = np.where(np.isfinite(covariance), covariance, 0.0)
+        self._missing = [symbol for symbol, variance in zip(self.symbols, np.diag(covariance))
+                         if not np.isfinite(variance)]
+        self._factor = None
+
+        self.set_positions(positions)
+
+    @classmethod
+    def from_engine(cls, engine: RiskEngine, positions: Dict[str, float], **kwargs) -> 'PortfolioRisk':
+        """שימוש בתשואות המיושרות ובמטריצת השונות של מנוע הסיכון"""
+        return cls(engine.returns, positions, covariance=engine.covariance(), **kwargs)
+
+    def set_positions(self, positions: Dict[str, float]):
+        """עדכון הפוזיציות בלי לחשב מחדש את מטריצות התשואה והשונות"""
+        unknown = set(positions) - set(self.symbols)
+        if unknown:
+            raise ValueError(f"No returns for symbols: {sorted(unknown)}")
+        missing = [symbol for symbol in self._missing if positions.get(symbol)]
+        if missing:
+            raise ValueError(f"Not enough data for symbols: {missing}")
+        self.weights = np.array([float(positions.get(symbol, 0.0)) for symbol in self.symbols])
+
+    @property
+    def _z(self) -> float:
+        return NormalDist().inv_cdf(self.confidence)
+
+    @staticmethod
+    def _tail(pnl: np.ndarray, confidence: float) -> Dict[str, float]:
+        """VaR ו-CVaR מהתפלגות רווח/הפסד אמפירית"""
+        if len(pnl) == 0:
+            return {'var': np.nan, 'cvar': np.nan}
+        cutoff = np.percentile(pnl, (1 - confidence) * 100)
+        return {'var': float(-cutoff), 'cvar': float(-pnl[pnl <= cutoff].mean())}
+
+    def historical(self) -> Dict[str, float]:
+        """VaR היסטורי - שערוך התיק הנוכחי על כל יום שבו לכל הפוזיציות המוחזקות יש תשואה"""
+        complete = self._valid[:, self.weights != 0].all(axis=1)
+        if complete.sum() < self.min_observations:
+            raise ValueError(f"Not enough days with returns for all positions: {int(complete.sum())}")
+        return self._tail(self._filled[complete] @ self.weights, self.confidence)
+
+    def parametric(self) -> Dict[str, float]:
+        """VaR נורמלי (וריאנס-קווריאנס)"""
+        mean = float(np.nan_to_num(self._mean) @ self.weights)
+        sigma = float(np.sqrt(max(self.weights @ self._covariance @ self.weights, 0.0)))
+        z = self._z
+        return {
+            'var': z * sigma - mean,
+            'cvar': sigma * NormalDist().pdf(z) / (1 - self.confidence) - mean
+        }
+
+    def monte_carlo(self, n_paths: Optional[int] = None, seed: Optional[int] = None,
+                    rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
+        """VaR מסימולציה של תשואות נורמליות רב-ממדיות, במנות חסומות בזיכרון"""
+        simulation = ANALYSIS_SETTINGS['simulation']
+        n_paths = n_paths or ANALYSIS_SETTINGS['risk']['monte_carlo_paths']
+        chunk_size = simulation['chunk_size']
+        if rng is None:
+            rng = np.random.default_rng(simulation['seed'] if seed is None else seed)
+
+        if self._factor is None:
+            # פירוק עצמי במקום Cholesky - מטריצה מזוגות תקינים אינה בהכרח חיובית למחצה
+            eigenvalues, eigenvectors = np.linalg.eigh(self._covariance)
+            self._factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+
+        # רק ההטלה של הגורמים על הפוזיציות נדרשת: pnl = mean + z @ (factor.T @ w)
+        loadings = self._factor.T @ self.weights
+        mean = float(np.nan_to_num(self._mean) @ self.weights)
+        pnl = np.empty(n_paths)
+        for start in range(0, n_paths, chunk_size):
+            size = min(chunk_size, n_paths - start)
+            pnl[start:start + size] = rng.standard_normal((size, len(loadings))) @ loadings + mean
+        return self._tail(pnl, self.confidence)
+
+    def components(self) -> pd.DataFrame:
+        """VaR שולי ותרומת כל מניה ל-VaR הפרמטרי - סכום התרומות שווה ל-VaR (ללא הממוצע)"""
+        exposure = self._covariance @ self.weights
+        sigma = float(np.sqrt(max(self.weights @ exposure, 0.0)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            marginal = self._z * exposure / sigma
+        component = self.weights * marginal
+        total = component.sum()
+        return pd.DataFrame({
+            'position': self.weights,
+            'marginal_var': marginal,
+            'component_var': component,
+            'contribution': component / total if total else np.nan
+        }, index=self.symbols)
+
+    def summary(self, n_paths: Optional[int] = None, seed: Optional[int] = None) -> Dict[str, float]:
+        """כל מדדי ה-VaR וה-CVaR של התיק"""
+        results = {'value': float(self.weights.sum())}
+        for name, values in (('historical', self.historical()),
+                             ('parametric', self.parametric()),
+                             ('monte_carlo', self.monte_carlo(n_paths, seed))):
+            results[f'{name}_var'] = values['var']
+            results[f'{name}_cvar'] = values['cvar']
+        return results
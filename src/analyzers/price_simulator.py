@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Optional, Sequence
+from ..config.settings import ANALYSIS_SETTINGS
+
+SIMULATION_METHODS = ('gbm', 'bootstrap')
+RANGE_SIGMAS = 8.0                    # רוחב טווח ההיסטוגרמה בכל יום, בסטיות תקן של התשואה המצטברת
+
+
+@dataclass
+class SimulationResult:
+    """תוצאת סימולציה - רצועות מחיר לפי קוונטילים לכל יום בטווח"""
+    last_price: float
+    method: str
+    n_paths: int
+    bands: pd.DataFrame               # שורה לכל יום (1..horizon), עמודה לכל קוונטיל
+
+    @property
+    def horizon(self) -> int:
+        return len(self.bands)
+
+    def band(self, step: int, quantile: float) -> float:
+        """מחיר הקוונטיל ביום נתון"""
+        return float(self.bands.at[step, quantile])
+
+
+def _gbm_chunk(log_returns: np.ndarray, size: int, horizon: int, rng: np.random.Generator) -> np.ndarray:
+    """תנועה בראונית גיאומטרית - סחף ותנודתיות מהתשואות הלוגריתמיות ההיסטוריות"""
+    drift = log_returns.mean()
+    sigma = log_returns.std(ddof=1)
+    steps = rng.standard_normal((size, horizon), dtype=np.float32)
+    steps *= sigma
+    steps += drift
+    return steps
+
+
+def _bootstrap_chunk(log_returns: np.ndarray, size: int, horizon: int, rng: np.random.Generator,
+                     block_size: int) -> np.ndarray:
+    """בוטסטרפ בבלוקים - רצפים של תשואות היסטוריות, שומר על תלות קצרת טווח"""
+    block_size = max(1, min(block_size, len(log_returns)))
+    n_blocks = -(-horizon // block_size)
+    starts = rng.integers(0, len(log_returns) - block_size + 1, size=(size, n_blocks))
+    positions = (starts[:, :, None] + np.arange(block_size)).reshape(size, -1)[:, :horizon]
+    return log_returns.astype(np.float32)[positions]
+
+
+def _step_ranges(log_returns: np.ndarray, horizon: int, bins: int):
+    """גבול תחתון ורוחב עמודה של היסטוגרמת התשואה המצטברת בכל יום.
+
+    הטווח קבוע מראש (סחף ± RANGE_SIGMAS סטיות תקן), כך שכל המנות נספרות לאותן עמודות;
+    מסלולים מחוץ לטווח נספרים בעמודת הקצה.
+    """
+    days = np.arange(1, horizon + 1)
+    half_width = RANGE_SIGMAS * max(log_returns.std(ddof=1), 1e-8) * np.sqrt(days)
+    return log_returns.mean() * days - half_width, 2 * half_width / bins
+
+
+def _histogram_quantiles(counts: np.ndarray, low: np.ndarray, width: np.ndarray,
+                         quantiles: Sequence[float]) -> np.ndarray:
+    """קוונטילים מהיסטוגרמה לכל יום - אינטרפולציה ליניארית בתוך העמודה. מחזיר (quantiles, horizon)"""
+    cdf = np.cumsum(counts, axis=1)
+    targets = np.asarray(quantiles) * cdf[:, -1:]                      # (horizon, quantiles)
+    levels = np.empty((len(quantiles), len(counts)))
+    for step, (row, target) in enumerate(zip(cdf, targets)):
+        bins = np.minimum(np.searchsorted(row, target), row.size - 1)
+        before = np.where(bins > 0, row[bins - 1], 0)
+        fraction = (target - before) / np.maximum(row[bins] - before, 1)
+        levels[:, step] = low[step] + (bins + fraction) * width[step]
+    return levels
+
+
+def simulate_prices(closes: pd.Series, horizon: Optional[int] = None, n_paths: Optional[int] = None,
+                    method: Optional[str] = None, quantiles: Optional[Sequence[float]] = None,
+                    seed: Optional[int] = None, rng: Optional[np.random.Generator] = None,
+                    block_size: Optional[int] = None, chunk_size: Optional[int] = None,
+                    bins: Optional[int] = None) -> SimulationResult:
+    """סימולציית מונטה קרלו של מסלולי מחיר ל-horizon ימים קדימה.
+
+    המסלולים נבנים במנות של chunk_size וכל מנה מצטמצמת מיד להיסטוגרמה של התשואה המצטברת בכל יום
+    (horizon × bins מונים), שממנה מחושבים הקוונטילים. הזיכרון חסום ע"י chunk_size ו-bins ואינו
+    תלוי ב-n_paths; דיוק הקוונטיל הוא בתוך עמודה אחת.
+    """
+    settings = ANALYSIS_SETTINGS['simulation']
+    horizon = horizon or settings['horizon']
+    n_paths = n_paths or settings['n_paths']
+    method = method or settings['method']
+    quantiles = sorted(set(quantiles or settings['quantiles']) | {0.5})
+    block_size = block_size or settings['block_size']
+    chunk_size = chunk_size or settings['chunk_size']
+    bins = bins or settings['bins']
+    if rng is None:
+        rng = np.random.default_rng(settings['seed'] if seed is None else seed)
+
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Unknown simulation method: {method}")
+
+    prices = closes.dropna().to_numpy(dtype=float)
+    log_returns = np.diff(np.log(prices))
+    log_returns = log_returns[np.isfinite(log_returns)]
+    if len(log_returns) < 2:
+        raise ValueError("Not enough data for simulation")
+
+    low, width = _step_ranges(log_returns, horizon, bins)
+    offsets = np.arange(horizon) * bins
+    counts = np.zeros(horizon * bins, dtype=np.int64)
+    for start in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - start)
+        if method == 'gbm':
+            steps = _gbm_chunk(log_returns, size, horizon, rng)
+        else:
+            steps = _bootstrap_chunk(log_returns, size, horizon, rng, block_size)
+        np.cumsum(steps, axis=1, out=steps)
+        cells = np.clip(((steps - low) / width).astype(np.int64), 0, bins - 1)
+        counts += np.bincount((cells + offsets).ravel(), minlength=horizon * bins)
+
+    last_price = float(prices[-1])
+    levels = _histogram_quantiles(counts.reshape(horizon, bins), low, width, quantiles)
+    bands = pd.DataFrame(last_price * np.exp(levels.T),
+                         index=pd.RangeIndex(1, horizon + 1, name='step'), columns=quantiles)
+    return SimulationResult(last_price=last_price, method=method, n_paths=n_paths, bands=bands)
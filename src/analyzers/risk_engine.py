@@ -0,0 +1,239 @@
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+from numpy.lib.stride_tricks import sliding_window_view
+from .indicator_engine import rolling_mean
+from ..config.settings import ANALYSIS_SETTINGS, PANEL_SETTINGS
+
+TRADING_DAYS_PER_YEAR = 252
+BENCHMARK = '__benchmark__'
+
+
+def trading_days(index: pd.Index) -> pd.DatetimeIndex:
+    """המרת אינדקס (עם או בלי אזור זמן) לתאריכי מסחר נאיביים"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
+def align_closes(closes: Dict[str, pd.Series], calendar: pd.DatetimeIndex) -> pd.DataFrame:
+    """יישור מחירי סגירה על לוח המסחר - יום בלי מסחר נשאר NaN"""
+    aligned = {}
+    for symbol, series in closes.items():
+        series = pd.Series(series.to_numpy(dtype=float), index=trading_days(series.index))
+        # סדרה שכבר על הלוח (למשל מדד הייחוס שממנו נבנה הלוח) לא עוברת reindex
+        aligned[symbol] = series if series.index.equals(calendar) else \
+            series[~series.index.duplicated(keep='last')].reindex(calendar)
+    return pd.DataFrame(aligned, index=calendar)
+
+
+def rolling_risk(returns: pd.Series, market_returns: Optional[pd.Series] = None, window: int = None,
+                 risk_free_rate: float = None, var_confidence: float = None) -> pd.DataFrame:
+    """סדרות סיכון מתגלגלות - בטא, שארפ, תנודתיות, מקסימום דרודאון ו-VaR היסטורי.
+
+    המומנטים מחושבים ב-O(n) מסכומים מצטברים, ה-VaR מ-rolling quantile של pandas
+    (skip list, O(n log w)). חלון שמכיל תשואה חסרה מקבל NaN.
+    """
+    settings = ANALYSIS_SETTINGS['risk']
+    window = window or settings['rolling_window']
+    risk_free_rate = settings['risk_free_rate'] if risk_free_rate is None else risk_free_rate
+    var_confidence = settings['var_confidence'] if var_confidence is None else var_confidence
+
+    x = returns.to_numpy(dtype=float)
+    y = np.full(len(x), np.nan) if market_returns is None else \
+        market_returns.reindex(returns.index).to_numpy(dtype=float)
+    n = len(x)
+    correction = window / (window - 1)
+
+    def mean(values):
+        return rolling_mean(values, window, np.empty(n))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x, mean_y = mean(x), mean(y)
+        variance_x = np.maximum(mean(x * x) - mean_x ** 2, 0) * correction
+        variance_y = np.maximum(mean(y * y) - mean_y ** 2, 0) * correction
+        covariance = (mean(x * y) - mean_x * mean_y) * correction
+        std_x = np.sqrt(variance_x)
+
+        beta = covariance / variance_y
+        sharpe = np.sqrt(TRADING_DAYS_PER_YEAR) * (mean_x - risk_free_rate / TRADING_DAYS_PER_YEAR) / std_x
+        volatility = std_x * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    # דרודאון בכל חלון: לוג ערך ההשקעה יחסית לשיא המצטבר בתוך החלון
+    max_drawdown = np.full(n, np.nan)
+    if n >= window:
+        log_wealth = np.concatenate([[0.0], np.cumsum(np.log1p(np.nan_to_num(x)))])
+        paths = sliding_window_view(log_wealth, window + 1)
+        drawdowns = paths - np.maximum.accumulate(paths, axis=1)
+        max_drawdown[window - 1:] = np.expm1(drawdowns.min(axis=1))
+        max_drawdown += mean(np.where(np.isfinite(x), 0.0, np.nan))
+
+    var = returns.rolling(window).quantile(1 - var_confidence).to_numpy()
+
+    return pd.DataFrame({
+        'beta': beta,
+        'sharpe': sharpe,
+        'volatility': volatility,
+        'max_drawdown': max_drawdown,
+        'var_95': var
+    }, index=returns.index)
+
+
+def market_breadth(panel, ma_window: Optional[int] = None, start=None, end=None,
+                   exclude: Iterable[str] = ()) -> pd.DataFrame:
+    """רוחב שוק יומי מפאנל המחירים - עולות, יורדות, קו עליות-ירידות ואחוז המניות מעל הממוצע הנע"""
+    ma_window = ma_window or PANEL_SETTINGS['breadth_ma_window']
+    rows = panel.rows(start, end)
+    first = max(rows.start, 1)
+    included = ~np.isin(panel.symbols, list(exclude))
+
+    returns, _ = panel.returns(start, end)
+    returns = returns[:, included]
+    # יום בלי מסחר נושא את הסגירה הקודמת; הממוצע הנע על כל ההיסטוריה, כדי שתחילת הטווח לא תתקצר
+    closes = pd.DataFrame(panel.field('Close')[:, included]).ffill().to_numpy()
+    moving_average = rolling_mean(closes, ma_window, np.empty_like(closes))[first:rows.stop]
+    closes = closes[first:rows.stop]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        advancers = (returns > 0).sum(axis=1)
+        decliners = (returns < 0).sum(axis=1)
+        has_average = np.isfinite(moving_average) & np.isfinite(closes)
+        above = (closes > moving_average) & has_average
+        pct_above = np.where(has_average.any(axis=1), above.sum(axis=1) / has_average.sum(axis=1), np.nan)
+
+    return pd.DataFrame({
+        'advancers': advancers,
+        'decliners': decliners,
+        'unchanged': (returns == 0).sum(axis=1),
+        'advance_decline_line': np.cumsum(advancers - decliners),
+        'pct_above_ma': pct_above
+    }, index=panel.calendar[first:rows.stop])
+
+
+class RiskEngine:
+    """מדדי סיכון לכל היקום בכמה פעולות מטריצה על תשואות מיושרות.
+
+    לוח המסחר הוא ימי המסחר של מדד הייחוס (ימי המסחר בבורסת תל אביב), אלא אם הועבר לוח אחר.
+    תשואה קיימת רק כשיש מחיר גם ביום וגם ביום המסחר הקודם; אחרת היא חסרה ומסומנת ב-mask,
+    וכל המומנטים מחושבים על זוגות תצפיות תקינים בלבד.
+    """
+
+    def __init__(self, closes: pd.DataFrame, benchmark: pd.Series, risk_free_rate: float = None,
+                 var_confidence: float = None, min_observations: int = 20):
+        settings = ANALYSIS_SETTINGS['risk']
+        self.risk_free_rate = settings['risk_free_rate'] if risk_free_rate is None else risk_free_rate
+        self.var_confidence = settings['var_confidence'] if var_confidence is None else var_confidence
+        self.min_observations = min_observations
+
+        prices = closes.copy()
+        prices[BENCHMARK] = benchmark.reindex(closes.index)
+        self.returns = prices / prices.shift(1) - 1
+        self.returns = self.returns.iloc[1:]
+        self.symbols = list(closes.columns)
+
+        self._values = self.returns.to_numpy(dtype=float)
+        self.mask = np.isfinite(self._values)
+        self._filled = np.where(self.mask, self._values, 0.0)
+
+    @classmethod
+    def from_histories(cls, histories: Dict[str, pd.DataFrame], benchmark_hist: pd.DataFrame,
+                       calendar: Optional[pd.DatetimeIndex] = None, **kwargs) -> 'RiskEngine':
+        """בניית המנוע מטבלאות היסטוריה של yfinance"""
+        calendar = trading_days(benchmark_hist.index) if calendar is None else trading_days(calendar)
+        calendar = calendar[~calendar.duplicated()]
+        closes = align_closes({symbol: hist['Close'] for symbol, hist in histories.items()}, calendar)
+        benchmark = align_closes({BENCHMARK: benchmark_hist['Close']}, calendar)[BENCHMARK]
+        return cls(closes, benchmark, **kwargs)
+
+    @classmethod
+    def from_panel(cls, panel, benchmark_symbol: Optional[str] = None, start=None, end=None,
+                   symbols: Optional[Iterable[str]] = None, **kwargs) -> 'RiskEngine':
+        """בניית המנוע מפאנל המחירים המשותף - הסגירות כבר מיושרות על לוח המסחר"""
+        benchmark_symbol = benchmark_symbol or ANALYSIS_SETTINGS['risk']['beta_market_index']
+        available = set(panel.symbols)
+        symbols = [symbol for symbol in (panel.symbols if symbols is None else symbols)
+                   if symbol != benchmark_symbol and symbol in available]
+        closes = panel.frame('Close', start, end, symbols)
+        benchmark = panel.frame('Close', start, end, [benchmark_symbol])[benchmark_symbol]
+        return cls(closes, benchmark, **kwargs)
+
+    def _pairwise_moments(self):
+        """מספר תצפיות, סכומים וסכומי ריבועים לכל זוג עמודות - על השורות התקינות בשתיהן"""
+        valid = self.mask.astype(float)
+        counts = valid.T @ valid
+        sums = self._filled.T @ valid                   # [i, j] = סכום i בשורות שבהן j תקין
+        squares = (self._filled ** 2).T @ valid
+        products = self._filled.T @ self._filled
+        return counts, sums, squares, products
+
+    def covariance(self) -> pd.DataFrame:
+        """מטריצת שונות משותפת מלאה (כולל מדד הייחוס), על זוגות תצפיות תקינים"""
+        counts, sums, _, products = self._pairwise_moments()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = (products - sums * sums.T / counts) / (counts - 1)
+        covariance[counts < self.min_observations] = np.nan
+        columns = list(self.returns.columns)
+        return pd.DataFrame(covariance, index=columns, columns=columns)
+
+    def correlation(self) -> pd.DataFrame:
+        """מטריצת מתאמים מלאה, על זוגות תצפיות תקינים"""
+        counts, sums, squares, products = self._pairwise_moments()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            covariance = products - sums * sums.T / counts
+            variance = squares - sums ** 2 / counts           # [i, j] = שונות i בשורות שבהן j תקין
+            correlation = covariance / np.sqrt(variance * variance.T)
+        correlation[counts < self.min_observations] = np.nan
+        columns = list(self.returns.columns)
+        return pd.DataFrame(correlation, index=columns, columns=columns)
+
+    def rolling_metrics(self, symbol: str, window: int = None) -> pd.DataFrame:
+        """סדרות סיכון מתגלגלות למניה אחת, על התשואות המיושרות"""
+        return rolling_risk(self.returns[symbol], self.returns[BENCHMARK], window,
+                            self.risk_free_rate, self.var_confidence)
+
+    def metrics(self) -> pd.DataFrame:
+        """בטא, שארפ, תנודתיות, מקסימום דרודאון ו-VaR לכל מניה"""
+        b = len(self.symbols)                                # עמודת מדד הייחוס היא האחרונה
+        # רק המומנטים מול עמודת מדד הייחוס - O(S·T) במקום המטריצות המלאות
+        valid = self.mask[:, :b].astype(float)
+        filled = self._filled[:, :b]
+        benchmark_valid = self.mask[:, b].astype(float)
+        benchmark = self._filled[:, b]
+
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            # עמודה בלי תצפיות מקבלת NaN - אין צורך באזהרה
+            warnings.simplefilter('ignore', RuntimeWarning)
+            n = benchmark_valid @ valid
+            stock_sums = benchmark_valid @ filled            # סכום המניה בשורות שבהן המדד תקין
+            benchmark_sums = benchmark @ valid               # סכום המדד בשורות שבהן המניה תקינה
+            covariance = (benchmark @ filled - stock_sums * benchmark_sums / n) / (n - 1)
+            benchmark_variance = ((benchmark ** 2) @ valid - benchmark_sums ** 2 / n) / (n - 1)
+            beta = covariance / benchmark_variance
+
+            values = self._values[:, :b]
+            observations = self.mask[:, :b].sum(axis=0)
+            mean = np.nanmean(values, axis=0)
+            std = np.nanstd(values, axis=0, ddof=1)
+            sharpe = np.sqrt(TRADING_DAYS_PER_YEAR) * (mean - self.risk_free_rate / TRADING_DAYS_PER_YEAR) / std
+            volatility = std * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+            # יום חסר הוא יום ללא שינוי בערך ההשקעה
+            wealth = np.cumprod(1 + self._filled[:, :b], axis=0)
+            drawdowns = wealth / np.maximum.accumulate(wealth, axis=0) - 1
+            max_drawdown = drawdowns.min(axis=0) if len(wealth) else np.full(b, np.nan)
+
+            var = np.nanpercentile(values, (1 - self.var_confidence) * 100, axis=0) if len(values) \
+                else np.full(b, np.nan)
+
+        table = pd.DataFrame({
+            'beta': np.where(n >= self.min_observations, beta, np.nan),
+            'sharpe': sharpe,
+            'volatility': volatility,
+            'max_drawdown': max_drawdown,
+            'var_95': var,
+            'observations': observations
+        }, index=self.symbols)
+        table.loc[observations < self.min_observations, ['sharpe', 'volatility', 'max_drawdown', 'var_95']] = np.nan
+        return table
@@ -0,0 +1,313 @@
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .analysis_snapshot import AnalysisSnapshot
+
+# ==== שפת השאילתות ====
+# expr       := and_expr ('or' and_expr)*
+# and_expr   := not_expr ('and' not_expr)*
+# not_expr   := 'not' not_expr | comparison
+# comparison := sum (('<' | '<=' | '>' | '>=' | '==' | '!=') sum)?
+# sum        := term (('+' | '-') term)*
+# term       := factor (('*' | '/') factor)*
+# factor     := NUMBER | NAME | '(' expr ')' | '-' factor
+
+_TOKEN = re.compile(r'\s*(?:(\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+)|([A-Za-z_][A-Za-z0-9_]*)|(<=|>=|==|!=|[<>()+\-*/]))')
+_KEYWORDS = {'and', 'or', 'not'}
+_COMPARISONS = {
+    '<': np.less, '<=': np.less_equal, '>': np.greater,
+    '>=': np.greater_equal, '==': np.equal, '!=': np.not_equal
+}
+_ARITHMETIC = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+
+Columns = Dict[str, np.ndarray]
+Node = Callable[[Columns], np.ndarray]
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    """פירוק לאסימונים: (kind, text) כאשר kind הוא number/name/keyword/op"""
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Invalid query near: {expression[position:position + 10]!r}")
+        number, name, op = match.groups()
+        if number is not None:
+            tokens.append(('number', number))
+        elif name is not None:
+            tokens.append(('keyword' if name.lower() in _KEYWORDS else 'name',
+                           name.lower() if name.lower() in _KEYWORDS else name))
+        else:
+            tokens.append(('op', op))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """מפענח recursive descent שמתרגם את השאילתה לעץ של פונקציות numpy - בלי eval"""
+
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+        self.names: List[str] = []
+
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _accept(self, kind: str, *texts: str) -> Optional[str]:
+        token_kind, text = self._peek()
+        if token_kind == kind and (not texts or text in texts):
+            self.position += 1
+            return text
+        return None
+
+    def parse(self) -> Node:
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected token: {self._peek()[1]!r}")
+        return node
+
+    def _or(self) -> Node:
+        node = self._and()
+        while self._accept('keyword', 'or'):
+            node = self._binary(np.logical_or, node, self._and())
+        return node
+
+    def _and(self) -> Node:
+        node = self._not()
+        while self._accept('keyword', 'and'):
+            node = self._binary(np.logical_and, node, self._not())
+        return node
+
+    def _not(self) -> Node:
+        if self._accept('keyword', 'not'):
+            operand = self._not()
+            return lambda columns: np.logical_not(operand(columns))
+        return self._comparison()
+
+    def _comparison(self) -> Node:
+        node = self._sum()
+        op = self._accept('op', *_COMPARISONS)
+        if op:
+            # NaN בהשוואה נותן False, כמו ב-numpy - מניה בלי ערך לא עוברת את הסינון
+            node = self._binary(_COMPARISONS[op], node, self._sum())
+        return node
+
+    def _sum(self) -> Node:
+        node = self._term()
+        while True:
+            op = self._accept('op', '+', '-')
+            if not op:
+                return node
+            node = self._binary(_ARITHMETIC[op], node, self._term())
+
+    def _term(self) -> Node:
+        node = self._factor()
+        while True:
+            op = self._accept('op', '*', '/')
+            if not op:
+                return node
+            node = self._binary(_ARITHMETIC[op], node, self._factor())
+
+    def _factor(self) -> Node:
+        number = self._accept('number')
+        if number is not None:
+            value = float(number)
+            return lambda columns: value
+        name = self._accept('name')
+        if name is not None:
+            self.names.append(name)
+            return lambda columns: columns[name]
+        if self._accept('op', '-'):
+            operand = self._factor()
+            return lambda columns: np.negative(operand(columns))
+        if self._accept('op', '('):
+            node = self._or()
+            if not self._accept('op', ')'):
+                raise ValueError("Missing closing parenthesis")
+            return node
+        if self._peek()[0] is None:
+            raise ValueError("Unexpected end of query")
+        raise ValueError(f"Unexpected token: {self._peek()[1]!r}")
+
+    @staticmethod
+    def _binary(function, left: Node, right: Node) -> Node:
+        return lambda columns: function(left(columns), right(columns))
+
+
+@lru_cache(maxsize=256)
+def compile_query(expression: str) -> Tuple[Node, Tuple[str, ...]]:
+    """הידור שאילתה לפונקציה שמחזירה מסכה, ורשימת העמודות שהיא צריכה"""
+    parser = _Parser(expression)
+    node = parser.parse()
+    return node, tuple(dict.fromkeys(parser.names))
+
+
+def parse_sort(sort: Optional[str]) -> List[Tuple[str, bool]]:
+    """'score desc, RSI' או '-score, RSI' -> [(column, descending)]"""
+    keys = []
+    for part in (sort or '').split(','):
+        words = part.split()
+        if not words:
+            continue
+        column, descending = words[0], False
+        if column.startswith('-'):
+            column, descending = column[1:], True
+        if len(words) > 1:
+            if words[1].lower() not in ('asc', 'desc') or len(words) > 2:
+                raise ValueError(f"Invalid sort key: {part.strip()!r}")
+            descending = words[1].lower() == 'desc'
+        keys.append((column, descending))
+    return keys
+
+
+class Screener:
+    """טבלת עמודות של הערכים האחרונים לכל מניה (אינדיקטורים, סיכון, ציון ויסודות) ושאילתות עליה.
+
+    כל עמודה היא מערך float אחד; שורה לכל מניה. עדכון מניה מחליף את השורה שלה רק אם
+    טביעת האצבע של הנתונים השתנתה, כך שרענון היקום אחרי נר חדש נוגע רק במניות שהתעדכנו.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._capacity = capacity
+        self._size = 0
+        self._symbols = np.empty(capacity, dtype=object)
+        self._columns: Columns = {}
+        self._rows: Dict[str, int] = {}
+        self._fingerprints: Dict[str, tuple] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols[:self._size])
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._columns[name] = np.full(self._capacity, np.nan)
+        return self._columns[name]
+
+    def _row(self, symbol: str) -> int:
+        """שורת המניה - הוספה בסוף והכפלת הקיבולת לפי הצורך"""
+        row = self._rows.get(symbol)
+        if row is not None:
+            return row
+        if self._size == self._capacity:
+            self._capacity *= 2
+            self._symbols = np.resize(self._symbols, self._capacity)
+            for name, values in self._columns.items():
+                grown = np.full(self._capacity, np.nan)
+                grown[:self._size] = values[:self._size]
+                self._columns[name] = grown
+        row = self._size
+        self._symbols[row] = symbol
+        self._rows[symbol] = row
+        self._size += 1
+        return row
+
+    def upsert(self, symbol: str, values: Dict[str, Optional[float]], fingerprint: Optional[tuple] = None) -> bool:
+        """עדכון או הוספת מניה; מחזיר False אם טביעת האצבע לא השתנתה"""
+        if fingerprint is not None and self._fingerprints.get(symbol) == fingerprint:
+            return False
+        row = self._row(symbol)
+        for name, value in values.items():
+            self._column(name)[row] = np.nan if value is None else value
+        if fingerprint is not None:
+            self._fingerprints[symbol] = fingerprint
+        return True
+
+    def upsert_snapshot(self, snapshot: AnalysisSnapshot, extra: Optional[Dict[str, float]] = None) -> bool:
+        """עדכון מניה מתמונת המצב של הניתוח; extra (למשל מדדי יסוד) נכנס גם לטביעת האצבע"""
+        values = {'close': snapshot.last_close, 'score': snapshot.score.get('ציון_סופי')}
+        values.update(snapshot.indicators)
+        values.update(snapshot.risk_metrics)
+        values.update(extra or {})
+        fingerprint = snapshot.fingerprint + (tuple(sorted(extra.items())),) if extra else snapshot.fingerprint
+        return self.upsert(snapshot.symbol, values, fingerprint)
+
+    def refresh(self, analyzers: Iterable) -> int:
+        """רענון מרשימת מנתחים - רק מניות שהנתונים שלהן השתנו נבנות מחדש; מחזיר כמה עודכנו"""
+        updated = 0
+        for analyzer in analyzers:
+            if analyzer.hist is None or len(analyzer.hist) == 0:
+                continue
+            updated += self.upsert_snapshot(analyzer.snapshot(), analyzer.fundamental_metrics)
+        return updated
+
+    def update_columns(self, frame: pd.DataFrame):
+        """עדכון עמודות שלמות מטבלה שהאינדקס שלה הוא סימולים (למשל נתוני יסוד לכל המניות)"""
+        rows = np.array([self._row(symbol) for symbol in frame.index], dtype=int)
+        for name in frame.columns:
+            values = pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=float)
+            self._column(name)[rows] = values
+
+    def update_from_panel(self, panel, fields: Iterable[str] = ('Open', 'High', 'Low', 'Close', 'Volume'),
+                          symbols: Optional[Iterable[str]] = None):
+        """עדכון הערכים האחרונים מפאנל המחירים, בפעולה אחת לכל עמודה - לכל מניות הפאנל או רק ל-symbols"""
+        latest = panel.latest(fields).rename(columns=str.lower)
+        if symbols is not None:
+            latest = latest[latest.index.isin(list(symbols))]
+        self.update_columns(latest)
+
+    def remove(self, symbol: str):
+        """הסרת מניה - השורה האחרונה עוברת למקומה"""
+        row = self._rows.pop(symbol)
+        self._fingerprints.pop(symbol, None)
+        last = self._size - 1
+        if row != last:
+            moved = self._symbols[last]
+            self._symbols[row] = moved
+            self._rows[moved] = row
+            for values in self._columns.values():
+                values[row] = values[last]
+        self._symbols[last] = None
+        for values in self._columns.values():
+            values[last] = np.nan
+        self._size = last
+
+    def query(self, where: Optional[str] = None, sort: Optional[str] = None, limit: Optional[int] = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """סינון, מיון והגבלה, למשל: query('RSI < 30 and ADX > 25 and close > BBANDS_Lower', '-score', 20)"""
+        view = {name: values[:self._size] for name, values in self._columns.items()}
+
+        if where:
+            node, names = compile_query(where)
+            unknown = [name for name in names if name not in view]
+            if unknown:
+                raise ValueError(f"Unknown columns in query: {unknown}")
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mask = np.broadcast_to(np.asarray(node(view), dtype=bool), (self._size,))
+            rows = np.flatnonzero(mask)
+        else:
+            rows = np.arange(self._size)
+
+        keys = parse_sort(sort)
+        unknown = [name for name, _ in keys if name not in view]
+        if unknown:
+            raise ValueError(f"Unknown sort columns: {unknown}")
+        if keys and len(rows):
+            # lexsort - המפתח האחרון הוא הראשי; NaN תמיד בסוף
+            sort_keys = []
+            for name, descending in reversed(keys):
+                values = view[name][rows]
+                sort_keys.append(-values if descending else values)
+                sort_keys.append(np.isnan(values))
+            rows = rows[np.lexsort(sort_keys)]
+
+        if limit is not None:
+            rows = rows[:limit]
+
+        selected = columns or list(view)
+        unknown = [name for name in selected if name not in view]
+        if unknown:
+            raise ValueError(f"Unknown columns: {unknown}")
+        return pd.DataFrame({name: view[name][rows] for name in selected},
+                            index=pd.Index(self._symbols[rows], name='symbol'))
@@ -0,0 +1,186 @@
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from .risk_engine import align_closes, trading_days, TRADING_DAYS_PER_YEAR
+from ..config.settings import SECTOR_SETTINGS, SECTOR_INDEX_FILE
+
+logger = logging.getLogger(__name__)
+
+
+def _chain_levels(previous: np.ndarray, returns: np.ndarray, base: float) -> np.ndarray:
+    """שרשור תשואות יומיות לרמות מדד; סקטור שעוד לא התחיל נשאר NaN עד התשואה התקינה הראשונה"""
+    started = np.logical_or.accumulate(np.isfinite(returns), axis=0) | np.isfinite(previous)
+    growth = np.cumprod(1 + np.nan_to_num(returns), axis=0)
+    start_level = np.where(np.isfinite(previous), previous, base)
+    return np.where(started, start_level * growth, np.nan)
+
+
+class SectorIndex:
+    """מדדי סקטור ממניות היקום - שקלול לפי שווי שוק או שקלול שווה.
+
+    תשואת הסקטור ביום היא ממוצע משוקלל של תשואות המניות שנסחרו בו, במכפלה אחת של מטריצת
+    התשואות במטריצת השיוך לסקטורים. משקל שווי השוק הוא מספר המניות כפול הסגירה הקודמת.
+    עדכון מוסיף רק ימים חדשים; שינוי ברכב המניות בונה את המדדים מחדש.
+    """
+
+    def __init__(self, weighting: Optional[str] = None):
+        self.weighting = weighting or SECTOR_SETTINGS['weighting']
+        if self.weighting not in ('cap', 'equal'):
+            raise ValueError(f"Unknown weighting: {self.weighting}")
+        self.sectors: Dict[str, str] = {}
+        self.shares: Dict[str, float] = {}
+        self.closes = pd.DataFrame()
+        self.levels = pd.DataFrame()
+
+    def set_constituents(self, sectors: Dict[str, str], market_caps: Optional[Dict[str, float]] = None,
+                         histories: Optional[Dict[str, pd.DataFrame]] = None):
+        """הגדרת השיוך לסקטורים ושווי השוק; מספר המניות נגזר משווי השוק ומהסגירה האחרונה"""
+        sectors = {symbol: sector for symbol, sector in sectors.items() if sector}
+        changed = sectors != self.sectors
+        self.sectors = sectors
+
+        if self.weighting == 'cap' and market_caps:
+            for symbol, cap in market_caps.items():
+                hist = (histories or {}).get(symbol)
+                if hist is not None and len(hist) and cap:
+                    self.shares[symbol] = float(cap) / float(hist['Close'].iloc[-1])
+
+        if changed:
+            self.closes = pd.DataFrame()
+            self.levels = pd.DataFrame()
+
+    def _weights(self, previous_close: np.ndarray, symbols) -> np.ndarray:
+        if self.weighting == 'equal':
+            return np.ones_like(previous_close)
+        shares = np.array([self.shares.get(symbol, np.nan) for symbol in symbols])
+        return previous_close * shares
+
+    def update(self, histories: Dict[str, pd.DataFrame]) -> int:
+        """הוספת הימים שאחרי היום האחרון במדדים; מחזיר כמה ימים נוספו"""
+        symbols = sorted(symbol for symbol in self.sectors if symbol in histories)
+        if not symbols:
+            return 0
+        if list(self.closes.columns) != symbols:
+            self.closes = pd.DataFrame(columns=symbols, dtype=float)
+            self.levels = pd.DataFrame()
+
+        calendar = pd.DatetimeIndex(sorted(set().union(*(trading_days(histories[s].index) for s in symbols))))
+        if len(self.closes):
+            calendar = calendar[calendar > self.closes.index[-1]]
+        if len(calendar) == 0:
+            return 0
+
+        return self._append(align_closes({symbol: histories[symbol]['Close'] for symbol in symbols}, calendar))
+
+    def update_from_panel(self, panel) -> int:
+        """הוספת הימים החדשים מפאנל המחירים המשותף - הסגירות כבר מיושרות, בלי reindex לכל מניה"""
+        symbols = sorted(symbol for symbol in self.sectors if symbol in set(panel.symbols))
+        if not symbols:
+            return 0
+        if list(self.closes.columns) != symbols:
+            self.closes = pd.DataFrame(columns=symbols, dtype=float)
+            self.levels = pd.DataFrame()
+
+        start = self.closes.index[-1] + pd.Timedelta(days=1) if len(self.closes) else None
+        new_closes = panel.frame('Close', start, symbols=symbols)
+        if new_closes.empty:
+            return 0
+        return self._append(new_closes)
+
+    def _append(self, new_closes: pd.DataFrame) -> int:
+        """שרשור רמות המדדים על ימים חדשים; העמודות הן המניות ב-self.closes"""
+        symbols = list(new_closes.columns)
+        calendar = new_closes.index
+        history = pd.concat([self.closes.tail(1), new_closes]) if len(self.closes) else new_closes
+        previous = history.ffill().shift(1).iloc[-len(new_closes):].to_numpy(dtype=float)
+        current = new_closes.to_numpy(dtype=float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = current / previous - 1
+        weights = self._weights(previous, symbols)
+        valid = np.isfinite(returns) & np.isfinite(weights) & (weights > 0)
+        weights = np.where(valid, weights, 0.0)
+
+        sector_names = sorted(set(self.sectors[symbol] for symbol in symbols))
+        membership = np.zeros((len(symbols), len(sector_names)))
+        membership[np.arange(len(symbols)), [sector_names.index(self.sectors[s]) for s in symbols]] = 1.0
+
+        weighted = (weights * np.where(valid, returns, 0.0)) @ membership
+        total = weights @ membership
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sector_returns = np.where(total > 0, weighted / total, np.nan)
+
+        last = self.levels.reindex(columns=sector_names).iloc[-1].to_numpy(dtype=float) if len(self.levels) \
+            else np.full(len(sector_names), np.nan)
+        levels = _chain_levels(last, sector_returns, SECTOR_SETTINGS['base_level'])
+
+        self.closes = pd.concat([self.closes, new_closes]) if len(self.closes) else new_closes
+        new_levels = pd.DataFrame(levels, index=calendar, columns=sector_names)
+        self.levels = pd.concat([self.levels, new_levels]) if len(self.levels) else new_levels
+        logger.info(f"Sector indices updated with {len(calendar)} days")
+        return len(calendar)
+
+    def index(self, sector: str) -> pd.Series:
+        """סדרת רמות המדד של סקטור"""
+        if sector not in self.levels:
+            return pd.Series(dtype=float, name=sector)
+        return self.levels[sector].dropna()
+
+    def compare(self, hist: pd.DataFrame, sector: str, window: Optional[int] = None) -> Dict[str, float]:
+        """השוואת מניה למדד הסקטור שלה על החלון האחרון"""
+        window = window or SECTOR_SETTINGS['comparison_window']
+        levels = self.index(sector)
+        if levels.empty or hist is None or len(hist) == 0:
+            return {}
+
+        closes = align_closes({'stock': hist['Close'], 'sector': levels}, levels.index).tail(window + 1)
+        returns = closes.pct_change(fill_method=None).iloc[1:].dropna()
+        if len(returns) < 2:
+            return {}
+
+        stock_return = closes['stock'].dropna().iloc[-1] / closes['stock'].dropna().iloc[0] - 1
+        sector_return = closes['sector'].iloc[-1] / closes['sector'].iloc[0] - 1
+        sector_variance = returns['sector'].var()
+        return {
+            'sector': sector,
+            'stock_return': float(stock_return),
+            'sector_return': float(sector_return),
+            'relative_strength': float(stock_return - sector_return),
+            'correlation': float(returns['stock'].corr(returns['sector'])),
+            'beta': float(returns['stock'].cov(returns['sector']) / sector_variance) if sector_variance else np.nan,
+            'sector_volatility': float(returns['sector'].std() * np.sqrt(TRADING_DAYS_PER_YEAR))
+        }
+
+    def save(self, path=None):
+        """שמירת המדדים לדיסק"""
+        path = Path(path or SECTOR_INDEX_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path=None) -> 'SectorIndex':
+        """טעינת המדדים מהדיסק, או מדדים ריקים"""
+        path = Path(path or SECTOR_INDEX_FILE)
+        if path.exists():
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except Exception as e:
+                logger.error(f"Error loading sector indices: {str(e)}")
+        return cls()
+
+
+# מדדי הסקטורים המשותפים לכל המנתחים
+sector_index: Optional[SectorIndex] = None
+
+
+def get_sector_index() -> SectorIndex:
+    """המדדים המשותפים - נטענים מהדיסק בשימוש הראשון"""
+    global sector_index
+    if sector_index is None:
+        sector_index = SectorIndex.load()
+    return sector_index
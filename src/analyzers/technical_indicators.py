@@ -1,6 +1,23 @@
+import numpy as np
 import pandas as pd
 
 
+def _ewm_columns(values, alphas):
+    """ממוצע נע אקספוננציאלי (adjust=False) לכמה עמודות - ewm של pandas (לולאת C) לכל alpha שונה"""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+    # סדרה אחת מוחלקת בכל אחד מה-alpha
+    values = np.broadcast_to(values, (len(values), len(alphas)))
+
+    out = np.empty(values.shape)
+    for alpha in np.unique(alphas):
+        columns = np.flatnonzero(alphas == alpha)
+        out[:, columns] = pd.DataFrame(values[:, columns]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
 class TechnicalIndicators:
     @staticmethod
     def RSI(close_prices, periods=14):
@@ -66,10 +83,11 @@ class TechnicalIndicators:
     @staticmethod
     def AROON(high, low, periods=25):
         """Calculate Aroon Indicator"""
-        high_periods = pd.Series(range(len(high))).rolling(periods + 1, min_periods=periods + 1).apply(
-            lambda x: x.argmax())
-        low_periods = pd.Series(range(len(low))).rolling(periods + 1, min_periods=periods + 1).apply(
-            lambda x: x.argmin())
+        # מספר הימים מאז השיא/השפל בחלון
+        high_periods = high.rolling(periods + 1, min_periods=periods + 1).apply(
+            lambda x: periods - x.argmax(), raw=True)
+        low_periods = low.rolling(periods + 1, min_periods=periods + 1).apply(
+            lambda x: periods - x.argmin(), raw=True)
         aroon_up = ((periods - high_periods) / periods) * 100
         aroon_down = ((periods - low_periods) / periods) * 100
         return aroon_up, aroon_down
@@ -90,7 +108,7 @@ class TechnicalIndicators:
 
         rs = gains_ema / losses_ema
         rsi = 100 - (100 / (1 + rs))
-        return pd.Series(rsi, index=close_prices.index[1:])
+        return pd.Series(rsi.values, index=close_prices.index[1:])
 
     # הוספת מדדים חדשים
     @staticmethod
@@ -104,3 +122,101 @@ class TechnicalIndicators:
     def ROC(close_prices, periods=12):
         """Calculate Rate of Change"""
         return (close_prices - close_prices.shift(periods)) / close_prices.shift(periods) * 100
+
+    # סריקת פרמטרים - חישוב רשת שלמה של הגדרות במעבר אחד
+    @staticmethod
+    def RSI_sweep(close_prices, periods=range(2, 51)):
+        """Calculate RSI for a grid of periods in one batched pass.
+
+        Returns a DataFrame with one column per period, matching RSI().
+        """
+        periods = np.asarray(list(periods), dtype=int)
+        delta = np.diff(np.asarray(close_prices, dtype=float))
+        gains = np.where(delta > 0, delta, 0)
+        losses = np.where(delta < 0, -delta, 0)
+
+        # הרווחים וההפסדים מוחלקים יחד - עמודה לכל תקופה
+        alphas = 1 / periods
+        smoothed = _ewm_columns(np.column_stack([gains, losses]).repeat(len(periods), axis=1),
+                                np.tile(alphas, 2))
+        gains_ema = smoothed[:, :len(periods)]
+        losses_ema = smoothed[:, len(periods):]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gains_ema / losses_ema))
+
+        return pd.DataFrame(rsi, index=close_prices.index[1:],
+                            columns=pd.Index(periods, name='periods'))
+
+    @staticmethod
+    def BBANDS_sweep(close_prices, periods=(20,), num_std=(1.5, 2, 2.5, 3)):
+        """Calculate Bollinger Bands for a grid of periods and std multipliers.
+
+        Rolling moments come from shared prefix sums, so every period costs one
+        vectorized difference and every multiplier one broadcast.
+        Returns (upper, middle, lower); upper/lower columns are (periods, num_std).
+        """
+        periods = np.asarray(list(periods), dtype=int)
+        if (periods < 2).any():
+            raise ValueError("Bollinger periods must be at least 2")
+        num_std = np.asarray(list(num_std), dtype=float)
+        values = np.asarray(close_prices, dtype=float)
+        n = len(values)
+
+        # הזזה לערך הראשון מקטינה שגיאות עיגול בסכום הריבועים
+        shifted = values - values[0] if n else values
+        sum1 = np.concatenate([[0.0], np.cumsum(shifted)])
+        sum2 = np.concatenate([[0.0], np.cumsum(shifted ** 2)])
+
+        middle = np.full((n, len(periods)), np.nan)
+        std_dev = np.full((n, len(periods)), np.nan)
+        for j, p in enumerate(periods):
+            if p > n:
+                continue
+            window_sum = sum1[p:] - sum1[:-p]
+            window_sq = sum2[p:] - sum2[:-p]
+            variance = np.maximum(window_sq - window_sum ** 2 / p, 0) / (p - 1)
+            middle[p - 1:, j] = window_sum / p + (values[0] if n else 0)
+            std_dev[p - 1:, j] = np.sqrt(variance)
+
+        offsets = (std_dev[:, :, None] * num_std[None, None, :]).reshape(n, len(periods) * len(num_std))
+        centers = np.repeat(middle, len(num_std), axis=1)
+        band_columns = pd.MultiIndex.from_product([periods, num_std], names=['periods', 'num_std'])
+
+        upper = pd.DataFrame(centers + offsets, index=close_prices.index, columns=band_columns)
+        lower = pd.DataFrame(centers - offsets, index=close_prices.index, columns=band_columns)
+        middle = pd.DataFrame(middle, index=close_prices.index,
+                              columns=pd.Index(periods, name='periods'))
+        return upper, middle, lower
+
+    @staticmethod
+    def MACD_sweep(close_prices, fast=(8, 10, 12), slow=(21, 26, 30), signal=(7, 9)):
+        """Calculate MACD for a grid of fast/slow/signal spans.
+
+        Each distinct span's EMA is computed once and shared by every pair that uses it.
+        Returns (macd, signal, histogram); macd columns are (fast, slow) and
+        signal/histogram columns are (fast, slow, signal). Pairs with fast >= slow are skipped.
+        """
+        pairs = [(f, s) for f in fast for s in slow if f < s]
+        signal = np.asarray(list(signal), dtype=int)
+        if not pairs:
+            raise ValueError("MACD sweep needs at least one fast < slow pair")
+
+        spans = sorted({span for pair in pairs for span in pair})
+        position = {span: j for j, span in enumerate(spans)}
+        emas = _ewm_columns(np.asarray(close_prices, dtype=float), 2 / (np.asarray(spans) + 1))
+
+        macd = np.column_stack([emas[:, position[f]] - emas[:, position[s]] for f, s in pairs])
+
+        # קו האות לכל זוג ולכל תקופת אות - מעבר יחיד על ציר הזמן
+        repeated = np.repeat(macd, len(signal), axis=1)
+        signal_line = _ewm_columns(repeated, np.tile(2 / (signal + 1), len(pairs)))
+
+        pair_columns = pd.MultiIndex.from_tuples(pairs, names=['fast', 'slow'])
+        signal_columns = pd.MultiIndex.from_tuples(
+            [(f, s, sig) for f, s in pairs for sig in signal], names=['fast', 'slow', 'signal'])
+
+        macd = pd.DataFrame(macd, index=close_prices.index, columns=pair_columns)
+        histogram = pd.DataFrame(repeated - signal_line, index=close_prices.index, columns=signal_columns)
+        signal_line = pd.DataFrame(signal_line, index=close_prices.index, columns=signal_columns)
+        return macd, signal_line, histogram
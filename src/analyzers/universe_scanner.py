@@ -0,0 +1,130 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+import pandas as pd
+import yfinance as yf
+from .enhanced_stock_analyzer import EnhancedStockAnalyzer
+from ..config.settings import SCAN_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+def load_universe(path) -> List[str]:
+    """טעינת רשימת סימולים מקובץ - סימול בכל שורה, # להערות"""
+    symbols = []
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        symbol = line.split('#', 1)[0].strip()
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+    return symbols
+
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    """חלוקת רשימה לחלקים בגודל קבוע"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def run_in_pool(worker: Callable, symbols: List[str], workers: Optional[int] = None,
+                chunk_size: Optional[int] = None, histories: Optional[Dict[str, pd.DataFrame]] = None,
+                **kwargs) -> Iterator[List[Dict]]:
+    """הרצת worker(chunk, histories, **kwargs) על חלקים של היקום במאגר תהליכים.
+
+    התוצאות מוזרמות חזרה לפי סדר הסיום, חלק אחרי חלק.
+    """
+    workers = workers or SCAN_SETTINGS['workers']
+    chunk_size = chunk_size or SCAN_SETTINGS['chunk_size']
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for chunk in chunked(list(symbols), chunk_size):
+            chunk_histories = {s: histories[s] for s in chunk if s in histories} if histories else None
+            futures[pool.submit(worker, chunk, chunk_histories, **kwargs)] = chunk
+
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                logger.error(f"Error in worker for {futures[future]}: {str(e)}")
+
+
+def load_history(symbol: str, period: str, histories: Optional[Dict[str, pd.DataFrame]] = None) -> pd.DataFrame:
+    """היסטוריה שנטענה מראש, או משיכה מ-yfinance"""
+    if histories and symbol in histories:
+        return histories[symbol]
+    return yf.Ticker(symbol).history(period=period)
+
+
+def _scan_chunk(symbols: List[str], histories: Optional[Dict[str, pd.DataFrame]],
+                period: str) -> List[Dict]:
+    """סריקת תבניות ורמות לחלק אחד של היקום (רץ בתהליך עובד)"""
+    rows = []
+    for symbol in symbols:
+        try:
+            hist = load_history(symbol, period, histories)
+            if hist is None or len(hist) == 0:
+                continue
+
+            analyzer = EnhancedStockAnalyzer(symbol)
+            analyzer.hist = hist
+            patterns = analyzer.identify_technical_patterns()
+            levels = analyzer.find_support_resistance()
+
+            support = levels["support"][0]["price"] if levels["support"] else None
+            resistance = levels["resistance"][0]["price"] if levels["resistance"] else None
+            last_date = hist.index[-1]
+
+            for pattern in patterns:
+                rows.append({
+                    'symbol': symbol,
+                    'pattern': pattern.pattern_type,
+                    'start_date': pattern.start_date,
+                    'end_date': pattern.end_date,
+                    'bars_ago': len(hist.index) - 1 - hist.index.get_loc(pattern.end_date),
+                    'confidence': pattern.confidence,
+                    'description': pattern.description,
+                    'last_close': float(hist['Close'].iloc[-1]),
+                    'support': support,
+                    'resistance': resistance,
+                    'last_date': last_date
+                })
+        except Exception as e:
+            logger.error(f"Error scanning {symbol}: {str(e)}")
+
+    return rows
+
+
+def iter_scan(symbols: List[str], workers: Optional[int] = None, chunk_size: Optional[int] = None,
+              period: Optional[str] = None,
+              histories: Optional[Dict[str, pd.DataFrame]] = None) -> Iterator[List[Dict]]:
+    """סריקת היקום עם הזרמת התוצאות לפי סיום"""
+    yield from run_in_pool(_scan_chunk, symbols, workers, chunk_size, histories,
+                           period=period or SCAN_SETTINGS['period'])
+
+
+def rank_patterns(rows: List[Dict], half_life: Optional[int] = None) -> pd.DataFrame:
+    """טבלת תבניות אחת, מדורגת לפי עדכניות וביטחון"""
+    half_life = half_life or SCAN_SETTINGS['recency_half_life']
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+
+    table['score'] = table['confidence'] * 0.5 ** (table['bars_ago'] / half_life)
+    table = table.sort_values(['score', 'confidence'], ascending=False, kind='stable')
+    return table.reset_index(drop=True)
+
+
+def scan_universe(symbols: List[str], workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                  period: Optional[str] = None, histories: Optional[Dict[str, pd.DataFrame]] = None,
+                  on_progress: Optional[Callable[[int, int], None]] = None) -> pd.DataFrame:
+    """סריקת תבניות ורמות תמיכה/התנגדות לכל היקום"""
+    rows = []
+    total_chunks = -(-len(symbols) // (chunk_size or SCAN_SETTINGS['chunk_size']))
+    for done, batch in enumerate(iter_scan(symbols, workers, chunk_size, period, histories), start=1):
+        rows.extend(batch)
+        if on_progress:
+            on_progress(done, total_chunks)
+
+    logger.info(f"Scanned {len(symbols)} symbols, found {len(rows)} patterns")
+    return rank_patterns(rows)
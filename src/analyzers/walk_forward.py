@@ -0,0 +1,234 @@
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .backtester import score_components
+from .risk_engine import TRADING_DAYS_PER_YEAR
+from ..config.settings import ANALYSIS_SETTINGS, TUNED_SETTINGS_FILE
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = ['technical', 'momentum', 'advanced', 'sentiment']
+
+# נתונים משותפים בתהליך עובד - נטענים פעם אחת ב-initializer
+_shared: Dict = {}
+
+
+@dataclass
+class SymbolInputs:
+    """קלטי ההערכה של מניה - מחושבים פעם אחת ומשותפים לכל המועמדים"""
+    days: np.ndarray                  # datetime64[ns] - תאריכי הנרות (ללא אזור זמן)
+    components: np.ndarray            # float (n, 4) - ציוני הרכיבים לכל נר
+    returns: np.ndarray               # float (n,) - תשואת הנכס בכל נר
+
+
+def prepare_inputs(histories: Dict[str, pd.DataFrame]) -> Dict[str, SymbolInputs]:
+    """חישוב ציוני הרכיבים והתשואות לכל מניה"""
+    inputs = {}
+    for symbol, bars in histories.items():
+        if len(bars) == 0:
+            continue
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        inputs[symbol] = SymbolInputs(
+            days=index.values.astype('datetime64[ns]'),
+            components=score_components(bars)[COMPONENTS].to_numpy(dtype=float),
+            returns=bars['Close'].pct_change(fill_method=None).fillna(0.0).to_numpy(dtype=float)
+        )
+    return inputs
+
+
+def candidate_grid(weight_step: Optional[float] = None, buy_thresholds: Optional[List[float]] = None,
+                   sell_thresholds: Optional[List[float]] = None) -> pd.DataFrame:
+    """כל שילובי המשקולות (שסכומן 1) וספי הקנייה/מכירה.
+
+    המסחר תלוי רק בסף הקנייה ובסף המכירה החלשה - "קנייה חזקה" ו"מכירה" הן מדרגות
+    של אותו איתות, ולכן אינן חלק מהרשת.
+    """
+    settings = ANALYSIS_SETTINGS['optimization']
+    weight_step = weight_step or settings['weight_step']
+    buy_thresholds = buy_thresholds or settings['buy_thresholds']
+    sell_thresholds = sell_thresholds or settings['sell_thresholds']
+
+    units = int(round(1 / weight_step))
+    weights = [combo for combo in product(range(units + 1), repeat=len(COMPONENTS) - 1)
+               if sum(combo) <= units]
+    rows = [(*(np.array([*combo, units - sum(combo)]) / units), buy, sell)
+            for combo in weights for buy in buy_thresholds for sell in sell_thresholds if sell < buy]
+    return pd.DataFrame(rows, columns=COMPONENTS + ['buy', 'weak_sell'])
+
+
+def _evaluate_block(inputs: Dict[str, SymbolInputs], candidates: np.ndarray, start: np.datetime64,
+                    end: np.datetime64, cost: float, allow_short: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """שארפ ממוצע ותשואה ממוצעת של כל מועמד בתקופה [start, end), על פני כל המניות.
+
+    לכל מניה: ציונים (m, K) במכפלה אחת, ופוזיציה לכל מועמד במילוי קדימה וקטורי.
+    """
+    weights, buy, sell = candidates[:, :4].T, candidates[:, 4], candidates[:, 5]
+    sharpe_sum = np.zeros(len(candidates))
+    return_sum = np.zeros(len(candidates))
+    count = 0
+
+    for data in inputs.values():
+        lo, hi = np.searchsorted(data.days, [start, end])
+        m = hi - lo
+        if m < 2:
+            continue
+
+        scores = data.components[lo:hi] @ weights
+        target = np.where(scores > buy, 1.0, np.where(scores < sell, -1.0 if allow_short else 0.0, np.nan))
+
+        # מילוי קדימה של "החזק" - האינדקס האחרון שבו היה איתות בכל עמודה
+        rows = np.arange(m)[:, None]
+        last = np.maximum.accumulate(np.where(np.isnan(target), -1, rows), axis=0)
+        filled = np.where(last >= 0, np.take_along_axis(target, np.maximum(last, 0), axis=0), 0.0)
+
+        position = np.empty_like(filled)
+        position[0] = 0.0
+        position[1:] = filled[:-1]
+        turnover = np.abs(np.diff(position, axis=0, prepend=0.0))
+        returns = position * data.returns[lo:hi, None] - turnover * cost
+
+        std = returns.std(axis=0, ddof=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(TRADING_DAYS_PER_YEAR), 0.0)
+        sharpe_sum += sharpe
+        return_sum += np.expm1(np.log1p(returns).sum(axis=0))
+        count += 1
+
+    if count == 0:
+        return np.full(len(candidates), np.nan), np.full(len(candidates), np.nan)
+    return sharpe_sum / count, return_sum / count
+
+
+def _init_worker(inputs: Dict[str, SymbolInputs], candidates: np.ndarray, cost: float, allow_short: bool):
+    """טעינת הנתונים המשותפים לתהליך העובד"""
+    _shared.update(inputs=inputs, candidates=candidates, cost=cost, allow_short=allow_short)
+
+
+def _evaluate_task(start: np.datetime64, end: np.datetime64, lo: int, hi: int) -> Tuple[int, int, np.ndarray]:
+    """הערכת מנת מועמדים [lo, hi) בתקופת האימון (רץ בתהליך עובד)"""
+    sharpe, _ = _evaluate_block(_shared['inputs'], _shared['candidates'][lo:hi], start, end,
+                                _shared['cost'], _shared['allow_short'])
+    return lo, hi, sharpe
+
+
+def walk_forward_folds(inputs: Dict[str, SymbolInputs], train_bars: int, test_bars: int) -> List[Tuple]:
+    """חלונות אימון/בדיקה מתגלגלים על לוח התאריכים המאוחד"""
+    calendar = np.unique(np.concatenate([data.days for data in inputs.values()])) if inputs \
+        else np.array([], dtype='datetime64[ns]')
+    folds = []
+    for train_start in range(0, len(calendar) - train_bars - test_bars + 1, test_bars):
+        test_start = train_start + train_bars
+        test_end = test_start + test_bars
+        end = calendar[test_end] if test_end < len(calendar) else calendar[-1] + np.timedelta64(1, 'ns')
+        folds.append((calendar[train_start], calendar[test_start], end))
+    return folds
+
+
+@dataclass
+class WalkForwardResult:
+    """תוצאת האופטימיזציה - מה נבחר בכל חלון ואיך ביצע מחוץ למדגם"""
+    folds: pd.DataFrame
+    tuned: Dict
+
+
+def optimize_scoring(histories: Dict[str, pd.DataFrame], candidates: Optional[pd.DataFrame] = None,
+                     workers: Optional[int] = None, train_bars: Optional[int] = None,
+                     test_bars: Optional[int] = None) -> WalkForwardResult:
+    """אופטימיזציית walk-forward של משקולות וספי הציון הסופי.
+
+    ציוני הרכיבים מחושבים פעם אחת לכל מניה ונשלחים לכל תהליך עובד פעם אחת (initializer);
+    כל משימה מעריכה מנת מועמדים בחלון אימון אחד. המועמד הטוב באימון נמדד בחלון הבדיקה שאחריו,
+    והפרמטרים המכוונים הם אלה שנבחרו בחלון האחרון.
+    """
+    settings = ANALYSIS_SETTINGS['optimization']
+    backtest = ANALYSIS_SETTINGS['backtest']
+    workers = workers or settings['workers']
+    train_bars = train_bars or settings['train_bars']
+    test_bars = test_bars or settings['test_bars']
+    chunk = settings['candidate_chunk']
+    cost = (backtest['cost_bps'] + backtest['slippage_bps']) / 10000
+    allow_short = backtest['allow_short']
+
+    inputs = prepare_inputs(histories)
+    if candidates is None:
+        candidates = candidate_grid()
+    grid = candidates[COMPONENTS + ['buy', 'weak_sell']].to_numpy(dtype=float)
+    folds = walk_forward_folds(inputs, train_bars, test_bars)
+    if not folds:
+        raise ValueError("Not enough history for a single walk-forward fold")
+
+    train_scores = np.full((len(folds), len(grid)), np.nan)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(inputs, grid, cost, allow_short)) as pool:
+        futures = {pool.submit(_evaluate_task, start, test_start, lo, min(lo + chunk, len(grid))): f
+                   for f, (start, test_start, _) in enumerate(folds)
+                   for lo in range(0, len(grid), chunk)}
+        for future in as_completed(futures):
+            try:
+                lo, hi, sharpe = future.result()
+                train_scores[futures[future], lo:hi] = sharpe
+            except Exception as e:
+                logger.error(f"Error evaluating fold {futures[future]}: {str(e)}")
+
+    rows = []
+    for f, (start, test_start, end) in enumerate(folds):
+        if np.all(np.isnan(train_scores[f])):
+            continue
+        best = int(np.nanargmax(train_scores[f]))
+        test_sharpe, test_return = _evaluate_block(inputs, grid[best:best + 1], test_start, end, cost, allow_short)
+        rows.append({
+            'train_start': pd.Timestamp(start), 'test_start': pd.Timestamp(test_start),
+            'test_end': pd.Timestamp(end), 'candidate': best,
+            'train_sharpe': float(train_scores[f, best]),
+            'test_sharpe': float(test_sharpe[0]), 'test_return': float(test_return[0]),
+            **dict(zip(COMPONENTS + ['buy', 'weak_sell'], grid[best].tolist()))
+        })
+
+    if not rows:
+        raise ValueError("No walk-forward fold could be evaluated")
+    table = pd.DataFrame(rows)
+    return WalkForwardResult(folds=table, tuned=tuned_scoring(table.iloc[-1]))
+
+
+def tuned_scoring(row: pd.Series) -> Dict:
+    """המרת שורת מועמד למבנה של ANALYSIS_SETTINGS['scoring']"""
+    thresholds = dict(ANALYSIS_SETTINGS['scoring']['thresholds'])
+    thresholds['buy'] = float(row['buy'])
+    thresholds['weak_sell'] = float(row['weak_sell'])
+    thresholds['strong_buy'] = max(thresholds['strong_buy'], thresholds['buy'])
+    thresholds['sell'] = min(thresholds['sell'], thresholds['weak_sell'])
+    return {
+        'weights': {component: float(row[component]) for component in COMPONENTS},
+        'thresholds': thresholds
+    }
+
+
+def save_tuned_settings(scoring: Dict, path=None):
+    """שמירת הפרמטרים המכוונים לקובץ JSON"""
+    path = Path(path or TUNED_SETTINGS_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'scoring': scoring}, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+def load_tuned_settings(path=None) -> bool:
+    """טעינת פרמטרים מכוונים לתוך ANALYSIS_SETTINGS, אם הקובץ קיים"""
+    path = Path(path or TUNED_SETTINGS_FILE)
+    if not path.exists():
+        return False
+    tuned = json.loads(path.read_text(encoding='utf-8'))
+    for section, values in tuned.items():
+        for key, value in values.items():
+            if isinstance(value, dict):
+                ANALYSIS_SETTINGS[section][key].update(value)
+            else:
+                ANALYSIS_SETTINGS[section][key] = value
+    logger.info(f"Loaded tuned settings from {path}")
+    return True
@@ -0,0 +1,378 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import yfinance as yf
+from .analyzers.backtester import backtest_universe
+from .analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer, fundamental_values
+from .analyzers.fundamental_analyzer import FundamentalIndicators, get_sector_distributions
+from .analyzers.risk_engine import RiskEngine, market_breadth
+from .analyzers.sector_index import SectorIndex, get_sector_index
+from .analyzers.universe_scanner import load_universe, load_history, run_in_pool, scan_universe
+from .analyzers.walk_forward import load_tuned_settings, optimize_scoring, save_tuned_settings
+from .config.settings import (ANALYSIS_SETTINGS, PANEL_SETTINGS, SCAN_SETTINGS, SERVICE_SETTINGS,
+                              TUNED_SETTINGS_FILE)
+from .utils.financial_store import get_financial_store
+from .utils.panel_store import PanelStore, get_panel_store
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ('.parquet', '.csv', '.pkl', '.pickle')
+
+
+# עמודות מדדי הסיכון בטבלת התוצאות (כמו calculate_risk_metrics)
+RISK_COLUMNS = ['beta', 'sharpe', 'volatility', 'max_drawdown', 'var_95']
+
+
+def _analysis_row(analyzer: EnhancedStockAnalyzer, risk_metrics: Optional[Dict] = None) -> Dict:
+    """שורת תוצאות אחת - כל שלבי הניתוח של המנתח. risk_metrics שחושבו מראש מחליפים את החישוב למניה"""
+    hist = analyzer.hist
+    snapshot = analyzer.snapshot()
+    patterns = analyzer.identify_technical_patterns()
+    levels = analyzer.find_support_resistance()
+    analyzer.predict_prices()
+    score = snapshot.score
+
+    row = {
+        'symbol': analyzer.symbol,
+        'last_date': hist.index[-1],
+        'last_close': snapshot.last_close,
+        'score': score.get('ציון_סופי'),
+        'recommendation': score.get('המלצה')
+    }
+    row.update({f'score_{name}': value for name, value in score.get('ציונים_חלקיים', {}).items()})
+    row.update(snapshot.indicators)
+    row.update(snapshot.risk_metrics if risk_metrics is None else risk_metrics)
+    row.update(analyzer.fundamental_metrics)
+    sectors = get_sector_index()
+    if analyzer.apply_sector_index(sectors):
+        row['sector'] = sectors.sectors[analyzer.symbol]
+        row.update({f'sector_{key}': value for key, value in analyzer.sector_comparison.items() if key != 'sector'})
+
+    best = max(patterns, key=lambda pattern: pattern.confidence, default=None)
+    row.update({
+        'patterns': len(patterns),
+        'top_pattern': best.pattern_type if best else None,
+        'top_pattern_confidence': best.confidence if best else None,
+        'support': levels['support'][0]['price'] if levels['support'] else None,
+        'resistance': levels['resistance'][0]['price'] if levels['resistance'] else None
+    })
+    for horizon, band in analyzer.price_predictions.items():
+        row.update({f'{horizon}_{key}': value for key, value in band.items() if key != 'days'})
+    return row
+
+
+def _analyze_chunk(symbols: List[str], histories: Optional[Dict[str, pd.DataFrame]], period: str,
+                   market_index: str, market_hist: Optional[pd.DataFrame] = None,
+                   risk: Optional[pd.DataFrame] = None, fundamentals: Optional[pd.DataFrame] = None) -> List[Dict]:
+    """ניתוח מלא לחלק אחד של היקום (רץ בתהליך עובד)"""
+    if market_hist is None and risk is None:
+        try:
+            market_hist = yf.Ticker(market_index).history(period=period)
+        except Exception as e:
+            logger.error(f"Error fetching market data: {str(e)}")
+
+    rows = []
+    for symbol in symbols:
+        try:
+            hist = load_history(symbol, period, histories)
+            if hist is None or len(hist) == 0:
+                logger.warning(f"No data for {symbol}")
+                continue
+
+            analyzer = EnhancedStockAnalyzer(symbol, market_index)
+            analyzer.hist = hist
+            analyzer.market_hist = market_hist if market_hist is not None and len(market_hist) else None
+            if fundamentals is not None and symbol in fundamentals.index:
+                analyzer.fundamental_metrics = fundamental_values(fundamentals.loc[symbol])
+            risk_metrics = None
+            if risk is not None:
+                risk_metrics = risk.loc[symbol, RISK_COLUMNS].to_dict() if symbol in risk.index else {}
+            rows.append(_analysis_row(analyzer, risk_metrics))
+        except Exception as e:
+            logger.error(f"Error analyzing {symbol}: {str(e)}")
+    return rows
+
+
+def analyze_universe(symbols: List[str], workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                     period: Optional[str] = None, market_index: Optional[str] = None,
+                     histories: Optional[Dict[str, pd.DataFrame]] = None,
+                     risk: Optional[pd.DataFrame] = None,
+                     fundamentals: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """הרצת כל שלבי הניתוח על היקום במאגר תהליכים - שורה לכל מניה, מדורג לפי הציון.
+
+    risk - מדדי הסיכון של כל היקום שחושבו מראש (universe_risk); בלעדיהם כל מניה מחושבת מול מדד הייחוס.
+    fundamentals - מדדי היסוד של כל היקום (update_fundamentals), נוספים לשורה של כל מניה.
+    """
+    period = period or SCAN_SETTINGS['period']
+    market_index = market_index or ANALYSIS_SETTINGS['risk']['beta_market_index']
+    # מדד הייחוס שנטען מראש נשלח לכל חלק; אחרת כל תהליך עובד מושך אותו בעצמו
+    market_hist = histories.get(market_index) if histories and risk is None else None
+
+    rows = []
+    for batch in run_in_pool(_analyze_chunk, symbols, workers, chunk_size, histories,
+                             period=period, market_index=market_index, market_hist=market_hist, risk=risk,
+                             fundamentals=fundamentals):
+        rows.extend(batch)
+        logger.info(f"Analyzed {len(rows)}/{len(symbols)} symbols")
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    return table.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _fetch_chunk(symbols: List[str], histories: Optional[Dict[str, pd.DataFrame]], period: str) -> List[tuple]:
+    """משיכת היסטוריה לחלק אחד של היקום (רץ בתהליך עובד)"""
+    fetched = []
+    for symbol in symbols:
+        try:
+            hist = load_history(symbol, period, histories)
+            if hist is not None and len(hist):
+                fetched.append((symbol, hist))
+            else:
+                logger.warning(f"No data for {symbol}")
+        except Exception as e:
+            logger.error(f"Error fetching {symbol}: {str(e)}")
+    return fetched
+
+
+def fetch_histories(symbols: List[str], period: str, workers: Optional[int] = None,
+                    chunk_size: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+    """היסטוריה לכל מניות היקום, במאגר תהליכים"""
+    histories = {}
+    for batch in run_in_pool(_fetch_chunk, symbols, workers, chunk_size, period=period):
+        histories.update(batch)
+    logger.info(f"Fetched {len(histories)}/{len(symbols)} histories")
+    return histories
+
+
+def download_profile(symbol: str) -> Tuple[Optional[str], Optional[float]]:
+    """סקטור ושווי שוק של מניה מ-yfinance"""
+    info = yf.Ticker(symbol).info
+    return info.get('sector'), info.get('marketCap')
+
+
+def _profile_chunk(symbols: List[str], histories: Optional[Dict[str, pd.DataFrame]]) -> List[tuple]:
+    """סקטור ושווי שוק לחלק אחד של היקום (רץ בתהליך עובד)"""
+    profiles = []
+    for symbol in symbols:
+        try:
+            profiles.append((symbol, *download_profile(symbol)))
+        except Exception as e:
+            logger.error(f"Error fetching profile for {symbol}: {str(e)}")
+    return profiles
+
+
+def update_panel(histories: Dict[str, pd.DataFrame], market_index: str) -> PanelStore:
+    """כתיבת ההיסטוריות שנמשכו לפאנל המחירים המשותף ושמירתו - לוח המסחר הוא ימי מדד הייחוס"""
+    panel = get_panel_store(market_index)
+    # משיכה מלאה - מחירים מתואמים שהשתנו בדיעבד מחליפים את הישנים
+    panel.extend(histories, replace=True)
+    try:
+        panel.save()
+    except Exception as e:
+        logger.error(f"Error saving panel store: {str(e)}")
+    return panel
+
+
+def universe_risk(panel: PanelStore, symbols: List[str], market_index: str) -> pd.DataFrame:
+    """מדדי הסיכון של כל היקום מהפאנל, בחישוב מטריצה אחד במקום חישוב לכל מניה"""
+    if market_index not in panel.symbols:
+        logger.warning(f"No data for {market_index} - risk metrics skipped")
+        return pd.DataFrame(columns=RISK_COLUMNS, dtype=float)
+    return RiskEngine.from_panel(panel, market_index, symbols=symbols).metrics()
+
+
+def update_fundamentals(histories: Dict[str, pd.DataFrame], sectors: Dict[str, str]) -> pd.DataFrame:
+    """מדדי היסוד של כל היקום בחתך אחד מהמאגר המקומי - הרשת רק למניות שצפוי להן דוח חדש.
+
+    ההתפלגויות לפי סקטור נבנות מהחתך ונשמרות, כך שגם הציון לפי סקטור של מניה בודדת
+    (score_mode='sector') מחושב מול היקום.
+    """
+    store = get_financial_store()
+    store.update_many(histories, 'annual')
+    prices = {symbol: float(hist['Close'].iloc[-1]) for symbol, hist in histories.items()}
+    inputs = store.fundamental_inputs(prices)
+    sectors = pd.Series(sectors, dtype=object).reindex(inputs.index)
+
+    distributions = get_sector_distributions()
+    distributions.fit(FundamentalIndicators.analyze_cross_section(inputs, mode='absolute'), sectors)
+    distributions.save()
+    logger.info(f"Sector distributions fitted for {len(distributions.sectors)} sectors")
+    return FundamentalIndicators.analyze_cross_section(inputs, sectors, distributions)
+
+
+def update_sector_index(histories: Dict[str, pd.DataFrame], workers: Optional[int] = None,
+                        chunk_size: Optional[int] = None, panel: Optional[PanelStore] = None) -> SectorIndex:
+    """בניית מדדי הסקטורים מהיסטוריות היקום ושמירתם.
+
+    השיוך השמור במדדים משמש כמטמון - הרשת נדרשת רק למניות שהסקטור שלהן עוד לא ידוע.
+    כשהועבר פאנל המחירים, הסגירות נלקחות ממנו כבר מיושרות.
+    """
+    index = get_sector_index()
+    unknown = [symbol for symbol in histories if symbol not in index.sectors]
+    sectors, market_caps = dict(index.sectors), {}
+    for batch in run_in_pool(_profile_chunk, unknown, workers, chunk_size):
+        for symbol, sector, market_cap in batch:
+            sectors[symbol] = sector
+            market_caps[symbol] = market_cap
+
+    index.set_constituents(sectors, market_caps, histories)
+    if panel is not None:
+        index.update_from_panel(panel)
+    else:
+        index.update(histories)
+    index.save()
+    logger.info(f"Sector indices built for {len(index.sectors)} symbols in {len(index.levels.columns)} sectors")
+    return index
+
+
+def write_results(table: pd.DataFrame, path: Path):
+    """כתיבת טבלת התוצאות לפי סיומת הקובץ"""
+    suffix = path.suffix.lower()
+    if suffix not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {suffix} (use {', '.join(OUTPUT_FORMATS)})")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if suffix == '.parquet':
+        table.to_parquet(path, index=False)
+    elif suffix == '.csv':
+        table.to_csv(path, index=False, encoding='utf-8-sig')
+    else:
+        table.to_pickle(path)
+
+
+def _add_universe_arguments(parser: argparse.ArgumentParser, period: Optional[str] = None,
+                            out_required: bool = True):
+    """ארגומנטים משותפים לפקודות שרצות על יקום מניות"""
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--universe', type=Path, help='file with one symbol per line')
+    source.add_argument('--symbols', nargs='+', help='symbols to process')
+    parser.add_argument('--out', type=Path, required=out_required, help='output file (.parquet, .csv or .pkl)')
+    parser.add_argument('--workers', type=int, default=SCAN_SETTINGS['workers'])
+    parser.add_argument('--chunk-size', type=int, default=SCAN_SETTINGS['chunk_size'])
+    parser.add_argument('--period', default=period or SCAN_SETTINGS['period'])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='Headless stock analysis')
+    parser.add_argument('-v', '--verbose', action='store_true', help='detailed logging')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze = commands.add_parser('analyze', help='run the full analysis over a universe of symbols')
+    _add_universe_arguments(analyze)
+    analyze.add_argument('--market-index', default=ANALYSIS_SETTINGS['risk']['beta_market_index'])
+    analyze.add_argument('--breadth-out', type=Path, help='also write daily market breadth of the universe')
+
+    scan = commands.add_parser('scan', help='scan a universe for chart patterns and support/resistance')
+    _add_universe_arguments(scan)
+
+    backtest = commands.add_parser('backtest', help='backtest the scoring recommendations over a universe')
+    _add_universe_arguments(backtest)
+    backtest.add_argument('--cost-bps', type=float, default=ANALYSIS_SETTINGS['backtest']['cost_bps'])
+    backtest.add_argument('--slippage-bps', type=float, default=ANALYSIS_SETTINGS['backtest']['slippage_bps'])
+    backtest.add_argument('--allow-short', action=argparse.BooleanOptionalAction,
+                          default=ANALYSIS_SETTINGS['backtest']['allow_short'])
+
+    optimize = commands.add_parser('optimize', help='walk-forward tuning of the scoring weights and thresholds')
+    _add_universe_arguments(optimize, ANALYSIS_SETTINGS['optimization']['period'], out_required=False)
+    optimize.add_argument('--train-bars', type=int, default=ANALYSIS_SETTINGS['optimization']['train_bars'])
+    optimize.add_argument('--test-bars', type=int, default=ANALYSIS_SETTINGS['optimization']['test_bars'])
+    optimize.add_argument('--tuned-file', type=Path, default=TUNED_SETTINGS_FILE,
+                          help='where to write the tuned scoring settings')
+    optimize.add_argument('--dry-run', action='store_true', help='report the folds without writing settings')
+
+    serve = commands.add_parser('serve', help='run the local analysis service')
+    serve.add_argument('--host', default=SERVICE_SETTINGS['host'])
+    serve.add_argument('--port', type=int, default=SERVICE_SETTINGS['port'])
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+    load_tuned_settings()
+
+    if args.command == 'serve':
+        # ייבוא מקומי - aiohttp נדרש רק לשירות
+        from .service import run_service
+        run_service(args.host, args.port)
+        return 0
+
+    for path in (args.out, getattr(args, 'breadth_out', None)):
+        if path is not None and path.suffix.lower() not in OUTPUT_FORMATS:
+            logger.error(f"Unsupported output format: {path.suffix}")
+            return 2
+    symbols = load_universe(args.universe) if args.universe else list(dict.fromkeys(args.symbols))
+
+    if args.command == 'analyze':
+        histories = fetch_histories(list(dict.fromkeys([*symbols, args.market_index])), args.period,
+                                    args.workers, args.chunk_size)
+        # פאנל אחד מיושר לכל היקום - ממנו הסיכון, מדדי הסקטורים ורוחב השוק
+        panel = update_panel(histories, args.market_index)
+        universe = [symbol for symbol in symbols if symbol in histories]
+        try:
+            update_sector_index({symbol: histories[symbol] for symbol in universe}, args.workers,
+                                args.chunk_size, panel)
+        except Exception as e:
+            logger.error(f"Error building sector indices: {str(e)}")
+        try:
+            fundamentals = update_fundamentals({symbol: histories[symbol] for symbol in universe},
+                                               get_sector_index().sectors)
+        except Exception as e:
+            logger.error(f"Error computing fundamentals: {str(e)}")
+            fundamentals = None
+        table = analyze_universe(symbols, args.workers, args.chunk_size, args.period, args.market_index,
+                                 histories, universe_risk(panel, universe, args.market_index), fundamentals)
+        if table.empty:
+            logger.error("No symbol could be analyzed")
+            return 1
+
+        breadth = market_breadth(panel, exclude=[symbol for symbol in panel.symbols if symbol not in universe])
+        if len(breadth):
+            last = breadth.iloc[-1]
+            print(f"breadth {breadth.index[-1].date()}: {int(last['advancers'])} up, {int(last['decliners'])} down, "
+                  f"{last['pct_above_ma']:.0%} above the {PANEL_SETTINGS['breadth_ma_window']}-day average")
+        if args.breadth_out is not None:
+            write_results(breadth.rename_axis('date').reset_index(), args.breadth_out)
+    elif args.command == 'scan':
+        table = scan_universe(symbols, args.workers, args.chunk_size, args.period)
+        if table.empty:
+            logger.warning("No patterns found")
+    elif args.command == 'backtest':
+        histories = fetch_histories(symbols, args.period, args.workers, args.chunk_size)
+        table = backtest_universe(histories, cost_bps=args.cost_bps, slippage_bps=args.slippage_bps,
+                                  allow_short=args.allow_short)
+        if table.empty:
+            logger.error("No symbol could be backtested")
+            return 1
+        table = table.rename_axis('symbol').reset_index()
+    elif args.command == 'optimize':
+        histories = fetch_histories(symbols, args.period, args.workers, args.chunk_size)
+        try:
+            result = optimize_scoring(histories, workers=args.workers, train_bars=args.train_bars,
+                                      test_bars=args.test_bars)
+        except ValueError as e:
+            logger.error(str(e))
+            return 1
+        table = result.folds
+        if not args.dry_run:
+            save_tuned_settings(result.tuned, args.tuned_file)
+        print(f"optimize: mean out-of-sample sharpe {table['test_sharpe'].mean():.2f} over {len(table)} folds"
+              + ('' if args.dry_run else f" -> {args.tuned_file}"))
+        if args.out is None:
+            return 0
+
+    write_results(table, args.out)
+    print(f"{args.command}: {len(symbols)} symbols -> {args.out} ({len(table)} rows)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
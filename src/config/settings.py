@@ -6,10 +6,16 @@ DATA_DIR = BASE_DIR / "data"
 CACHE_DIR = DATA_DIR / "cache"
 EXPORT_DIR = DATA_DIR / "exports"
 LOG_DIR = BASE_DIR / "logs"
+TUNED_SETTINGS_FILE = DATA_DIR / "tuned_settings.json"
+FINANCIALS_FILE = DATA_DIR / "financial_statements.pickle"
+SECTOR_INDEX_FILE = CACHE_DIR / "sector_index.pickle"
+PANEL_STORE_FILE = CACHE_DIR / "panel_store.pickle"
+SECTOR_DISTRIBUTIONS_FILE = CACHE_DIR / "sector_distributions.pickle"
 
 # הגדרות Cache
 CACHE_EXPIRY_HOURS = 24
 MAX_CACHE_ITEMS = 1000
+MEMO_CACHE_SIZE = 256  # תוצאות מחושבות בזיכרון
 
 # הגדרות API
 API_RATE_LIMIT = 5  # requests per second
@@ -23,18 +29,73 @@ ANALYSIS_SETTINGS = {
         'macd_slow': 26,
         'macd_signal': 9,
         'bollinger_periods': 20,
-        'bollinger_std': 2
+        'bollinger_std': 2,
+        'atr_periods': 14,
+        'adx_periods': 14,
+        'aroon_periods': 25,
+        'cmf_periods': 20,
+        'roc_periods': 12
     },
     'risk': {
         'var_confidence': 0.95,
         'risk_free_rate': 0.04,
-        'beta_market_index': '^TA125.TA'
+        'beta_market_index': '^TA125.TA',
+        'rolling_window': 60,
+        'monte_carlo_paths': 100000
+    },
+    'simulation': {
+        'horizon': 20,             # ימי מסחר קדימה
+        'n_paths': 100000,
+        'method': 'bootstrap',     # 'bootstrap' או 'gbm'
+        'block_size': 5,           # אורך בלוק בבוטסטרפ
+        'chunk_size': 10000,       # מסלולים לכל מנה
+        'bins': 2048,              # עמודות בהיסטוגרמת התשואה המצטברת לכל יום
+        'seed': None,
+        'quantiles': [0.05, 0.25, 0.5, 0.75, 0.95]
+    },
+    'scoring': {
+        'weights': {
+            'technical': 0.3,
+            'momentum': 0.25,
+            'advanced': 0.25,
+            'sentiment': 0.2
+        },
+        'thresholds': {            # ציון סופי בין 0 ל-1
+            'strong_buy': 0.7,
+            'buy': 0.6,
+            'weak_sell': 0.4,
+            'sell': 0.3
+        }
+    },
+    'backtest': {
+        'cost_bps': 10,            # עמלה לכל צד, בנקודות בסיס
+        'slippage_bps': 5,
+        'allow_short': False       # האם איתות מכירה פותח שורט או רק סוגר פוזיציה
+    },
+    'optimization': {
+        'weight_step': 0.1,        # רזולוציית רשת המשקולות
+        'buy_thresholds': [0.5, 0.55, 0.6, 0.65, 0.7],
+        'sell_thresholds': [0.3, 0.35, 0.4, 0.45],
+        'train_bars': 504,         # שנתיים מסחר
+        'test_bars': 126,          # חצי שנה
+        'candidate_chunk': 256,    # מועמדים לכל משימה בתהליך עובד
+        'workers': None,
+        'period': '5y'             # היסטוריה לאופטימיזציה - כמה חלונות אימון/בדיקה
     },
     'fundamental': {
         'pe_ratio_threshold': 25,
         'pb_ratio_threshold': 3,
         'min_current_ratio': 1.5,
-        'min_profit_margin': 0.1
+        'min_profit_margin': 0.1,
+        'score_mode': 'absolute',  # 'absolute' - ספים קבועים, 'sector' - אחוזון בתוך הסקטור (cli analyze בונה את ההתפלגויות)
+        'min_sector_size': 5,      # סקטור קטן יותר מדורג מול כל היקום
+        'score_weights': {
+            'pe_ratio': 0.2,
+            'pb_ratio': 0.15,
+            'profit_margin': 0.2,
+            'current_ratio': 0.15,
+            'revenue_growth': 0.3
+        }
     },
     'alerts': {
         'check_interval': 300,  # seconds
@@ -43,6 +104,45 @@ ANALYSIS_SETTINGS = {
     }
 }
 
+# הגדרות סריקת יקום מניות
+SCAN_SETTINGS = {
+    'workers': None,           # None = מספר הליבות
+    'chunk_size': 8,           # מניות לכל משימה בתהליך עובד
+    'period': '2y',
+    'recency_half_life': 20    # נרות - דעיכת המשקל של תבנית ישנה בדירוג
+}
+
+# הגדרות מאגר הדוחות הכספיים
+FINANCIALS_SETTINGS = {
+    'quarterly': {'period_days': 91, 'report_lag_days': 45},
+    'annual': {'period_days': 365, 'report_lag_days': 90},
+    'recheck_days': 7          # מרווח מינימלי בין בדיקות כשדוח חדש באיחור
+}
+
+# הגדרות מדדי סקטור
+SECTOR_SETTINGS = {
+    'weighting': 'cap',        # 'cap' - לפי שווי שוק, 'equal' - שקלול שווה
+    'base_level': 100,
+    'comparison_window': 252   # ימי מסחר להשוואת מניה לסקטור
+}
+
+# הגדרות פאנל המחירים המשותף
+PANEL_SETTINGS = {
+    'initial_days': 512,       # קיבולת התחלתית של ציר הזמן
+    'breadth_ma_window': 50    # ממוצע נע לאחוז המניות שמעליו
+}
+
+# הגדרות שירות הניתוח המקומי
+SERVICE_SETTINGS = {
+    'host': '127.0.0.1',       # מקומי בלבד
+    'port': 8765,
+    'period': '2y',
+    'history_ttl': 900,        # שניות עד משיכה מחדש של היסטוריה
+    'max_concurrency': 4,      # חישובים ומשיכות במקביל
+    'request_cache_size': 512,
+    'client_timeout': 60       # שניות
+}
+
 # הגדרות GUI
 GUI_SETTINGS = {
     'window_size': '1400x900',
@@ -3,6 +3,8 @@ from tkinter import ttk, messagebox
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from ..analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+from ..config.settings import ANALYSIS_SETTINGS, SERVICE_SETTINGS
+from ..utils.service_client import ServiceClient, chart_frame, simulation_bands, trim_to_period
 import logging
 from datetime import datetime
 import yfinance as yf
@@ -16,6 +18,8 @@ class AnalysisTab(ttk.Frame):
         super().__init__(parent)
         self.logger = logging.getLogger(__name__)
         self.analyzer = None
+        self.view = None  # מה שמוצג: ציון, תבניות, רמות, סדרות הגרף ורצועות הסימולציה
+        self.client = ServiceClient()
 
         # יצירת המסגרות הראשיות
         self.create_frames()
@@ -71,13 +75,15 @@ class AnalysisTab(ttk.Frame):
                    command=self.clear_data).pack(side=tk.LEFT, padx=5)
         ttk.Button(buttons_frame, text="ייצא לאקסל",
                    command=self.export_to_excel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons_frame, text="סיכון מתגלגל",
+                   command=self.show_rolling_risk).pack(side=tk.LEFT, padx=5)
 
         # לוג
         self.create_log_area(input_frame)
 
     def export_to_excel(self):
         """ייצוא הניתוח לאקסל"""
-        if not self.analyzer or not hasattr(self.analyzer, 'hist'):
+        if not self.local_analyzer():
             messagebox.showwarning("שגיאה", "אנא בצע ניתוח לפני הייצוא")
             return
 
@@ -112,6 +118,45 @@ class AnalysisTab(ttk.Frame):
             messagebox.showerror("שגיאה", error_msg)
             self.logger.error(error_msg)
 
+    def show_rolling_risk(self):
+        """הצגת סדרות הסיכון המתגלגלות בחלון נפרד"""
+        if not self.local_analyzer() or self.analyzer.hist is None:
+            messagebox.showwarning("שגיאה", "אנא בצע ניתוח לפני הצגת הסיכון")
+            return
+
+        try:
+            rolling = self.analyzer.calculate_rolling_risk()
+        except Exception as e:
+            error_msg = f"שגיאה בחישוב סיכון מתגלגל: {str(e)}"
+            self.log_message(error_msg)
+            messagebox.showerror("שגיאה", error_msg)
+            self.logger.error(error_msg)
+            return
+
+        window = tk.Toplevel(self)
+        window.title(f"סיכון מתגלגל - {self.analyzer.symbol}")
+
+        fig = plt.Figure(figsize=(12, 8))
+        axes = fig.subplots(2, 2)
+        panels = [
+            (axes[0, 0], ['beta'], 'בטא'),
+            (axes[0, 1], ['sharpe'], 'שארפ'),
+            (axes[1, 0], ['volatility'], 'תנודתיות שנתית'),
+            (axes[1, 1], ['max_drawdown', 'var_95'], 'דרודאון ו-VaR')
+        ]
+        for ax, columns, title in panels:
+            for column in columns:
+                ax.plot(rolling.index, rolling[column], label=column)
+            ax.set_title(title, fontsize=12, pad=10)
+            ax.grid(True)
+            ax.tick_params(axis='x', rotation=45)
+        axes[1, 1].legend()
+        fig.tight_layout(pad=3.0)
+
+        canvas = FigureCanvasTkAgg(fig, window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        canvas.draw()
+
     def create_log_area(self, parent):
         """יצירת אזור הלוג"""
         log_frame = ttk.LabelFrame(parent, text="לוג")
@@ -188,7 +233,7 @@ class AnalysisTab(ttk.Frame):
         self.log_message("הנתונים נוקו")
 
     def run_analysis(self):
-        """הרצת הניתוח"""
+        """הרצת הניתוח - דרך השירות המקומי אם הוא רץ, אחרת במנתח מקומי"""
         try:
             symbol = self.symbol_entry.get()
             if not symbol:
@@ -199,40 +244,20 @@ class AnalysisTab(ttk.Frame):
             market_index = self.market_entry.get()
             period = self.period_var.get()
 
-            # יצירת מנתח חדש
-            self.analyzer = EnhancedStockAnalyzer(symbol, market_index)
-            self.log_message("נוצר מנתח חדש")
-
             try:
-                # משיכת נתונים
-                self.log_message("מושך נתונים...")
-                ticker = yf.Ticker(symbol)
-                self.analyzer.hist = ticker.history(period=period)
-
-                if len(self.analyzer.hist) == 0:
-                    raise ValueError(f"לא נמצאו נתונים עבור {symbol}")
-
-                self.log_message(f"נמצאו {len(self.analyzer.hist)} נתונים היסטוריים")
-
-                # חישוב אינדיקטורים טכניים
-                self.log_message("מחשב אינדיקטורים טכניים...")
-                self.analyzer.calculate_technical_indicators()
-
-                # זיהוי תבניות
-                self.log_message("מזהה תבניות טכניות...")
-                self.analyzer.identify_technical_patterns()
-
-                # מציאת רמות תמיכה והתנגדות
-                self.log_message("מחשב רמות תמיכה והתנגדות...")
-                self.analyzer.find_support_resistance()
-
-                # חיזוי מחירים
-                self.log_message("מחשב תחזיות...")
-                self.analyzer.predict_prices()
+                if self.client.is_available():
+                    self.log_message("מנתח דרך השירות המקומי...")
+                    if market_index != ANALYSIS_SETTINGS['risk']['beta_market_index']:
+                        self.log_message(f"השירות מחשב בטא מול {ANALYSIS_SETTINGS['risk']['beta_market_index']}")
+                    self.analyzer = None
+                    view = self._service_view(symbol, period)
+                else:
+                    self._run_local_analysis(symbol, market_index, period)
+                    view = None
 
                 # הצגת התוצאות
                 self.log_message("מציג תוצאות...")
-                self.update_display()
+                self.update_display(view)
 
                 self.log_message("הניתוח הושלם בהצלחה")
                 messagebox.showinfo("הצלחה", "הניתוח הושלם בהצלחה!")
@@ -249,16 +274,99 @@ class AnalysisTab(ttk.Frame):
             messagebox.showerror("שגיאה", error_msg)
             self.logger.error(error_msg)
 
-    def update_display(self):
-        """עדכון תצוגת התוצאות"""
-        if not self.analyzer:
-            return
+    def _service_view(self, symbol: str, period: str) -> dict:
+        """הניתוח מהשירות - הטאב רק מציג את התשובה"""
+        result = self.client.analyze(symbol)
+        chart = trim_to_period(chart_frame(result), period)
+        self.log_message(f"התקבלו {len(chart)} נתונים היסטוריים (השירות מחזיק {SERVICE_SETTINGS['period']})")
+        technical = result['technical_analysis']
+        return {
+            'symbol': symbol,
+            'score': result['score'],
+            'patterns': [(pattern['type'], pattern['confidence']) for pattern in technical['patterns']],
+            'support_resistance': technical['support_resistance'],
+            'chart': chart,
+            'simulation': simulation_bands(result)
+        }
+
+    def _run_local_analysis(self, symbol: str, market_index: str, period: str):
+        """ניתוח מלא במנתח מקומי - כשהשירות לא רץ"""
+        # יצירת מנתח חדש
+        self.analyzer = EnhancedStockAnalyzer(symbol, market_index)
+        self.log_message("נוצר מנתח חדש")
+
+        # משיכת נתונים
+        self.log_message("מושך נתונים...")
+        ticker = yf.Ticker(symbol)
+        self.analyzer.hist = ticker.history(period=period)
+
+        if len(self.analyzer.hist) == 0:
+            raise ValueError(f"לא נמצאו נתונים עבור {symbol}")
+
+        self.log_message(f"נמצאו {len(self.analyzer.hist)} נתונים היסטוריים")
+
+        # נתוני מדד הייחוס - נדרשים לבטא
+        try:
+            self.analyzer.market_hist = yf.Ticker(market_index).history(period=period)
+        except Exception as e:
+            self.log_message(f"לא ניתן למשוך את נתוני המדד {market_index}: {str(e)}")
+
+        # חישוב אינדיקטורים טכניים
+        self.log_message("מחשב אינדיקטורים טכניים...")
+        self.analyzer.calculate_technical_indicators()
+
+        # זיהוי תבניות
+        self.log_message("מזהה תבניות טכניות...")
+        self.analyzer.identify_technical_patterns()
+
+        # מציאת רמות תמיכה והתנגדות
+        self.log_message("מחשב רמות תמיכה והתנגדות...")
+        self.analyzer.find_support_resistance()
+
+        # חיזוי מחירים
+        self.log_message("מחשב תחזיות...")
+        self.analyzer.predict_prices()
+
+    def local_analyzer(self):
+        """המנתח המקומי, לפעולות שדורשות את כל ההיסטוריה (ייצוא, סיכון מתגלגל, שמירה).
+
+        אחרי ניתוח דרך השירות הוא נבנה רק בפעם הראשונה שפעולה כזאת נדרשת.
+        """
+        if self.analyzer is None and self.view is not None:
+            self.log_message("בונה מנתח מקומי...")
+            try:
+                self._run_local_analysis(self.view['symbol'], self.market_entry.get(), self.period_var.get())
+            except Exception as e:
+                self.analyzer = None
+                self.log_message(f"שגיאה בבניית מנתח מקומי: {str(e)}")
+                self.logger.error(f"Error building local analyzer: {str(e)}")
+        return self.analyzer
+
+    def _analyzer_view(self) -> dict:
+        """התצוגה מהמנתח המקומי"""
+        simulation = self.analyzer.price_simulation
+        return {
+            'symbol': self.analyzer.symbol,
+            'score': self.analyzer.calculate_final_score(),
+            'patterns': [(pattern.pattern_type, pattern.confidence) for pattern in self.analyzer.technical_patterns],
+            'support_resistance': self.analyzer.support_resistance_levels,
+            'chart': self.analyzer.hist,
+            'simulation': simulation.bands if simulation is not None else None
+        }
+
+    def update_display(self, view=None):
+        """עדכון תצוגת התוצאות - מתשובת השירות, או מהמנתח המקומי"""
+        if view is None:
+            if not self.analyzer:
+                return
+            view = self._analyzer_view()
+        self.view = view
 
         # ניקוי תצוגה קודמת
         self.clear_data()
 
-        # חישוב המלצה
-        results = self.analyzer.calculate_final_score()
+        # המלצה
+        results = view['score']
 
         # הצגת המלצה וציון סופי
         self.results_tree.insert("", tk.END, values=(
@@ -285,23 +393,23 @@ class AnalysisTab(ttk.Frame):
             ))
 
         # הצגת תבניות טכניות
-        for pattern in self.analyzer.technical_patterns:
+        for pattern_type, confidence in view['patterns']:
             self.results_tree.insert("", tk.END, values=(
                 "תבנית טכנית",
-                f"{pattern.pattern_type} ({pattern.confidence:.1f}%)"
+                f"{pattern_type} ({confidence:.1f}%)"
             ))
 
         # הצגת רמות תמיכה והתנגדות
-        for level in self.analyzer.support_resistance_levels["support"]:
+        for level in view['support_resistance']["support"]:
             self.results_tree.insert("", tk.END, values=(
                 "רמת תמיכה",
-                f"{level['price']:.2f}"
+                f"{level['price']:.2f} ({level.get('touches', 1)} נגיעות)"
             ))
 
-        for level in self.analyzer.support_resistance_levels["resistance"]:
+        for level in view['support_resistance']["resistance"]:
             self.results_tree.insert("", tk.END, values=(
                 "רמת התנגדות",
-                f"{level['price']:.2f}"
+                f"{level['price']:.2f} ({level.get('touches', 1)} נגיעות)"
             ))
 
         # עדכון גרפים
@@ -309,34 +417,43 @@ class AnalysisTab(ttk.Frame):
 
     def update_charts(self):
         """עדכון הגרפים"""
-        if not self.analyzer or self.analyzer.hist is None:
+        if not self.view or self.view['chart'] is None:
             return
+        hist = self.view['chart']
 
         # מחיקת הגרפים הקודמים
         for ax in [self.ax1, self.ax2, self.ax3, self.ax4]:
             ax.clear()
 
         # גרף מחיר
-        self.ax1.plot(self.analyzer.hist.index, self.analyzer.hist['Close'], label='מחיר סגירה')
-        if 'BBANDS_Upper' in self.analyzer.hist.columns:
-            self.ax1.plot(self.analyzer.hist.index, self.analyzer.hist['BBANDS_Upper'], 'r--', label='Bollinger Upper')
-            self.ax1.plot(self.analyzer.hist.index, self.analyzer.hist['BBANDS_Lower'], 'r--', label='Bollinger Lower')
+        self.ax1.plot(hist.index, hist['Close'], label='מחיר סגירה')
+        if 'BBANDS_Upper' in hist.columns:
+            self.ax1.plot(hist.index, hist['BBANDS_Upper'], 'r--', label='Bollinger Upper')
+            self.ax1.plot(hist.index, hist['BBANDS_Lower'], 'r--', label='Bollinger Lower')
+        bands = self.view['simulation']
+        if bands is not None:
+            # רצועות הסימולציה על ימי המסחר הבאים
+            future = pd.bdate_range(hist.index[-1], periods=len(bands) + 1, inclusive='right')
+            levels = sorted(bands.columns)
+            for low, high in zip(levels[:len(levels) // 2], levels[::-1][:len(levels) // 2]):
+                self.ax1.fill_between(future, bands[low], bands[high], color='tab:blue', alpha=0.15)
+            self.ax1.plot(future, bands[0.5], 'b:', label='תחזית (חציון)')
         self.ax1.set_title('מחיר המניה', fontsize=12, pad=10)
         self.ax1.legend()
         self.ax1.grid(True)
 
         # גרף RSI
-        self.ax2.plot(self.analyzer.hist.index, self.analyzer.hist['RSI'])
+        self.ax2.plot(hist.index, hist['RSI'])
         self.ax2.axhline(y=70, color='r', linestyle='--')
         self.ax2.axhline(y=30, color='g', linestyle='--')
         self.ax2.set_title('RSI', fontsize=12, pad=10)
         self.ax2.grid(True)
 
         # גרף MACD
-        self.ax3.plot(self.analyzer.hist.index, self.analyzer.hist['MACD'], label='MACD')
-        self.ax3.plot(self.analyzer.hist.index, self.analyzer.hist['MACD_Signal'], label='Signal Line')
-        self.ax3.bar(self.analyzer.hist.index, self.analyzer.hist['MACD_Hist'],
-                     color=['g' if x > 0 else 'r' for x in self.analyzer.hist['MACD_Hist']],
+        self.ax3.plot(hist.index, hist['MACD'], label='MACD')
+        self.ax3.plot(hist.index, hist['MACD_Signal'], label='Signal Line')
+        self.ax3.bar(hist.index, hist['MACD_Hist'],
+                     color=['g' if x > 0 else 'r' for x in hist['MACD_Hist']],
                      alpha=0.3)
         self.ax3.set_title('MACD', fontsize=12, pad=10)
         self.ax3.legend()
@@ -344,7 +461,7 @@ class AnalysisTab(ttk.Frame):
 
         # גרף נפח מ
         # גרף נפח מסחר
-        self.ax4.bar(self.analyzer.hist.index, self.analyzer.hist['Volume'], alpha=0.5)
+        self.ax4.bar(hist.index, hist['Volume'], alpha=0.5)
         self.ax4.set_title('נפח מסחר', fontsize=12, pad=10)
         self.ax4.grid(True)
 
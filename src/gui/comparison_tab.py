@@ -6,13 +6,22 @@ import yfinance as yf
 import numpy as np
 import logging
 from ..analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+from ..utils.service_client import ServiceClient, chart_frame, trim_to_period
+
+
+def _format(value, spec: str, suffix: str = "") -> str:
+    """ערך חסר (None מהשירות או NaN) מוצג כ-N/A"""
+    if value is None or np.isnan(value):
+        return "N/A"
+    return f"{value:{spec}}{suffix}"
 
 
 class ComparisonTab(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.logger = logging.getLogger(__name__)
-        self.analyzers = {}  # מילון של מנתחים לכל מניה
+        self.stocks = {}  # לכל מניה: סדרות הגרף, RSI ומדדי הסיכון - מהשירות או ממנתח מקומי
+        self.client = ServiceClient()
         self.setup_ui()
 
     def setup_ui(self):
@@ -114,27 +123,16 @@ class ComparisonTab(ttk.Frame):
             messagebox.showwarning("שגיאה", "נא להזין סימול מניה")
             return
 
-        if symbol in self.analyzers:
+        if symbol in self.stocks:
             messagebox.showwarning("שגיאה", "המניה כבר נמצאת בהשוואה")
             return
 
         try:
-            # יצירת מנתח חדש
-            analyzer = EnhancedStockAnalyzer(symbol)
-
-            # משיכת נתונים
             period = self.period_var.get()
-            stock = yf.Ticker(symbol)
-            analyzer.hist = stock.history(period=period)
-
-            if len(analyzer.hist) == 0:
-                raise ValueError(f"לא נמצאו נתונים עבור {symbol}")
-
-            # חישוב אינדיקטורים
-            analyzer.calculate_technical_indicators()
-
-            # שמירת המנתח
-            self.analyzers[symbol] = analyzer
+            if self.client.is_available():
+                self.stocks[symbol] = self._service_stock(symbol, period)
+            else:
+                self.stocks[symbol] = self._local_stock(symbol, period)
 
             # הוספה לרשימת המניות
             self.stocks_listbox.insert(tk.END, symbol)
@@ -149,6 +147,23 @@ class ComparisonTab(ttk.Frame):
             messagebox.showerror("שגיאה", f"שגיאה בהוספת המניה: {str(e)}")
             self.logger.error(f"Error adding stock {symbol}: {str(e)}")
 
+    def _service_stock(self, symbol: str, period: str) -> dict:
+        """נתוני ההשוואה מהשירות המקומי"""
+        result = self.client.analyze(symbol)
+        chart = trim_to_period(chart_frame(result), period)
+        if len(chart) == 0:
+            raise ValueError(f"לא נמצאו נתונים עבור {symbol}")
+        return {'chart': chart, 'rsi': result['indicators'].get('RSI'), 'risk_metrics': result['risk_metrics']}
+
+    def _local_stock(self, symbol: str, period: str) -> dict:
+        """נתוני ההשוואה ממנתח מקומי - כשהשירות לא רץ"""
+        analyzer = EnhancedStockAnalyzer(symbol)
+        analyzer.hist = yf.Ticker(symbol).history(period=period)
+        if len(analyzer.hist) == 0:
+            raise ValueError(f"לא נמצאו נתונים עבור {symbol}")
+        return {'chart': analyzer.hist, 'rsi': analyzer.indicators['RSI'].iloc[-1],
+                'risk_metrics': analyzer.calculate_risk_metrics()}
+
     def remove_stock(self):
         """הסרת מניה מההשוואה"""
         selection = self.stocks_listbox.curselection()
@@ -157,15 +172,15 @@ class ComparisonTab(ttk.Frame):
             return
 
         symbol = self.stocks_listbox.get(selection[0])
-        if symbol in self.analyzers:
-            del self.analyzers[symbol]
+        if symbol in self.stocks:
+            del self.stocks[symbol]
             self.stocks_listbox.delete(selection[0])
             self.update_comparison()
             self.update_charts()
 
     def clear_all(self):
         """ניקוי כל ההשוואה"""
-        self.analyzers.clear()
+        self.stocks.clear()
         self.stocks_listbox.delete(0, tk.END)
         self.update_comparison()
         self.update_charts()
@@ -177,42 +192,34 @@ class ComparisonTab(ttk.Frame):
             self.comparison_tree.delete(item)
 
         # עדכון נתונים
-        for symbol, analyzer in self.analyzers.items():
-            if analyzer.hist is None:
-                continue
-
-            last_price = analyzer.hist['Close'].iloc[-1]
-            change = (analyzer.hist['Close'].iloc[-1] / analyzer.hist['Close'].iloc[-2] - 1) * 100
-            volume = analyzer.hist['Volume'].iloc[-1]
-
-            # חישוב מדדים
-            rsi = analyzer.hist['RSI'].iloc[-1] if 'RSI' in analyzer.hist else np.nan
-            metrics = analyzer.calculate_risk_metrics()
+        for symbol, stock in self.stocks.items():
+            prices = stock['chart']['Close']
+            last_price = prices.iloc[-1]
+            change = (prices.iloc[-1] / prices.iloc[-2] - 1) * 100 if len(prices) > 1 else np.nan
+            volume = stock['chart']['Volume'].iloc[-1]
+            metrics = stock['risk_metrics']
 
             self.comparison_tree.insert("", tk.END, values=(
                 symbol,
                 f"{last_price:.2f}",
-                f"{change:.1f}%",
+                _format(change, ".1f", "%"),
                 f"{volume:,.0f}",
-                f"{rsi:.1f}" if not np.isnan(rsi) else "N/A",
-                f"{metrics.get('beta', np.nan):.2f}",
-                f"{metrics.get('sharpe', np.nan):.2f}",
-                f"{metrics.get('volatility', np.nan):.2f}"
+                _format(stock['rsi'], ".1f"),
+                _format(metrics.get('beta'), ".2f"),
+                _format(metrics.get('sharpe'), ".2f"),
+                _format(metrics.get('volatility'), ".2f")
             ))
 
     def update_charts(self):
         """עדכון הגרפים"""
         self.ax.clear()
 
-        for symbol, analyzer in self.analyzers.items():
-            if analyzer.hist is None:
-                continue
-
+        for symbol, stock in self.stocks.items():
             # נרמול מחירים ל-100
-            prices = analyzer.hist['Close']
+            prices = stock['chart']['Close']
             normalized_prices = prices / prices.iloc[0] * 100
 
-            self.ax.plot(analyzer.hist.index, normalized_prices,
+            self.ax.plot(prices.index, normalized_prices,
                          label=symbol)
 
         self.ax.set_title('השוואת מחירים (מנורמל)')
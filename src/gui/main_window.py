@@ -92,7 +92,7 @@ class MainWindow:
             self.root.configure(bg='#f0f0f0')
 
     def export_to_excel(self):
-        if hasattr(self.analysis_tab, 'analyzer') and self.analysis_tab.analyzer:
+        if self.analysis_tab.local_analyzer():
             try:
                 filename = filedialog.asksaveasfilename(
                     defaultextension=".xlsx",
@@ -108,7 +108,7 @@ class MainWindow:
             messagebox.showwarning("שגיאה", "אנא בצע ניתוח לפני הייצוא")
 
     def save_analysis(self):
-        if hasattr(self.analysis_tab, 'analyzer') and self.analysis_tab.analyzer:
+        if self.analysis_tab.local_analyzer():
             try:
                 filename = filedialog.asksaveasfilename(
                     defaultextension=".json",
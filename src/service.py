@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from aiohttp import web
+from .analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer, scoring_version
+from .analyzers.analysis_snapshot import thaw
+from .analyzers.risk_engine import market_breadth
+from .analyzers.screener import Screener
+from .config.settings import ANALYSIS_SETTINGS, SERVICE_SETTINGS
+from .utils.financial_store import FinancialStatementsStore, get_financial_store
+from .utils.panel_store import PanelStore
+from .utils.result_cache import ResultCache, data_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# הסדרות שהטאבים של ה-GUI מציירים
+CHART_COLUMNS = ['Close', 'Volume', 'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist', 'BBANDS_Upper', 'BBANDS_Lower']
+
+
+def to_jsonable(value: Any) -> Any:
+    """המרה רקורסיבית לערכים ש-JSON תקני יכול לייצג (NaN/inf -> None, תאריכים -> ISO)"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def download_history(symbol: str, period: str) -> pd.DataFrame:
+    return yf.Ticker(symbol).history(period=period)
+
+
+class AnalysisService:
+    """מצב חם בזיכרון: מנתח לכל מניה, ההיסטוריה שלו, האינדיקטורים ותמונת המצב.
+
+    היסטוריה נמשכת מחדש רק אחרי history_ttl שניות. תשובות נשמרות במטמון לפי טביעת
+    האצבע של הנתונים, כך שהן מתבטלות מעצמן כשמגיע נר חדש. עבודת החישוב רצה ב-thread
+    ומוגבלת ב-semaphore; נעילה לכל מניה מונעת משיכה וחישוב כפולים של אותה מניה.
+    כל היסטוריה שנמשכת נכתבת גם לפאנל המחירים, שממנו מתעדכנים מחירי הסורק ורוחב השוק.
+    """
+
+    def __init__(self, loader: Callable[[str, str], pd.DataFrame] = download_history,
+                 financials: Optional[FinancialStatementsStore] = None):
+        self.loader = loader
+        self.financials = financials or get_financial_store()
+        self.period = SERVICE_SETTINGS['period']
+        self.market_index = ANALYSIS_SETTINGS['risk']['beta_market_index']
+        self.analyzers: Dict[str, EnhancedStockAnalyzer] = {}
+        self.screener = Screener()
+        self.panel = PanelStore(self.market_index)
+        self._loaded_at: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._responses = ResultCache(SERVICE_SETTINGS['request_cache_size'])
+        self._semaphore = asyncio.Semaphore(SERVICE_SETTINGS['max_concurrency'])
+        self._screen_version = 0
+        self.market_hist: Optional[pd.DataFrame] = None
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    def _is_fresh(self, key: str) -> bool:
+        loaded_at = self._loaded_at.get(key)
+        return loaded_at is not None and time.monotonic() - loaded_at < SERVICE_SETTINGS['history_ttl']
+
+    async def _market(self) -> Optional[pd.DataFrame]:
+        """היסטוריית מדד הייחוס, משותפת לכל המניות"""
+        async with self._lock(self.market_index):
+            if not self._is_fresh(self.market_index):
+                try:
+                    async with self._semaphore:
+                        self.market_hist = await asyncio.to_thread(self.loader, self.market_index, self.period)
+                    self._loaded_at[self.market_index] = time.monotonic()
+                    self._update_panel(self.market_index, self.market_hist)
+                except Exception as e:
+                    logger.error(f"Error loading market data: {str(e)}")
+        return self.market_hist
+
+    async def _analyzer(self, symbol: str, refresh: bool = False) -> EnhancedStockAnalyzer:
+        """המנתח החם של המניה; ההיסטוריה נמשכת מחדש רק כשפג תוקפה. נקרא תחת נעילת המניה"""
+        market_hist = await self._market()
+        analyzer = self.analyzers.get(symbol)
+        if analyzer is None or refresh or not self._is_fresh(symbol):
+            async with self._semaphore:
+                hist = await asyncio.to_thread(self.loader, symbol, self.period)
+            if hist is None or len(hist) == 0:
+                raise ValueError(f"No data for {symbol}")
+            if analyzer is None:
+                analyzer = EnhancedStockAnalyzer(symbol, self.market_index)
+                self.analyzers[symbol] = analyzer
+            # נתונים זהים לא מבטלים את מה שכבר חושב
+            if analyzer.hist is None or data_fingerprint(analyzer.hist) != data_fingerprint(hist):
+                analyzer.hist = hist
+                self._update_panel(symbol, hist)
+                async with self._semaphore:
+                    await asyncio.to_thread(self._fundamentals, analyzer)
+            self._loaded_at[symbol] = time.monotonic()
+        if market_hist is not None and len(market_hist) and analyzer.market_hist is not market_hist:
+            analyzer.market_hist = market_hist
+        return analyzer
+
+    def _fundamentals(self, analyzer: EnhancedStockAnalyzer):
+        """מדדי היסוד לפי המחיר החדש; הדוחות נמשכים רק כשצפויה תקופה חדשה. רץ ב-thread"""
+        try:
+            self.financials.update(analyzer.symbol, 'annual')
+            analyzer.calculate_fundamental_metrics(self.financials)
+        except Exception as e:
+            logger.error(f"Error computing fundamentals for {analyzer.symbol}: {str(e)}")
+
+    def _update_panel(self, symbol: str, hist: Optional[pd.DataFrame]):
+        """כתיבת היסטוריה שנמשכה לפאנל ורענון מחירי היום האחרון של כל המניות החמות בסורק"""
+        if hist is None or len(hist) == 0:
+            return
+        # משיכה מלאה - מחירים מתואמים שהשתנו בדיעבד מחליפים את הישנים
+        self.panel.extend({symbol: hist}, replace=True)
+        self.screener.update_from_panel(self.panel, symbols=self.analyzers)
+        self._screen_version += 1
+
+    @staticmethod
+    def _analysis(analyzer: EnhancedStockAnalyzer) -> Dict:
+        """הניתוח המלא - רץ ב-thread"""
+        snapshot = analyzer.snapshot()
+        analyzer.identify_technical_patterns()
+        analyzer.find_support_resistance()
+        analyzer.predict_prices()
+        report = analyzer.generate_report()
+        indicators = analyzer.indicators.materialize()
+        chart = pd.concat([analyzer.hist[['Close', 'Volume']], indicators], axis=1).reindex(columns=CHART_COLUMNS)
+        simulation = analyzer.price_simulation
+        report.update({
+            'last_close': snapshot.last_close,
+            'indicators': thaw(snapshot.indicators),
+            'score': thaw(snapshot.score),
+            'chart': {'date': list(chart.index), **{column: chart[column].tolist() for column in chart}},
+            'simulation': {quantile: simulation.bands[quantile].tolist() for quantile in simulation.bands}
+            if simulation is not None else None
+        })
+        return report
+
+    async def analyze(self, symbol: str, refresh: bool = False) -> Dict:
+        """ניתוח מניה, מהמטמון אם הנתונים לא השתנו"""
+        async with self._lock(symbol):
+            analyzer = await self._analyzer(symbol, refresh)
+            key = ('analyze', symbol, data_fingerprint(analyzer.hist), data_fingerprint(analyzer.market_hist),
+                   scoring_version())
+            result = self._responses.get(key)
+            if result is None:
+                async with self._semaphore:
+                    result = to_jsonable(await asyncio.to_thread(self._analysis, analyzer))
+                self._responses.set(key, result)
+                if self.screener.upsert_snapshot(analyzer.snapshot(), analyzer.fundamental_metrics):
+                    self._screen_version += 1
+            return result
+
+    async def screen(self, where: Optional[str] = None, sort: Optional[str] = None,
+                     limit: Optional[int] = None) -> Dict:
+        """שאילתה על המניות החמות; המטמון מתבטל בכל עדכון של הטבלה"""
+        key = ('screen', where, sort, limit, self._screen_version)
+        result = self._responses.get(key)
+        if result is None:
+            table = self.screener.query(where, sort, limit)
+            result = to_jsonable({'count': len(table), 'rows': table.reset_index().to_dict(orient='records')})
+            self._responses.set(key, result)
+        return result
+
+    async def breadth(self, days: Optional[int] = None) -> Dict:
+        """רוחב השוק של המניות החמות מפאנל המחירים; המטמון מתבטל בכל עדכון של הפאנל"""
+        key = ('breadth', days, self._screen_version)
+        result = self._responses.get(key)
+        if result is None:
+            table = market_breadth(self.panel, exclude=[self.market_index]) if len(self.panel) else pd.DataFrame()
+            if days is not None:
+                table = table.tail(days)
+            result = to_jsonable({'date': list(table.index), **{column: table[column].tolist() for column in table}})
+            self._responses.set(key, result)
+        return result
+
+    async def add_alert(self, symbol: str, target_price: float, condition: str) -> Dict:
+        async with self._lock(symbol):
+            analyzer = await self._analyzer(symbol)
+            analyzer.add_price_alert(target_price, condition)
+            return {'symbol': symbol, 'alerts': len(analyzer.alerts)}
+
+    async def check_alerts(self, symbol: str) -> Dict:
+        async with self._lock(symbol):
+            analyzer = await self._analyzer(symbol)
+            triggered = analyzer.check_alerts()
+            return to_jsonable({
+                'symbol': symbol,
+                'triggered': [{'condition': alert.condition, 'target_value': alert.target_value,
+                               'current_value': float(analyzer.hist['Close'].iloc[-1])} for alert in triggered],
+                'active': sum(not alert.triggered for alert in analyzer.alerts)
+            })
+
+    def status(self) -> Dict:
+        return {
+            'symbols': sorted(self.analyzers),
+            'cached_responses': len(self._responses),
+            'cache_hits': self._responses.hits,
+            'cache_misses': self._responses.misses
+        }
+
+
+def _json_handler(handler):
+    """תשובת JSON אחידה; ValueError (קלט שגוי או מניה בלי נתונים) -> 400"""
+    async def wrapped(request: web.Request) -> web.Response:
+        try:
+            return web.json_response(await handler(request))
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        except Exception as e:
+            logger.error(f"Error handling {request.path}: {str(e)}")
+            return web.json_response({'error': str(e)}, status=500)
+    return wrapped
+
+
+def _query_count(request: web.Request, name: str) -> Optional[int]:
+    """פרמטר שאילתה שלם ולא שלילי (limit, days), או None אם לא נשלח"""
+    value = request.query.get(name)
+    if not value:
+        return None
+    count = int(value)
+    if count < 0:
+        raise ValueError(f"{name} must be non-negative: {count}")
+    return count
+
+
+async def _alert_request(request: web.Request):
+    """גוף בקשת התראה - (target_price, condition); קלט שגוי -> ValueError"""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ValueError("Request body must be valid JSON")
+    if not isinstance(body, dict) or 'target_price' not in body:
+        raise ValueError("Request body must be a JSON object with target_price")
+
+    target_price = body['target_price']
+    if isinstance(target_price, bool) or not isinstance(target_price, (int, float, str)):
+        raise ValueError(f"target_price must be a number: {target_price!r}")
+    target_price = float(target_price)
+    if not math.isfinite(target_price) or target_price <= 0:
+        raise ValueError(f"target_price must be a positive number: {target_price}")
+
+    condition = body.get('condition', 'above')
+    if condition not in ('above', 'below'):
+        raise ValueError("Condition must be 'above' or 'below'")
+    return target_price, condition
+
+
+SERVICE_KEY = web.AppKey('service', AnalysisService)
+
+
+def create_app(service: Optional[AnalysisService] = None) -> web.Application:
+    """אפליקציית aiohttp עם נקודות הקצה של השירות"""
+    app = web.Application()
+    app[SERVICE_KEY] = service or AnalysisService()
+
+    def get_service(request: web.Request) -> AnalysisService:
+        return request.app[SERVICE_KEY]
+
+    async def health(request):
+        return {'status': 'ok', **get_service(request).status()}
+
+    async def analyze(request):
+        refresh = request.query.get('refresh', '').lower() in ('1', 'true', 'yes')
+        return await get_service(request).analyze(request.match_info['symbol'], refresh)
+
+    async def screen(request):
+        return await get_service(request).screen(request.query.get('where'), request.query.get('sort'),
+                                                 _query_count(request, 'limit'))
+
+    async def breadth(request):
+        return await get_service(request).breadth(_query_count(request, 'days'))
+
+    async def add_alert(request):
+        target_price, condition = await _alert_request(request)
+        return await get_service(request).add_alert(request.match_info['symbol'], target_price, condition)
+
+    async def check_alerts(request):
+        return await get_service(request).check_alerts(request.match_info['symbol'])
+
+    app.router.add_get('/health', _json_handler(health))
+    app.router.add_get('/analyze/{symbol}', _json_handler(analyze))
+    app.router.add_get('/screen', _json_handler(screen))
+    app.router.add_get('/breadth', _json_handler(breadth))
+    app.router.add_post('/alerts/{symbol}', _json_handler(add_alert))
+    app.router.add_get('/alerts/{symbol}', _json_handler(check_alerts))
+    return app
+
+
+def run_service(host: Optional[str] = None, port: Optional[int] = None):
+    """הרצת השירות עד לעצירה"""
+    web.run_app(create_app(), host=host or SERVICE_SETTINGS['host'], port=port or SERVICE_SETTINGS['port'])
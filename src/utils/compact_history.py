@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+EPOCH_DAY = np.datetime64('1970-01-01', 'D')
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+@dataclass
+class CompactHistory:
+    """ייצוג דחוס של היסטוריה יומית - float32 למחירים ולאינדיקטורים, מספרים שלמים לנפח ולתאריכים.
+
+    ההמרה חזרה ל-float64 נעשית רק ב-to_frame, בגבול שבו נדרש דיוק מלא.
+    """
+    days: np.ndarray                  # int32 - ימים מאז 1970-01-01
+    prices: np.ndarray                # float32 (n, 4) - Open/High/Low/Close
+    volume: np.ndarray                # int32, או int64 אם הנפח גדול מדי
+    indicators: np.ndarray            # float32 (n, k)
+    indicator_names: List[str] = field(default_factory=list)
+    tz: Optional[str] = None
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, indicator_columns: Optional[List[str]] = None) -> 'CompactHistory':
+        """המרת טבלת היסטוריה (כמו self.hist) לייצוג הדחוס"""
+        index = pd.DatetimeIndex(frame.index)
+        tz = str(index.tz) if index.tz is not None else None
+        local_days = index.tz_localize(None).normalize() if tz else index.normalize()
+        days = (local_days.values.astype('datetime64[D]') - EPOCH_DAY).astype(np.int32)
+
+        volume = frame['Volume'].fillna(0).to_numpy()
+        volume_dtype = np.int32 if len(volume) == 0 or volume.max() <= _INT32_MAX else np.int64
+
+        if indicator_columns is None:
+            indicator_columns = [column for column in frame.columns
+                                 if column not in PRICE_COLUMNS and column != 'Volume'
+                                 and pd.api.types.is_numeric_dtype(frame[column])]
+
+        return cls(
+            days=days,
+            prices=np.ascontiguousarray(frame[PRICE_COLUMNS].to_numpy(dtype=np.float32)),
+            volume=volume.astype(volume_dtype),
+            indicators=np.ascontiguousarray(frame[indicator_columns].to_numpy(dtype=np.float32)).reshape(
+                len(frame), len(indicator_columns)),
+            indicator_names=list(indicator_columns),
+            tz=tz
+        )
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def nbytes(self) -> int:
+        """גודל המערכים בזיכרון"""
+        return self.days.nbytes + self.prices.nbytes + self.volume.nbytes + self.indicators.nbytes
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        """אינדקס תאריכים מלא - משוחזר מימי ה-epoch"""
+        index = pd.DatetimeIndex(EPOCH_DAY + self.days.astype('timedelta64[D]'))
+        return index.tz_localize(self.tz) if self.tz else index
+
+    def column(self, name: str) -> np.ndarray:
+        """גישה לעמודה בייצוג הדחוס, ללא המרה"""
+        if name in PRICE_COLUMNS:
+            return self.prices[:, PRICE_COLUMNS.index(name)]
+        if name == 'Volume':
+            return self.volume
+        if name in self.indicator_names:
+            return self.indicators[:, self.indicator_names.index(name)]
+        raise KeyError(f"Unknown column: {name}")
+
+    def to_frame(self, include_indicators: bool = True) -> pd.DataFrame:
+        """שחזור טבלה בדיוק מלא (float64) עבור API שדורש אותה"""
+        frame = pd.DataFrame(self.prices.astype(np.float64), index=self.index, columns=PRICE_COLUMNS)
+        frame['Volume'] = self.volume.astype(np.int64)
+        if include_indicators:
+            for j, name in enumerate(self.indicator_names):
+                frame[name] = self.indicators[:, j].astype(np.float64)
+        return frame
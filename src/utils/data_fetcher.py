@@ -4,6 +4,7 @@ from typing import Dict, Any, Optional
 import logging
 from ..config.settings import API_RATE_LIMIT, API_TIMEOUT
 from .cache_manager import CacheManager
+from .financial_store import get_financial_store
 
 class DataFetcher:
     def __init__(self):
@@ -63,9 +64,15 @@ class DataFetcher:
         return await self.fetch_with_cache(url, f"history_{symbol}_{start_date}_{end_date}")
 
     async def fetch_financial_statements(self, symbol: str) -> Optional[Dict[str, Any]]:
-        """משיכת דוחות כספיים"""
-        url = f"https://api.example.com/stocks/{symbol}/financials"
-        return await self.fetch_with_cache(url, f"financials_{symbol}")
+        """משיכת דוחות כספיים - מהמאגר המקומי, שמושך רק תקופות חדשות"""
+        store = get_financial_store()
+        try:
+            async with self._semaphore:
+                return {frequency: await asyncio.to_thread(store.update, symbol, frequency)
+                        for frequency in ('quarterly', 'annual')}
+        except Exception as e:
+            self.logger.error(f"Error fetching financial statements: {str(e)}")
+            return None
 
     async def fetch_company_info(self, symbol: str) -> Optional[Dict[str, Any]]:
         """משיכת מידע על החברה"""
@@ -0,0 +1,231 @@
+import logging
+import pickle
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from ..config.settings import FINANCIALS_FILE, FINANCIALS_SETTINGS
+
+FREQUENCIES = ('quarterly', 'annual')
+
+LONG_COLUMNS = ['frequency', 'period', 'symbol', 'field', 'value']
+LONG_DTYPES = {'frequency': object, 'period': 'datetime64[ns]', 'symbol': object, 'field': object,
+               'value': float}
+
+# שמות השדות של yfinance -> שדות גולמיים של FundamentalIndicators.analyze_cross_section
+FUNDAMENTAL_FIELDS = {
+    'eps': 'Diluted EPS',
+    'net_income': 'Net Income',
+    'revenue': 'Total Revenue',
+    'shareholder_equity': 'Stockholders Equity',
+    'total_debt': 'Total Debt',
+    'current_assets': 'Current Assets',
+    'current_liabilities': 'Current Liabilities',
+    'inventory': 'Inventory',
+    'shares': 'Ordinary Shares Number'
+}
+
+
+def download_statements(symbol: str, frequency: str) -> pd.DataFrame:
+    """דוח רווח והפסד, מאזן ותזרים מ-yfinance, מאוחדים לטבלה של תקופה x שדה"""
+    ticker = yf.Ticker(symbol)
+    if frequency == 'quarterly':
+        parts = [ticker.quarterly_income_stmt, ticker.quarterly_balance_sheet, ticker.quarterly_cashflow]
+    else:
+        parts = [ticker.income_stmt, ticker.balance_sheet, ticker.cashflow]
+
+    frames = [part.T for part in parts if part is not None and not part.empty]
+    if not frames:
+        return pd.DataFrame()
+    statements = pd.concat(frames, axis=1)
+    return statements.loc[:, ~statements.columns.duplicated()]
+
+
+class FinancialStatementsStore:
+    """מאגר מקומי של דוחות כספיים - טבלה ארוכה אחת לכל היקום: שורה לכל תדירות, תקופה, מניה ושדה.
+
+    הרשת נבדקת רק כשתקופה חדשה אמורה כבר להתפרסם (סוף התקופה האחרונה + אורך תקופה + זמן דיווח),
+    ולכל היותר פעם ב-recheck_days. תקופות חדשות מתווספות לקיימות, כך שההיסטוריה מצטברת
+    גם מעבר לתקופות ש-yfinance מחזיר. חתך רוחבי של כל המניות נקרא מהטבלה האחת בסינון וקטורי.
+    """
+
+    def __init__(self, path: Optional[Path] = None,
+                 fetcher: Callable[[str, str], pd.DataFrame] = download_statements):
+        self.path = Path(path or FINANCIALS_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fetcher = fetcher
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._table: Optional[pd.DataFrame] = None
+        self._checked: Dict[tuple, datetime] = {}
+        self._wide: Dict[tuple, pd.DataFrame] = {}
+
+    @staticmethod
+    def _check_frequency(frequency: str):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+
+    def _load(self):
+        """טעינת הטבלה ומועדי הבדיקה מהדיסק, פעם אחת"""
+        if self._table is not None:
+            return
+        table, checked = pd.DataFrame(columns=LONG_COLUMNS).astype(LONG_DTYPES), {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'rb') as f:
+                    stored = pickle.load(f)
+                table, checked = stored['statements'], stored['checked']
+            except Exception as e:
+                self.logger.error(f"Error reading financial statements: {str(e)}")
+        self._table, self._checked = table, checked
+
+    @property
+    def table(self) -> pd.DataFrame:
+        """הטבלה הארוכה (frequency, period, symbol, field, value)"""
+        self._load()
+        return self._table
+
+    def _save(self):
+        with open(self.path, 'wb') as f:
+            pickle.dump({'statements': self.table, 'checked': self._checked}, f)
+
+    def _rows(self, frequency: str, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        table = self.table
+        mask = table['frequency'] == frequency
+        if symbols is not None:
+            mask &= table['symbol'].isin(list(symbols))
+        return table[mask]
+
+    def is_due(self, symbol: str, frequency: str, now: Optional[datetime] = None) -> bool:
+        """האם צפויה תקופה חדשה שעוד לא נמשכה"""
+        now = now or datetime.now()
+        self._check_frequency(frequency)
+        settings = FINANCIALS_SETTINGS[frequency]
+
+        self._load()
+        checked = self._checked.get((symbol, frequency))
+        if checked is not None and now - checked < timedelta(days=FINANCIALS_SETTINGS['recheck_days']):
+            return False
+        statements = self.statements(symbol, frequency)
+        if statements.empty:
+            return True
+        expected = statements.index.max() + timedelta(days=settings['period_days'] + settings['report_lag_days'])
+        return now >= expected
+
+    def _merge(self, symbol: str, frequency: str, fetched: Optional[pd.DataFrame]) -> int:
+        """הוספת התקופות החדשות של מניה לטבלה הארוכה; מחזיר כמה תקופות נוספו"""
+        self._checked[(symbol, frequency)] = datetime.now()
+        if fetched is None or fetched.empty:
+            return 0
+        fetched = fetched.apply(pd.to_numeric, errors='coerce')
+        fetched.index = pd.DatetimeIndex(fetched.index).tz_localize(None).normalize()
+        new_periods = fetched.index.difference(self.statements(symbol, frequency).index)
+        if not len(new_periods):
+            return 0
+
+        long = fetched.loc[new_periods].rename_axis('period').rename_axis('field', axis=1) \
+            .stack(future_stack=True).dropna().rename('value').reset_index()
+        long.insert(0, 'frequency', frequency)
+        long.insert(2, 'symbol', symbol)
+        table = pd.concat([self.table, long[LONG_COLUMNS].astype(LONG_DTYPES)], ignore_index=True)
+        self._table = table.sort_values(['frequency', 'symbol', 'period'], kind='stable', ignore_index=True)
+        self._wide.pop((symbol, frequency), None)
+        return len(new_periods)
+
+    def update(self, symbol: str, frequency: str = 'quarterly', force: bool = False) -> pd.DataFrame:
+        """משיכת תקופות חדשות רק אם הן צפויות; מחזיר את כל התקופות השמורות של המניה"""
+        self.update_many([symbol], frequency, force)
+        return self.statements(symbol, frequency)
+
+    def update_many(self, symbols: Iterable[str], frequency: str = 'quarterly', force: bool = False) -> int:
+        """עדכון כל המניות שצפויה להן תקופה חדשה, עם כתיבה אחת של הקובץ; מחזיר כמה תקופות נוספו"""
+        self._check_frequency(frequency)
+        due = [symbol for symbol in symbols if force or self.is_due(symbol, frequency)]
+        if not due:
+            return 0
+
+        fetched = {}
+        for symbol in due:
+            try:
+                fetched[symbol] = self.fetcher(symbol, frequency)
+            except Exception as e:
+                self.logger.error(f"Error fetching financial statements for {symbol}: {str(e)}")
+
+        with self._lock:
+            added = 0
+            for symbol, statements in fetched.items():
+                count = self._merge(symbol, frequency, statements)
+                if count:
+                    self.logger.info(f"Stored {count} new {frequency} periods for {symbol}")
+                added += count
+            if fetched:
+                self._save()
+        return added
+
+    def statements(self, symbol: str, frequency: str = 'quarterly') -> pd.DataFrame:
+        """כל התקופות השמורות של מניה כטבלת תקופה x שדה, בלי גישה לרשת"""
+        self._check_frequency(frequency)
+        key = (symbol, frequency)
+        if key not in self._wide:
+            rows = self._rows(frequency, [symbol])
+            wide = rows.pivot(index='period', columns='field', values='value').sort_index()
+            wide.index.name, wide.columns.name = None, None
+            self._wide[key] = wide
+        return self._wide[key]
+
+    def time_series(self, symbol: str, field: str, frequency: str = 'quarterly') -> pd.Series:
+        """סדרת זמן של שדה אחד"""
+        statements = self.statements(symbol, frequency)
+        if field not in statements:
+            return pd.Series(dtype=float, name=field)
+        return statements[field].dropna()
+
+    def cross_section(self, symbols: Iterable[str], fields: List[str], frequency: str = 'quarterly',
+                      as_of: Optional[datetime] = None, lag: int = 0) -> pd.DataFrame:
+        """הערך האחרון (או lag תקופות אחורה) של כל שדה לכל מניה, נכון ל-as_of - סינון אחד של הטבלה"""
+        self._check_frequency(frequency)
+        symbols = list(symbols)
+        rows = self._rows(frequency, symbols)
+        if as_of is not None:
+            rows = rows[rows['period'] <= pd.Timestamp(as_of)]
+
+        # התקופה ה-lag מהסוף לכל מניה, ואז השדות המבוקשים של התקופה הזאת בלבד
+        periods = rows[['symbol', 'period']].drop_duplicates()
+        rank = periods.groupby('symbol')['period'].rank(method='first', ascending=False)
+        chosen = periods[(rank == lag + 1).to_numpy()]
+        selected = rows.merge(chosen, on=['symbol', 'period'])
+        selected = selected[selected['field'].isin(fields)]
+        wide = selected.pivot(index='symbol', columns='field', values='value')
+        return wide.reindex(index=symbols, columns=fields).rename_axis(None).rename_axis(None, axis=1)
+
+    def fundamental_inputs(self, prices: Dict[str, float], frequency: str = 'annual',
+                           as_of: Optional[datetime] = None) -> pd.DataFrame:
+        """שדות גולמיים לכל מניה, במבנה של FundamentalIndicators.analyze_cross_section"""
+        symbols = list(prices)
+        fields = list(FUNDAMENTAL_FIELDS.values())
+        latest = self.cross_section(symbols, fields, frequency, as_of)
+        previous = self.cross_section(symbols, [FUNDAMENTAL_FIELDS['revenue']], frequency, as_of, lag=1)
+
+        inputs = latest.rename(columns={source: name for name, source in FUNDAMENTAL_FIELDS.items()})
+        inputs['price'] = pd.Series(prices, dtype=float)
+        shares = inputs.pop('shares').replace(0, np.nan)
+        inputs['book_value'] = inputs['shareholder_equity'] / shares
+        inputs['sales_per_share'] = inputs['revenue'] / shares
+        inputs['current_revenue'] = inputs['revenue']
+        inputs['previous_revenue'] = previous[FUNDAMENTAL_FIELDS['revenue']]
+        return inputs
+
+
+# מאגר משותף לכל המנתחים
+financial_store: Optional[FinancialStatementsStore] = None
+
+
+def get_financial_store() -> FinancialStatementsStore:
+    """המאגר המשותף - נוצר בשימוש הראשון"""
+    global financial_store
+    if financial_store is None:
+        financial_store = FinancialStatementsStore()
+    return financial_store
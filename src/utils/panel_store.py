@@ -0,0 +1,277 @@
+import logging
+import pickle
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from ..config.settings import PANEL_SETTINGS, PANEL_STORE_FILE
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+logger = logging.getLogger(__name__)
+
+
+def _trading_days(index: pd.Index) -> np.ndarray:
+    """תאריכי מסחר נאיביים (datetime64[D]) מאינדקס עם או בלי אזור זמן"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize().values.astype('datetime64[D]')
+
+
+class PanelStore:
+    """פאנל צפוף של כל היקום על ציר ימי מסחר אחד: מערך זמן x מניה לכל שדה ומסכת תקינות.
+
+    לוח המסחר נלקח מסימול הלוח (מדד הייחוס - ימי המסחר בבורסת תל אביב) כשהוא קיים,
+    אחרת מאיחוד הימים של כל המניות. יום של מניה שאינו בלוח לא נשמר; יום בלוח שבו
+    מניה לא נסחרה נשאר NaN ומסומן כלא תקין. field ו-column מחזירים views בלי העתקה,
+    והוספת יום כותבת שורה אחת בסוף (הקיבולת מוכפלת לפי הצורך, כמו ב-Screener).
+    """
+
+    def __init__(self, calendar_symbol: Optional[str] = None, capacity: Optional[int] = None):
+        self.calendar_symbol = calendar_symbol
+        rows = capacity or PANEL_SETTINGS['initial_days']
+        self._size = 0
+        self._days = np.empty(rows, dtype='datetime64[D]')
+        self._symbols: List[str] = []
+        self._columns: Dict[str, int] = {}
+        self._data = {name: np.full((rows, 0), np.nan) for name in FIELDS}
+        self._valid = np.zeros((rows, 0), dtype=bool)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    @property
+    def days(self) -> np.ndarray:
+        return self._days[:self._size]
+
+    @property
+    def calendar(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.days.astype('datetime64[ns]'))
+
+    def _reserve(self, rows: int, columns: int):
+        """הגדלת המערכים כך שיכילו rows ימים ו-columns מניות"""
+        capacity_rows, capacity_columns = self._valid.shape
+        if rows <= capacity_rows and columns <= capacity_columns:
+            return
+        if rows > capacity_rows:
+            capacity_rows = max(rows, 2 * capacity_rows)
+        if columns > capacity_columns:
+            capacity_columns = max(columns, 2 * capacity_columns)
+
+        days = np.empty(capacity_rows, dtype='datetime64[D]')
+        days[:self._size] = self._days[:self._size]
+        self._days = days
+        used = len(self._symbols)
+        for name, values in self._data.items():
+            grown = np.full((capacity_rows, capacity_columns), np.nan)
+            grown[:self._size, :used] = values[:self._size, :used]
+            self._data[name] = grown
+        valid = np.zeros((capacity_rows, capacity_columns), dtype=bool)
+        valid[:self._size, :used] = self._valid[:self._size, :used]
+        self._valid = valid
+
+    def _column(self, symbol: str) -> int:
+        """עמודת המניה - הוספה בסוף לפי הצורך"""
+        column = self._columns.get(symbol)
+        if column is None:
+            column = len(self._symbols)
+            self._reserve(self._size, column + 1)
+            self._symbols.append(symbol)
+            self._columns[symbol] = column
+        return column
+
+    def _write(self, symbol: str, hist: pd.DataFrame, first_row: int = 0):
+        """כתיבת היסטוריית המניה לשורות הלוח מ-first_row ואילך"""
+        column = self._column(symbol)
+        days = _trading_days(hist.index)
+        keep = ~pd.Index(days).duplicated(keep='last')
+        days = days[keep]
+
+        calendar = self._days[first_row:self._size]
+        positions = np.searchsorted(calendar, days)
+        on_calendar = positions < len(calendar)
+        on_calendar[on_calendar] = calendar[positions[on_calendar]] == days[on_calendar]
+        rows = first_row + positions[on_calendar]
+
+        for name, values in self._data.items():
+            values[first_row:self._size, column] = np.nan
+            if name in hist:
+                values[rows, column] = hist[name].to_numpy(dtype=float)[keep][on_calendar]
+        self._valid[first_row:self._size, column] = False
+        self._valid[rows, column] = np.isfinite(self._data['Close'][rows, column])
+
+    def _next_row(self, symbol: str) -> int:
+        """השורה שאחרי היום התקין האחרון של המניה (0 למניה חדשה)"""
+        column = self._columns.get(symbol)
+        if column is None:
+            return 0
+        valid_rows = np.flatnonzero(self._valid[:self._size, column])
+        return int(valid_rows[-1]) + 1 if len(valid_rows) else 0
+
+    def _append_calendar(self, days: np.ndarray) -> int:
+        """הוספת ימים אחרי היום האחרון בלוח; מחזיר את השורה הראשונה החדשה"""
+        first_row = self._size
+        if self._size:
+            days = days[days > self._days[self._size - 1]]
+        self._reserve(self._size + len(days), len(self._symbols))
+        self._days[self._size:self._size + len(days)] = days
+        self._size += len(days)
+        return first_row
+
+    def _calendar_days(self, histories: Dict[str, pd.DataFrame]) -> np.ndarray:
+        if self.calendar_symbol in histories:
+            return np.unique(_trading_days(histories[self.calendar_symbol].index))
+        return np.unique(np.concatenate([_trading_days(hist.index) for hist in histories.values()]))
+
+    @classmethod
+    def from_histories(cls, histories: Dict[str, pd.DataFrame], calendar_symbol: Optional[str] = None,
+                       **kwargs) -> 'PanelStore':
+        """בניית הפאנל מטבלאות היסטוריה של yfinance"""
+        panel = cls(calendar_symbol, **kwargs)
+        panel.extend(histories)
+        return panel
+
+    def extend(self, histories: Dict[str, pd.DataFrame], replace: bool = False) -> int:
+        """הוספת הימים החדשים מההיסטוריות; מניה חדשה נכתבת במלואה. מחזיר כמה ימים נוספו.
+
+        replace=True כותב מחדש את כל ההיסטוריה של המניות - למשיכה מלאה, שבה מחירים מתואמים
+        (דיבידנדים, פיצולים) עשויים להשתנות גם בימים שכבר בפאנל.
+        """
+        histories = {symbol: hist for symbol, hist in histories.items() if hist is not None and len(hist)}
+        if not histories:
+            return 0
+        first_row = self._append_calendar(self._calendar_days(histories))
+        for symbol, hist in histories.items():
+            # מניה קיימת נכתבת מהיום שאחרי הסגירה התקינה האחרונה שלה - כך גם נתונים שהגיעו באיחור נכנסים
+            self._write(symbol, hist, 0 if replace else self._next_row(symbol))
+        added = self._size - first_row
+        if added:
+            logger.info(f"Panel extended with {added} days")
+        return added
+
+    def set_symbol(self, symbol: str, hist: pd.DataFrame):
+        """החלפת כל ההיסטוריה של מניה אחת (למשל אחרי תיקון נתונים)"""
+        self._write(symbol, hist)
+
+    def append_day(self, day, bars: pd.DataFrame) -> int:
+        """הוספת יום מסחר - bars היא טבלה של מניה x שדה. אותו יום שוב מחליף את השורה (עדכון תוך-יומי)"""
+        day = np.datetime64(pd.Timestamp(day).tz_localize(None).normalize().date(), 'D')
+        if self._size and day < self._days[self._size - 1]:
+            raise ValueError(f"Cannot append {day}: panel already ends at {self._days[self._size - 1]}")
+        if not self._size or day > self._days[self._size - 1]:
+            self._append_calendar(np.array([day]))
+        row = self._size - 1
+
+        columns = np.array([self._column(symbol) for symbol in bars.index], dtype=int)
+        for name, values in self._data.items():
+            values[row, :] = np.nan
+            if name in bars:
+                values[row, columns] = pd.to_numeric(bars[name], errors='coerce').to_numpy(dtype=float)
+        self._valid[row, :] = np.isfinite(self._data['Close'][row, :])
+        return row
+
+    def rows(self, start=None, end=None) -> slice:
+        """טווח השורות בין שני תאריכים (כולל)"""
+        first = 0 if start is None else int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(start).date(), 'D')))
+        last = self._size if end is None else \
+            int(np.searchsorted(self.days, np.datetime64(pd.Timestamp(end).date(), 'D'), side='right'))
+        return slice(first, last)
+
+    def field(self, name: str = 'Close', start=None, end=None) -> np.ndarray:
+        """מערך זמן x מניה של שדה - view, בלי העתקה"""
+        if name not in self._data:
+            raise ValueError(f"Unknown field: {name}")
+        return self._data[name][:self._size, :len(self._symbols)][self.rows(start, end)]
+
+    def valid(self, start=None, end=None) -> np.ndarray:
+        """מסכת התקינות - view"""
+        return self._valid[:self._size, :len(self._symbols)][self.rows(start, end)]
+
+    def column(self, symbol: str, name: str = 'Close', start=None, end=None) -> np.ndarray:
+        """סדרת שדה של מניה אחת - view"""
+        if symbol not in self._columns:
+            raise ValueError(f"Unknown symbol: {symbol}")
+        return self.field(name, start, end)[:, self._columns[symbol]]
+
+    def frame(self, name: str = 'Close', start=None, end=None,
+              symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """טבלת זמן x מניה של שדה, על לוח המסחר"""
+        rows = self.rows(start, end)
+        values = self.field(name)[rows]
+        if symbols is None:
+            return pd.DataFrame(values, index=self.calendar[rows], columns=self.symbols, copy=False)
+        symbols = list(symbols)
+        unknown = [symbol for symbol in symbols if symbol not in self._columns]
+        if unknown:
+            raise ValueError(f"Unknown symbols: {unknown}")
+        return pd.DataFrame(values[:, [self._columns[symbol] for symbol in symbols]],
+                            index=self.calendar[rows], columns=symbols)
+
+    def history(self, symbol: str) -> pd.DataFrame:
+        """טבלת OHLCV של מניה בימים התקינים - אינדקס תאריכים נאיבי"""
+        if symbol not in self._columns:
+            raise ValueError(f"Unknown symbol: {symbol}")
+        rows = np.flatnonzero(self.valid()[:, self._columns[symbol]])
+        return pd.DataFrame({name: self.column(symbol, name)[rows] for name in FIELDS},
+                            index=self.calendar[rows])
+
+    def returns(self, start=None, end=None) -> Tuple[np.ndarray, np.ndarray]:
+        """תשואות יומיות מהסגירות ומסכה - תשואה תקינה רק כשיש סגירה גם ביום וגם ביום המסחר הקודם"""
+        rows = self.rows(start, end)
+        closes = self.field('Close')
+        valid = self.valid()
+        first = max(rows.start, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = closes[first:rows.stop] / closes[first - 1:rows.stop - 1] - 1
+        mask = valid[first:rows.stop] & valid[first - 1:rows.stop - 1]
+        return np.where(mask, values, np.nan), mask
+
+    def latest(self, fields: Iterable[str] = FIELDS) -> pd.DataFrame:
+        """הערך האחרון התקין של כל שדה לכל מניה (מניה x שדה)"""
+        valid = self.valid()
+        has_data = valid.any(axis=0)
+        last_rows = len(valid) - 1 - np.argmax(valid[::-1], axis=0) if len(valid) else \
+            np.zeros(len(self._symbols), dtype=int)
+        columns = np.arange(len(self._symbols))
+        table = {}
+        for name in fields:
+            values = self.field(name)
+            table[name] = np.where(has_data, values[last_rows, columns], np.nan) if len(values) else \
+                np.full(len(columns), np.nan)
+        return pd.DataFrame(table, index=pd.Index(self.symbols, name='symbol'))
+
+    def save(self, path=None):
+        """שמירת הפאנל לדיסק"""
+        path = Path(path or PANEL_STORE_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @classmethod
+    def load(cls, path=None, calendar_symbol: Optional[str] = None) -> 'PanelStore':
+        """טעינת הפאנל מהדיסק, או פאנל ריק"""
+        path = Path(path or PANEL_STORE_FILE)
+        if path.exists():
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except Exception as e:
+                logger.error(f"Error loading panel store: {str(e)}")
+        return cls(calendar_symbol)
+
+
+# הפאנל המשותף לכל המנתחים
+panel_store: Optional[PanelStore] = None
+
+
+def get_panel_store(calendar_symbol: Optional[str] = None) -> PanelStore:
+    """הפאנל המשותף - נטען מהדיסק בשימוש הראשון"""
+    global panel_store
+    if panel_store is None:
+        panel_store = PanelStore.load(calendar_symbol=calendar_symbol)
+    return panel_store
@@ -0,0 +1,100 @@
+import copy
+import functools
+import zlib
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+import numpy as np
+import pandas as pd
+from ..config.settings import MEMO_CACHE_SIZE
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+FINGERPRINT_TAIL_BARS = 8  # נרות אחרונים שנכנסים לסכום הביקורת
+
+
+def data_fingerprint(bars: Optional[pd.DataFrame]) -> Optional[tuple]:
+    """טביעת אצבע זולה לנרות - אורך, זמן ראשון ואחרון וסכום ביקורת של הנרות האחרונים.
+
+    העלות קבועה ולא תלויה באורך ההיסטוריה. נר חדש או תיקון של הנרות האחרונים משנים
+    את הטביעה; תיקון של נר ישן באמצע ההיסטוריה לא נתפס - מחליפים אז את hist.
+    """
+    if bars is None or len(bars) == 0:
+        return None
+
+    # רק עמודות המחיר נכנסות לחישוב, כדי שהוספת אינדיקטורים לא תשנה את הטביעה
+    columns = [column for column in BAR_COLUMNS if column in bars.columns]
+    tail = np.array([bars[column].to_numpy()[-FINGERPRINT_TAIL_BARS:] for column in columns], dtype=float)
+    return len(bars), bars.index[0], bars.index[-1], zlib.crc32(tail.tobytes())
+
+
+class ResultCache:
+    """מטמון LRU חסום בזיכרון לתוצאות חישוב"""
+
+    def __init__(self, max_items: int = MEMO_CACHE_SIZE):
+        self.max_items = max_items
+        self._items: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """קבלת ערך מהמטמון"""
+        if key not in self._items:
+            self.misses += 1
+            return default
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return self._items[key]
+
+    def set(self, key: Hashable, value: Any):
+        """שמירת ערך במטמון"""
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clear(self):
+        """ניקוי המטמון"""
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+results_cache = ResultCache()
+
+
+def memoize_on_bars(*frame_attrs: str, params: tuple = ()):
+    """שמירת תוצאת מתודה לפי טביעת האצבע של הנרות והפרמטרים שלה.
+
+    frame_attrs - שמות התכונות שמחזיקות נרות (למשל 'hist')
+    params - שמות תכונות נוספות שמשפיעות על התוצאה
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            fingerprints = tuple(data_fingerprint(getattr(self, attr)) for attr in frame_attrs)
+            if any(fingerprint is None for fingerprint in fingerprints):
+                return method(self, *args, **kwargs)
+
+            key = (method.__qualname__, fingerprints,
+                   tuple(getattr(self, name) for name in params),
+                   args, tuple(sorted(kwargs.items())))
+
+            cached = results_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+
+            result = method(self, *args, **kwargs)
+            # תוצאה ריקה מסמנת שגיאה - לא שומרים אותה
+            if result:
+                results_cache.set(key, copy.deepcopy(result))
+            return result
+
+        return wrapper
+
+    return decorator
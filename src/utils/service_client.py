@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Any, Dict, Optional
+from urllib import error, parse, request
+import pandas as pd
+from ..config.settings import SERVICE_SETTINGS
+
+
+class ServiceClient:
+    """לקוח דק לשירות הניתוח המקומי - לטאבים של ה-GUI ולסקריפטים"""
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None):
+        self.base_url = (base_url or f"http://{SERVICE_SETTINGS['host']}:{SERVICE_SETTINGS['port']}").rstrip('/')
+        self.timeout = timeout or SERVICE_SETTINGS['client_timeout']
+        self.logger = logging.getLogger(__name__)
+
+    def _request(self, method: str, path: str, params: Optional[Dict] = None, body: Optional[Dict] = None) -> Any:
+        url = self.base_url + path
+        params = {key: value for key, value in (params or {}).items() if value is not None}
+        if params:
+            url += '?' + parse.urlencode(params)
+        data = json.dumps(body).encode() if body is not None else None
+        req = request.Request(url, data=data, method=method, headers={'Content-Type': 'application/json'})
+        try:
+            with request.urlopen(req, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except error.HTTPError as e:
+            # השירות מחזיר {'error': ...}; שגיאת קלט (400) עולה כ-ValueError כמו בקריאה ישירה
+            message = json.loads(e.read() or b'{}').get('error', str(e))
+            if e.code == 400:
+                raise ValueError(message) from None
+            raise RuntimeError(message) from None
+
+    def is_available(self) -> bool:
+        """האם השירות רץ"""
+        try:
+            self.health()
+            return True
+        except (OSError, RuntimeError):
+            return False
+
+    def health(self) -> Dict:
+        return self._request('GET', '/health')
+
+    def analyze(self, symbol: str, refresh: bool = False) -> Dict:
+        return self._request('GET', f'/analyze/{parse.quote(symbol)}', {'refresh': 1 if refresh else None})
+
+    def screen(self, where: Optional[str] = None, sort: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+        return self._request('GET', '/screen', {'where': where, 'sort': sort, 'limit': limit})
+
+    def breadth(self, days: Optional[int] = None) -> Dict:
+        return self._request('GET', '/breadth', {'days': days})
+
+    def add_alert(self, symbol: str, target_price: float, condition: str = 'above') -> Dict:
+        return self._request('POST', f'/alerts/{parse.quote(symbol)}',
+                             body={'target_price': target_price, 'condition': condition})
+
+    def check_alerts(self, symbol: str) -> Dict:
+        return self._request('GET', f'/alerts/{parse.quote(symbol)}')
+
+# תקופות הניתוח של ה-GUI - לחיתוך הסדרות שהשירות מחזיר
+PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1), '3mo': pd.DateOffset(months=3), '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1), '2y': pd.DateOffset(years=2), '5y': pd.DateOffset(years=5)
+}
+
+
+def chart_frame(result: Dict) -> pd.DataFrame:
+    """סדרות הגרף מתשובת /analyze כטבלה עם אינדקס תאריכים, כמו ההיסטוריה של המנתח"""
+    chart = dict(result.get('chart') or {})
+    # שעון מקומי של הבורסה, בלי אזור זמן - היסטים משתנים (שעון קיץ) לא נכנסים לאינדקס אחד
+    index = pd.DatetimeIndex([pd.Timestamp(date).tz_localize(None) for date in chart.pop('date', [])])
+    return pd.DataFrame(chart, index=index, dtype=float)
+
+
+def simulation_bands(result: Dict) -> Optional[pd.DataFrame]:
+    """רצועות הסימולציה מתשובת /analyze - שורה לכל יום, עמודה לכל קוונטיל"""
+    simulation = result.get('simulation')
+    if not simulation:
+        return None
+    bands = pd.DataFrame({float(quantile): values for quantile, values in simulation.items()}, dtype=float)
+    bands.index = pd.RangeIndex(1, len(bands) + 1, name='step')
+    return bands
+
+
+def trim_to_period(frame: pd.DataFrame, period: str) -> pd.DataFrame:
+    """חיתוך הסדרות לתקופה שנבחרה; תקופה לא מוכרת ('max') משאירה הכל"""
+    offset = PERIOD_OFFSETS.get(period)
+    if offset is None or frame.empty:
+        return frame
+    return frame[frame.index > frame.index[-1] - offset]
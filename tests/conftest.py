@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def synthetic_history(n_bars: int, seed: int = 0, end: str = '2026-01-01') -> pd.DataFrame:
+    """היסטוריה סינתטית במבנה של yfinance - אינדקס עם אזור זמן"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=n_bars, tz='Asia/Jerusalem')
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    spread = np.abs(rng.normal(0, 0.01, n_bars))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.005, n_bars)),
+        'High': close * (1 + spread),
+        'Low': close * (1 - spread),
+        'Close': close,
+        'Volume': rng.integers(10_000, 5_000_000, n_bars).astype(float),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
+
+
+def synthetic_statements(symbol: str, frequency: str) -> pd.DataFrame:
+    """דוחות שנתיים סינתטיים במבנה של download_statements - ערכים שונים לכל מניה"""
+    rng = np.random.default_rng(sum(map(ord, symbol)))
+    periods = pd.to_datetime(['2022-12-31', '2023-12-31', '2024-12-31'])
+    revenue = rng.uniform(500, 2000) * np.array([1.0, 1.1, 1.25])
+    return pd.DataFrame({
+        'Diluted EPS': rng.uniform(-2, 10, 3),
+        'Net Income': revenue * rng.uniform(-0.05, 0.3),
+        'Total Revenue': revenue,
+        'Stockholders Equity': rng.uniform(1000, 5000, 3),
+        'Total Debt': rng.uniform(0, 3000, 3),
+        'Current Assets': rng.uniform(500, 1500, 3),
+        'Current Liabilities': rng.uniform(300, 1000, 3),
+        'Inventory': rng.uniform(0, 200, 3),
+        'Ordinary Shares Number': 100.0
+    }, index=periods)
+
+
+@pytest.fixture
+def history():
+    return synthetic_history(400, seed=1)
+
+
+@pytest.fixture
+def histories():
+    return {f'S{i}.TA': synthetic_history(300, seed=i) for i in range(8)}
@@ -0,0 +1,61 @@
+import pytest
+from src.analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+from src.config.settings import ANALYSIS_SETTINGS
+
+
+def _analyzer(hist, market_hist=None):
+    analyzer = EnhancedStockAnalyzer('TEST.TA')
+    analyzer.hist = hist
+    analyzer.market_hist = market_hist
+    return analyzer
+
+
+def test_snapshot_is_built_once_per_data_version(history):
+    analyzer = _analyzer(history)
+    snapshot = analyzer.snapshot()
+    assert analyzer.snapshot() is snapshot
+    assert analyzer.calculate_final_score() == analyzer.calculate_final_score()
+    assert analyzer.analyze_sentiment() == dict(snapshot.sentiment)
+
+    analyzer.hist = history.iloc[:-1]
+    assert analyzer.snapshot() is not snapshot
+
+
+def test_snapshot_is_rebuilt_when_scoring_settings_change(history, monkeypatch):
+    analyzer = _analyzer(history)
+    snapshot = analyzer.snapshot()
+    score = analyzer.calculate_final_score()
+
+    # כמו load_tuned_settings - עדכון במקום של ההגדרות בתהליך רץ
+    monkeypatch.setitem(ANALYSIS_SETTINGS['scoring'], 'weights',
+                        {'technical': 1.0, 'momentum': 0.0, 'advanced': 0.0, 'sentiment': 0.0})
+    monkeypatch.setitem(ANALYSIS_SETTINGS['scoring'], 'thresholds',
+                        {'strong_buy': 0.0, 'buy': 0.0, 'weak_sell': 0.0, 'sell': 0.0})
+    rebuilt = analyzer.snapshot()
+    assert rebuilt is not snapshot
+    assert analyzer.snapshot() is rebuilt
+    assert analyzer.calculate_final_score() != score
+
+
+def test_snapshot_results_are_copies(history):
+    analyzer = _analyzer(history)
+    score = analyzer.calculate_final_score()
+    score['ציון_סופי'] = -1
+    assert analyzer.calculate_final_score()['ציון_סופי'] != -1
+    with pytest.raises(TypeError):
+        analyzer.snapshot().score['ציון_סופי'] = -1
+
+
+def test_bad_data_does_not_raise_from_public_entry_points(history):
+    analyzer = _analyzer(history[['Close']])
+    assert analyzer.analyze_sentiment() == {}
+    assert analyzer.calculate_final_score()['המלצה'] == "לא ניתן לחשב"
+    report = analyzer.generate_report()
+    assert report['sentiment'] == {} and report['risk_metrics'] == {}
+
+
+def test_single_bar_history(history):
+    analyzer = _analyzer(history.iloc[:1])
+    analyzer.analyze_sentiment()
+    assert 'המלצה' in analyzer.calculate_final_score()
+    assert analyzer.generate_report()['symbol'] == 'TEST.TA'
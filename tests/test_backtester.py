@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from src.analyzers.backtester import final_scores, recommendations, run_backtest, score_components
+from src.analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+
+
+@pytest.mark.parametrize('k', [40, 120, 275, 400])
+def test_vectorized_scores_match_last_bar_score(history, k):
+    components = score_components(history)
+    scores = final_scores(components)
+    signals = recommendations(scores)
+
+    analyzer = EnhancedStockAnalyzer('TEST.TA')
+    analyzer.hist = history.iloc[:k]
+    score = analyzer.snapshot().score
+    assert dict(score['ציונים_חלקיים']) == pytest.approx(components.iloc[k - 1].to_dict())
+    assert score['ציון_סופי'] == pytest.approx(scores.iloc[k - 1])
+    assert score['המלצה'] == signals.iloc[k - 1]
+
+
+def test_positions_follow_previous_bar_signal(history):
+    result = run_backtest(history, cost_bps=0, slippage_bps=0, allow_short=False)
+    frame = result.frame
+    assert frame['position'].iloc[0] == 0
+    assert set(frame['position'].unique()) <= {0.0, 1.0}
+    # אין עלויות: התשואה היא הפוזיציה כפול תשואת הנכס
+    expected = frame['position'] * history['Close'].pct_change().fillna(0.0)
+    np.testing.assert_allclose(frame['returns'], expected)
+    assert result.stats['total_return'] == pytest.approx(frame['equity'].iloc[-1] - 1)
+
+
+def test_backtest_of_empty_bars_has_no_stats(history):
+    assert run_backtest(history.iloc[:0]).stats == {}
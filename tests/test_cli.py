@@ -0,0 +1,155 @@
+import json
+import pandas as pd
+import pytest
+from src import cli
+from src.analyzers import fundamental_analyzer, sector_index, universe_scanner
+from src.analyzers.sector_index import SectorIndex
+from src.analyzers.fundamental_analyzer import FundamentalIndicators
+from src.analyzers.risk_engine import RiskEngine
+from src.analyzers.walk_forward import candidate_grid, optimize_scoring
+from src.config.settings import ANALYSIS_SETTINGS
+from src.utils import financial_store, panel_store
+from src.utils.financial_store import FinancialStatementsStore
+from src.utils.panel_store import PanelStore
+from tests.conftest import synthetic_history, synthetic_statements
+
+MARKET = ANALYSIS_SETTINGS['risk']['beta_market_index']
+
+
+@pytest.fixture
+def offline_histories(monkeypatch, tmp_path):
+    """היסטוריות סינתטיות במקום yfinance - גם בתהליכים העובדים (fork); הפאנל נשמר בתיקייה זמנית"""
+    histories = {f'S{i}.TA': synthetic_history(300, seed=i) for i in range(3)}
+
+    def load_history(symbol, period, preloaded=None):
+        return histories.get(symbol)
+
+    monkeypatch.setattr(universe_scanner, 'load_history', load_history)
+    monkeypatch.setattr(cli, 'load_history', load_history)
+    monkeypatch.setattr(cli, 'load_tuned_settings', lambda path=None: False)
+    monkeypatch.setattr(panel_store, 'panel_store', None)
+    monkeypatch.setattr(panel_store, 'PANEL_STORE_FILE', tmp_path / 'panel.pickle')
+    monkeypatch.setattr(fundamental_analyzer, 'sector_distributions', None)
+    monkeypatch.setattr(fundamental_analyzer, 'SECTOR_DISTRIBUTIONS_FILE', tmp_path / 'distributions.pickle')
+    monkeypatch.setattr(financial_store, 'financial_store',
+                        FinancialStatementsStore(tmp_path / 'statements.pickle', synthetic_statements))
+    return histories
+
+
+def test_scan_writes_ranked_patterns(offline_histories, tmp_path):
+    out = tmp_path / 'patterns.pkl'
+    assert cli.main(['scan', '--symbols', *offline_histories, '--out', str(out), '--workers', '1']) == 0
+    table = pd.read_pickle(out)
+    assert len(table) and set(table['symbol']) <= set(offline_histories)
+    assert table['score'].is_monotonic_decreasing
+
+
+def test_unsupported_output_format_is_rejected(offline_histories, tmp_path):
+    assert cli.main(['scan', '--symbols', 'S0.TA', '--out', str(tmp_path / 'out.json')]) == 2
+
+
+def test_backtest_writes_stats_per_symbol(offline_histories, tmp_path):
+    out = tmp_path / 'backtest.csv'
+    assert cli.main(['backtest', '--symbols', *offline_histories, '--out', str(out), '--workers', '1',
+                     '--cost-bps', '0']) == 0
+    table = pd.read_csv(out)
+    assert sorted(table['symbol']) == sorted(offline_histories)
+    assert {'total_return', 'sharpe', 'max_drawdown', 'trades'} <= set(table.columns)
+
+
+def test_allow_short_can_override_the_setting_either_way(monkeypatch):
+    for default in (False, True):
+        monkeypatch.setitem(ANALYSIS_SETTINGS['backtest'], 'allow_short', default)
+        parse = cli.build_parser().parse_args
+        command = ['backtest', '--symbols', 'A.TA', '--out', 'stats.csv']
+        assert parse(command).allow_short is default
+        assert parse(command + ['--allow-short']).allow_short is True
+        assert parse(command + ['--no-allow-short']).allow_short is False
+
+
+def test_optimize_writes_tuned_settings(offline_histories, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'optimize_scoring', _small_grid_optimizer())
+    tuned = tmp_path / 'tuned.json'
+    folds = tmp_path / 'folds.pkl'
+    assert cli.main(['optimize', '--symbols', *offline_histories, '--workers', '1', '--train-bars', '120',
+                     '--test-bars', '60', '--tuned-file', str(tuned), '--out', str(folds)]) == 0
+    assert 'weights' in json.loads(tuned.read_text(encoding='utf-8'))['scoring']
+    assert len(pd.read_pickle(folds)) == 3
+
+
+def test_optimize_dry_run_writes_nothing(offline_histories, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'optimize_scoring', _small_grid_optimizer())
+    tuned = tmp_path / 'tuned.json'
+    assert cli.main(['optimize', '--symbols', *offline_histories, '--workers', '1', '--train-bars', '120',
+                     '--test-bars', '60', '--tuned-file', str(tuned), '--dry-run']) == 0
+    assert not tuned.exists()
+
+
+def _small_grid_optimizer():
+    """רשת מועמדים קטנה - האופטימיזציה האמיתית, רק מהירה יותר"""
+    def optimize(histories, **kwargs):
+        return optimize_scoring(histories, candidate_grid(weight_step=0.5), **kwargs)
+    return optimize
+
+
+def test_analyze_builds_and_saves_sector_index(offline_histories, tmp_path, monkeypatch):
+    profiles = {'S0.TA': ('Tech', 5e9), 'S1.TA': ('Tech', 1e9), 'S2.TA': ('Banks', 2e9)}
+    monkeypatch.setattr(cli, 'download_profile', profiles.__getitem__)
+    monkeypatch.setattr(sector_index, 'sector_index', SectorIndex())
+    monkeypatch.setattr(sector_index, 'SECTOR_INDEX_FILE', tmp_path / 'sectors.pickle')
+
+    out = tmp_path / 'analysis.pkl'
+    assert cli.main(['analyze', '--symbols', *offline_histories, '--out', str(out), '--workers', '1']) == 0
+    saved = SectorIndex.load(tmp_path / 'sectors.pickle')
+    assert saved.sectors == {symbol: sector for symbol, (sector, _) in profiles.items()}
+    assert sorted(saved.levels.columns) == ['Banks', 'Tech']
+
+    table = pd.read_pickle(out).set_index('symbol')
+    assert table.loc['S2.TA', 'sector'] == 'Banks'
+    assert table['sector_relative_strength'].notna().all()
+
+    # הרצה שנייה - הסקטורים כבר ידועים, בלי פנייה לרשת
+    monkeypatch.setattr(cli, 'download_profile', lambda symbol: pytest.fail("profile refetched"))
+    assert cli.main(['analyze', '--symbols', *offline_histories, '--out', str(out), '--workers', '1']) == 0
+
+
+def test_analyze_runs_risk_and_breadth_from_the_saved_panel(offline_histories, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'download_profile', lambda symbol: (None, None))
+    monkeypatch.setattr(sector_index, 'sector_index', SectorIndex())
+    monkeypatch.setattr(sector_index, 'SECTOR_INDEX_FILE', tmp_path / 'sectors.pickle')
+    symbols = list(offline_histories)
+    offline_histories[MARKET] = synthetic_history(300, seed=99)
+
+    out, breadth_out = tmp_path / 'analysis.pkl', tmp_path / 'breadth.csv'
+    assert cli.main(['analyze', '--symbols', *symbols, '--out', str(out), '--breadth-out', str(breadth_out),
+                     '--workers', '1']) == 0
+    panel = PanelStore.load(tmp_path / 'panel.pickle')
+    assert set(panel.symbols) == {*symbols, MARKET} and panel.calendar_symbol == MARKET
+
+    table = pd.read_pickle(out).set_index('symbol')
+    expected = RiskEngine.from_histories({symbol: offline_histories[symbol] for symbol in symbols},
+                                         offline_histories[MARKET]).metrics()
+    pd.testing.assert_frame_equal(table.loc[symbols, cli.RISK_COLUMNS], expected[cli.RISK_COLUMNS],
+                                  check_names=False)
+
+    breadth = pd.read_csv(breadth_out)
+    assert len(breadth) == 299
+    assert (breadth['advancers'] + breadth['decliners'] + breadth['unchanged'] <= len(symbols)).all()
+
+
+def test_analyze_adds_universe_fundamentals_to_each_row(offline_histories, tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'download_profile', lambda symbol: (None, None))
+    monkeypatch.setattr(sector_index, 'sector_index', SectorIndex())
+    monkeypatch.setattr(sector_index, 'SECTOR_INDEX_FILE', tmp_path / 'sectors.pickle')
+
+    out = tmp_path / 'analysis.pkl'
+    assert cli.main(['analyze', '--symbols', *offline_histories, '--out', str(out), '--workers', '1']) == 0
+    table = pd.read_pickle(out).set_index('symbol')
+    store = financial_store.get_financial_store()
+    for symbol, hist in offline_histories.items():
+        inputs = store.fundamental_inputs({symbol: float(hist['Close'].iloc[-1])})
+        expected = FundamentalIndicators.analyze_cross_section(inputs).iloc[0]
+        assert table.loc[symbol, 'pe_ratio'] == pytest.approx(expected['pe_ratio'])
+        assert table.loc[symbol, 'fundamental_score'] == pytest.approx(expected['overall_score'])
+    # ההתפלגויות לציון לפי סקטור נבנו מהיקום ונשמרו
+    assert fundamental_analyzer.SectorPercentiles.load(tmp_path / 'distributions.pickle').fitted
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+from src.utils.compact_history import PRICE_COLUMNS, CompactHistory
+
+FLOAT32_RTOL = 1e-7
+
+
+def test_round_trip_keeps_prices_to_float32_precision(history):
+    compact = CompactHistory.from_frame(history)
+    assert compact.prices.dtype == np.float32 and compact.days.dtype == np.int32
+
+    frame = compact.to_frame(include_indicators=False)
+    assert list(frame.columns) == PRICE_COLUMNS + ['Volume']
+    assert all(frame[column].dtype == np.float64 for column in PRICE_COLUMNS)
+    np.testing.assert_allclose(frame[PRICE_COLUMNS].to_numpy(), history[PRICE_COLUMNS].to_numpy(),
+                               rtol=FLOAT32_RTOL)
+    np.testing.assert_array_equal(frame['Volume'], history['Volume'].astype(np.int64))
+
+
+def test_volume_is_stored_as_the_smallest_integer_that_fits(history):
+    assert CompactHistory.from_frame(history).volume.dtype == np.int32
+
+    large = history.assign(Volume=history['Volume'] * 1_000)
+    compact = CompactHistory.from_frame(large)
+    assert compact.volume.dtype == np.int64
+    np.testing.assert_array_equal(compact.to_frame()['Volume'], large['Volume'].astype(np.int64))
+
+    missing = history.assign(Volume=history['Volume'].where(history.index.day != 1))
+    assert CompactHistory.from_frame(missing).volume.dtype == np.int32
+    assert (CompactHistory.from_frame(missing).to_frame()['Volume'][history.index.day == 1] == 0).all()
+
+
+def test_index_is_restored_from_epoch_days(history):
+    compact = CompactHistory.from_frame(history)
+    assert compact.tz == 'Asia/Jerusalem'
+    assert compact.index.equals(history.index)
+    assert compact.to_frame().index.equals(history.index)
+
+    naive = history.tz_localize(None)
+    compact = CompactHistory.from_frame(naive)
+    assert compact.tz is None
+    assert compact.index.equals(naive.index)
+
+
+def test_indicator_columns_are_included_or_excluded(history):
+    frame = history.assign(RSI=np.linspace(0, 100, len(history)), Label='x')
+
+    compact = CompactHistory.from_frame(frame)
+    assert compact.indicator_names == ['Dividends', 'Stock Splits', 'RSI']
+    assert compact.indicators.shape == (len(history), 3) and compact.indicators.dtype == np.float32
+    np.testing.assert_allclose(compact.to_frame()['RSI'], frame['RSI'], rtol=FLOAT32_RTOL)
+    assert 'RSI' not in compact.to_frame(include_indicators=False)
+    np.testing.assert_array_equal(compact.column('RSI'), compact.indicators[:, 2])
+
+    compact = CompactHistory.from_frame(frame, indicator_columns=[])
+    assert compact.indicator_names == [] and compact.indicators.shape == (len(history), 0)
+    assert list(compact.to_frame().columns) == PRICE_COLUMNS + ['Volume']
+    with pytest.raises(KeyError):
+        compact.column('RSI')
+
+
+def test_analyzer_to_compact_and_load_compact(history):
+    analyzer = EnhancedStockAnalyzer('TEST.TA')
+    analyzer.hist = history
+    compact = analyzer.to_compact()
+    assert compact.indicator_names == list(analyzer.indicators.to_frame().columns)
+    assert analyzer.to_compact(include_indicators=False).indicator_names == []
+
+    restored = EnhancedStockAnalyzer('TEST.TA')
+    restored.load_compact(compact)
+    assert list(restored.hist.columns) == PRICE_COLUMNS + ['Volume']
+    assert restored.hist.index.equals(history.index)
+    np.testing.assert_allclose(restored.hist['Close'], history['Close'], rtol=FLOAT32_RTOL)
+
+    # האינדיקטורים מחושבים מחדש מהמחירים המשוחזרים, לא נטענים מהייצוג הדחוס
+    rsi = restored.indicators.to_frame()['RSI']
+    np.testing.assert_allclose(rsi, pd.Series(compact.column('RSI'), index=rsi.index), rtol=1e-4)
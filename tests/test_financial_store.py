@@ -0,0 +1,83 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from src.utils.financial_store import FinancialStatementsStore
+
+PERIODS = pd.to_datetime(['2024-12-31', '2025-03-31', '2025-06-30'])
+
+
+class Fetcher:
+    """דוחות סינתטיים שגדלים בתקופה בכל משיכה, וסופרים קריאות"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, symbol, frequency):
+        self.calls.append(symbol)
+        n = len(PERIODS) + self.calls.count(symbol) - 1
+        periods = pd.date_range(PERIODS[0], periods=n, freq='QE')
+        scale = int(symbol[1:])
+        return pd.DataFrame({'Total Revenue': np.arange(1.0, n + 1) * scale,
+                             'Net Income': [0.1 * scale if k % 2 == 0 else np.nan for k in range(n)]},
+                            index=periods)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FinancialStatementsStore(tmp_path / 'statements.pickle', Fetcher())
+
+
+def test_universe_is_one_long_table(store):
+    assert store.update_many(['S1', 'S2'], 'quarterly') == 6
+    assert list(store.table.columns) == ['frequency', 'period', 'symbol', 'field', 'value']
+    # ערכים חסרים לא נשמרים
+    assert len(store.table) == 2 * (3 + 2)
+    assert store.path.exists() and len(list(store.path.parent.iterdir())) == 1
+
+    statements = store.statements('S2')
+    assert list(statements.index) == list(PERIODS)
+    assert statements['Total Revenue'].tolist() == [2.0, 4.0, 6.0]
+
+
+def test_cross_section_picks_lagged_period_as_of(store):
+    store.update_many(['S1', 'S2'], 'quarterly')
+    fields = ['Total Revenue', 'Net Income']
+    latest = store.cross_section(['S1', 'S2', 'S3'], fields)
+    assert latest.loc['S1'].tolist() == [3.0, pytest.approx(0.1)]
+    assert latest.loc['S3'].isna().all()
+
+    previous = store.cross_section(['S1', 'S2'], fields, lag=1)
+    assert previous['Total Revenue'].tolist() == [2.0, 4.0]
+    assert previous['Net Income'].isna().all()
+
+    past = store.cross_section(['S2'], fields, as_of=datetime(2025, 5, 1))
+    assert past.loc['S2', 'Total Revenue'] == 4.0
+
+
+def test_only_new_periods_are_appended_and_persisted(store, tmp_path):
+    store.update_many(['S1'], 'quarterly')
+    assert store.update('S1', force=True).index[-1] == pd.Timestamp('2025-09-30')
+    assert len(store.statements('S1')) == 4
+
+    reloaded = FinancialStatementsStore(tmp_path / 'statements.pickle', Fetcher())
+    pd.testing.assert_frame_equal(reloaded.table, store.table)
+    assert not reloaded.is_due('S1', 'quarterly')
+
+
+def test_not_due_skips_the_network(store):
+    store.update_many(['S1'], 'quarterly')
+    assert not store.is_due('S1', 'quarterly', now=datetime(2025, 7, 1))
+    store.update('S1')
+    assert store.fetcher.calls == ['S1']
+    assert store.is_due('S2', 'quarterly')
+    with pytest.raises(ValueError):
+        store.statements('S1', 'monthly')
+
+
+def test_fundamental_inputs_from_the_table(store):
+    store.update_many(['S1', 'S2'], 'annual')
+    inputs = store.fundamental_inputs({'S1': 10.0, 'S2': 20.0})
+    assert inputs['current_revenue'].tolist() == [3.0, 6.0]
+    assert inputs['previous_revenue'].tolist() == [2.0, 4.0]
+    assert inputs['price'].tolist() == [10.0, 20.0]
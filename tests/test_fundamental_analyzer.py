@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers import fundamental_analyzer
+from src.analyzers.fundamental_analyzer import FundamentalIndicators, SectorPercentiles
+from src.config.settings import ANALYSIS_SETTINGS
+
+
+@pytest.fixture
+def universe():
+    rng = np.random.default_rng(9)
+    n = 40
+    metrics = pd.DataFrame({
+        'pe_ratio': np.round(rng.uniform(-5, 40, n)),
+        'pb_ratio': rng.uniform(0.5, 6, n),
+        'profit_margin': rng.uniform(-10, 30, n),
+        'current_ratio': rng.uniform(0.5, 3, n),
+        'revenue_growth': rng.uniform(-20, 40, n)
+    }, index=[f'C{i}' for i in range(n)])
+    metrics.iloc[3, 0] = np.inf
+    metrics.iloc[5, 2] = np.nan
+    # סקטור C קטן מ-min_sector_size ומדורג מול כל היקום; לאחרונה אין סקטור
+    sectors = pd.Series(['A'] * 18 + ['B'] * 18 + ['C'] * 3 + [None], index=metrics.index)
+    return metrics, sectors
+
+
+def test_fit_returns_distributions_without_global_state(universe):
+    metrics, sectors = universe
+    percentiles = FundamentalIndicators.fit_sector_distributions(metrics, sectors)
+    assert isinstance(percentiles, SectorPercentiles)
+    assert percentiles.sectors == ['A', 'B']
+    assert not hasattr(fundamental_analyzer, 'sector_percentiles')
+
+
+def test_fitted_percentiles_match_group_ranks(universe):
+    metrics, sectors = universe
+    percentiles = SectorPercentiles().fit(metrics, sectors)
+    pd.testing.assert_frame_equal(percentiles.percentiles(metrics, sectors), percentiles.rank(metrics, sectors))
+    single = percentiles.percentile('pe_ratio', metrics.iloc[7]['pe_ratio'], sectors.iloc[7])
+    assert single == pytest.approx(percentiles.rank(metrics, sectors).iloc[7]['pe_ratio'])
+
+
+def test_sector_score_uses_the_given_distributions(universe):
+    metrics, sectors = universe
+    percentiles = FundamentalIndicators.fit_sector_distributions(metrics, sectors)
+    scores = FundamentalIndicators.score_cross_section(metrics, sectors=sectors, percentiles=percentiles,
+                                                       mode='sector')
+    for k in (0, 20, 37, 39):
+        single = FundamentalIndicators.calculate_overall_score(metrics.iloc[k].to_dict(), mode='sector',
+                                                               sector=sectors.iloc[k], percentiles=percentiles)
+        assert single == pytest.approx(scores.iloc[k])
+
+    # חתך חדש מדורג מול היקום שנבנה, לא מול עצמו
+    newcomer = metrics.iloc[:1] * 0 + [5, 0.6, 28, 2.5, 35]
+    score = FundamentalIndicators.score_cross_section(newcomer, sectors=sectors.iloc[:1], percentiles=percentiles,
+                                                      mode='sector')
+    assert score.iloc[0] > 0.9
+
+
+def test_both_score_paths_follow_the_score_mode(universe, tmp_path, monkeypatch):
+    metrics, sectors = universe
+    monkeypatch.setattr(fundamental_analyzer, 'sector_distributions', None)
+    monkeypatch.setattr(fundamental_analyzer, 'SECTOR_DISTRIBUTIONS_FILE', tmp_path / 'distributions.pickle')
+    monkeypatch.setitem(ANALYSIS_SETTINGS['fundamental'], 'score_mode', 'sector')
+    absolute = FundamentalIndicators.score_cross_section(metrics, mode='absolute')
+
+    # עוד לא נבנו התפלגויות - שני המסלולים חוזרים לספים קבועים במקום להיכשל
+    pd.testing.assert_series_equal(FundamentalIndicators.score_cross_section(metrics, sectors=sectors), absolute)
+    assert FundamentalIndicators.calculate_overall_score(metrics.iloc[0].to_dict(), sector=sectors.iloc[0]) == \
+        pytest.approx(absolute.iloc[0])
+    assert 'overall_score' in FundamentalIndicators.analyze_fundamentals({'price': 10.0, 'eps': 1.0})
+
+    # ההתפלגויות השמורות (כמו אחרי cli analyze) נטענות ומשמשות את שני המסלולים
+    SectorPercentiles().fit(metrics, sectors).save()
+    fundamental_analyzer.sector_distributions = None
+    scores = FundamentalIndicators.score_cross_section(metrics, sectors=sectors)
+    expected = SectorPercentiles().fit(metrics, sectors).score_cross_section(metrics, sectors)
+    pd.testing.assert_series_equal(scores, expected)
+    for k in (0, 20, 39):
+        single = FundamentalIndicators.calculate_overall_score(metrics.iloc[k].to_dict(), sector=sectors.iloc[k])
+        assert single == pytest.approx(scores.iloc[k])
+
+    with pytest.raises(ValueError, match='Unknown score mode'):
+        FundamentalIndicators.score_cross_section(metrics, mode='relative')
+
+
+def test_analyze_cross_section_sector_score(universe):
+    _, sectors = universe
+    raw = pd.DataFrame({'price': 100.0, 'eps': np.linspace(1, 10, 40), 'net_income': 10.0,
+                        'revenue': np.linspace(50, 200, 40)}, index=sectors.index)
+    results = FundamentalIndicators.analyze_cross_section(raw, sectors)
+    percentiles = FundamentalIndicators.fit_sector_distributions(results, sectors)
+    expected = percentiles.score_cross_section(results, sectors)
+    pd.testing.assert_series_equal(results['sector_score'], expected, check_names=False)
+
+
+@pytest.mark.parametrize('mode', ['absolute', 'sector'])
+def test_cross_section_matches_scalar_analysis(mode, monkeypatch):
+    rng = np.random.default_rng(44)
+    n = 300
+
+    def column(low, high, zeros=0.1):
+        values = rng.uniform(low, high, n)
+        values[rng.random(n) < zeros] = 0.0
+        return values
+
+    raw = pd.DataFrame({
+        'price': column(1, 500, zeros=0),
+        'eps': column(-10, 20),                   # כולל רווח שלילי ואפס
+        'book_value': column(-50, 200),
+        'current_revenue': column(0, 5000),
+        'previous_revenue': column(0, 5000),
+        'net_income': column(-500, 1000),
+        'revenue': column(0, 5000),
+        'current_assets': column(0, 3000),
+        'current_liabilities': column(0, 2000)
+    }, index=[f'C{i}' for i in range(n)])
+    sectors = pd.Series(rng.choice(['A', 'B', 'C', 'D'], n), index=raw.index)
+    monkeypatch.setitem(ANALYSIS_SETTINGS['fundamental'], 'score_mode', mode)
+    percentiles = FundamentalIndicators.fit_sector_distributions(
+        FundamentalIndicators.analyze_cross_section(raw, mode='absolute'), sectors)
+
+    vectorized = FundamentalIndicators.analyze_cross_section(raw, sectors, percentiles)
+    scalar = pd.DataFrame({symbol: FundamentalIndicators.analyze_fundamentals(row.to_dict(), percentiles,
+                                                                              sectors[symbol])
+                           for symbol, row in raw.iterrows()}).T
+    assert 'error' not in scalar
+    for metric in scalar.columns:
+        np.testing.assert_allclose(vectorized[metric].to_numpy(), scalar[metric].to_numpy(dtype=float),
+                                   rtol=1e-12, err_msg=metric)
+    assert np.isinf(vectorized.loc[raw['eps'] == 0, 'pe_ratio']).all()
+    assert (vectorized.loc[raw['eps'] < 0, 'pe_ratio'] < 0).all()
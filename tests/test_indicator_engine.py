@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from src.analyzers.indicator_engine import FUSED_COLUMNS, compute_indicator_frame
+from src.analyzers.indicator_frame import IndicatorFrame
+
+
+def test_fused_engine_matches_separate_indicators(history):
+    fused = compute_indicator_frame(history)
+    separate = IndicatorFrame(history)
+    for column in FUSED_COLUMNS:
+        np.testing.assert_allclose(fused[column].to_numpy(), separate[column].to_numpy(dtype=float),
+                                   rtol=1e-7, atol=1e-7, equal_nan=True, err_msg=column)
+
+
+@pytest.mark.parametrize('bars', [0, 1])
+def test_fused_engine_on_empty_and_single_bar(history, bars):
+    frame = compute_indicator_frame(history.iloc[:bars])
+    assert frame.shape == (bars, len(FUSED_COLUMNS))
+    assert list(frame.columns) == FUSED_COLUMNS
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers.risk_engine import RiskEngine, market_breadth
+from src.utils.panel_store import FIELDS, PanelStore
+from tests.conftest import synthetic_history
+
+MARKET = '^TA125.TA'
+
+
+@pytest.fixture
+def panel_inputs():
+    histories = {f'S{i}.TA': synthetic_history(200, seed=i) for i in range(4)}
+    histories['S3.TA'] = histories['S3.TA'].iloc[80:]                          # מניה צעירה
+    histories['S2.TA'] = histories['S2.TA'].drop(histories['S2.TA'].index[::7])  # ימים חסרים
+    histories[MARKET] = synthetic_history(200, seed=99)
+    return histories
+
+
+def _bars(histories, day):
+    return pd.DataFrame({symbol: hist.loc[day, list(FIELDS)] for symbol, hist in histories.items()
+                         if day in hist.index}).T
+
+
+def test_from_histories_aligns_on_the_calendar_symbol(panel_inputs):
+    panel = PanelStore.from_histories(panel_inputs, MARKET, capacity=16)
+    assert len(panel) == 200
+    assert panel.calendar.equals(panel_inputs[MARKET].index.tz_localize(None).normalize())
+
+    for symbol, hist in panel_inputs.items():
+        expected = hist['Close'].set_axis(hist.index.tz_localize(None).normalize()).reindex(panel.calendar)
+        np.testing.assert_array_equal(panel.column(symbol), expected.to_numpy())
+        np.testing.assert_array_equal(panel.valid()[:, panel.symbols.index(symbol)], expected.notna())
+        pd.testing.assert_frame_equal(panel.history(symbol), hist[list(FIELDS)].set_axis(expected.dropna().index))
+
+
+def test_field_and_column_are_views(panel_inputs):
+    panel = PanelStore.from_histories(panel_inputs, MARKET)
+    closes = panel.field('Close')
+    assert np.shares_memory(closes, panel.column('S0.TA'))
+    assert np.shares_memory(closes, panel.field('Close', '2025-06-01', '2025-07-01'))
+    assert closes.shape == (len(panel), len(panel.symbols))
+
+    with pytest.raises(ValueError, match='Unknown field'):
+        panel.field('Dividends')
+    with pytest.raises(ValueError, match='Unknown symbol'):
+        panel.column('NONE.TA')
+
+
+def test_append_day_matches_bulk_build(panel_inputs):
+    bulk = PanelStore.from_histories(panel_inputs, MARKET)
+    panel = PanelStore.from_histories({symbol: hist.iloc[:-3] for symbol, hist in panel_inputs.items()}, MARKET)
+    for day in panel_inputs[MARKET].index[-3:]:
+        panel.append_day(day, _bars(panel_inputs, day))
+
+    assert len(panel) == len(bulk)
+    for name in FIELDS:
+        np.testing.assert_array_equal(panel.field(name), bulk.field(name))
+    np.testing.assert_array_equal(panel.valid(), bulk.valid())
+
+
+def test_append_day_replaces_the_same_day_and_rejects_earlier_days(panel_inputs):
+    panel = PanelStore.from_histories(panel_inputs, MARKET)
+    last = panel_inputs[MARKET].index[-1]
+    bars = _bars(panel_inputs, last)
+    bars.loc['S0.TA', 'Close'] = 1.0
+    bars = bars.drop(index='S1.TA')
+
+    row = panel.append_day(last, bars)
+    assert row == len(panel) - 1 == 199
+    assert panel.column('S0.TA')[-1] == 1.0
+    assert not panel.valid()[-1, panel.symbols.index('S1.TA')]
+
+    with pytest.raises(ValueError, match='already ends at'):
+        panel.append_day(panel_inputs[MARKET].index[-2], bars)
+
+
+def test_extend_writes_late_data_and_only_new_days(panel_inputs):
+    late = panel_inputs['S1.TA'].iloc[:-10]                    # הגיעה באיחור בעדכון הקודם
+    first = {symbol: hist.iloc[:-5] for symbol, hist in panel_inputs.items()}
+    first['S1.TA'] = late
+    panel = PanelStore.from_histories(first, MARKET)
+    assert np.isnan(panel.column('S1.TA')[-5:]).all()
+
+    assert panel.extend(panel_inputs) == 5
+    assert panel.extend(panel_inputs) == 0
+    bulk = PanelStore.from_histories(panel_inputs, MARKET)
+    np.testing.assert_array_equal(panel.field('Close'), bulk.field('Close'))
+    np.testing.assert_array_equal(panel.valid(), bulk.valid())
+
+
+def test_extend_replace_rewrites_revised_history(panel_inputs):
+    panel = PanelStore.from_histories(panel_inputs, MARKET)
+    revised = dict(panel_inputs, **{'S0.TA': panel_inputs['S0.TA'].assign(Close=lambda hist: hist['Close'] / 2)})
+
+    panel.extend(revised)
+    assert panel.column('S0.TA')[0] == panel_inputs['S0.TA']['Close'].iloc[0]
+    panel.extend(revised, replace=True)
+    np.testing.assert_allclose(panel.column('S0.TA'), panel_inputs['S0.TA']['Close'].to_numpy() / 2)
+
+
+def test_latest_takes_the_last_valid_row_per_symbol(panel_inputs):
+    histories = dict(panel_inputs, **{'S1.TA': panel_inputs['S1.TA'].iloc[:-4]})
+    panel = PanelStore.from_histories(histories, MARKET)
+    latest = panel.latest(['Close', 'Volume'])
+    assert list(latest.index) == panel.symbols
+    for symbol, hist in histories.items():
+        assert latest.loc[symbol, 'Close'] == hist['Close'].iloc[-1]
+        assert latest.loc[symbol, 'Volume'] == hist['Volume'].iloc[-1]
+
+
+def test_empty_panel():
+    panel = PanelStore(MARKET)
+    assert len(panel) == 0 and panel.symbols == []
+    assert panel.extend({'S0.TA': pd.DataFrame()}) == 0
+    assert panel.field('Close').shape == (0, 0)
+    assert panel.latest().empty
+    values, mask = panel.returns()
+    assert values.shape == mask.shape == (0, 0)
+
+    panel.append_day('2026-01-01', pd.DataFrame({'Close': [10.0]}, index=['S0.TA']))
+    assert panel.symbols == ['S0.TA'] and len(panel) == 1
+    assert panel.latest(['Close']).loc['S0.TA', 'Close'] == 10.0
+    assert np.isnan(panel.latest(['Open']).loc['S0.TA', 'Open'])
+
+
+def test_save_and_load_round_trip(panel_inputs, tmp_path):
+    panel = PanelStore.from_histories(panel_inputs, MARKET)
+    panel.save(tmp_path / 'panel.pickle')
+    loaded = PanelStore.load(tmp_path / 'panel.pickle')
+    assert loaded.symbols == panel.symbols and loaded.calendar_symbol == MARKET
+    np.testing.assert_array_equal(loaded.field('Close'), panel.field('Close'))
+    assert len(PanelStore.load(tmp_path / 'missing.pickle', MARKET)) == 0
+
+
+def test_risk_from_panel_matches_risk_from_histories(panel_inputs):
+    panel = PanelStore.from_histories(panel_inputs, MARKET)
+    stocks = {symbol: hist for symbol, hist in panel_inputs.items() if symbol != MARKET}
+    expected = RiskEngine.from_histories(stocks, panel_inputs[MARKET]).metrics()
+    pd.testing.assert_frame_equal(RiskEngine.from_panel(panel, MARKET).metrics(), expected, check_freq=False)
+    assert list(RiskEngine.from_panel(panel, MARKET, symbols=['S1.TA', 'NONE.TA']).metrics().index) == ['S1.TA']
+
+
+def test_market_breadth_counts_moves_and_averages(panel_inputs):
+    panel = PanelStore.from_histories(panel_inputs, MARKET)
+    breadth = market_breadth(panel, ma_window=20, exclude=[MARKET])
+
+    closes = panel.frame('Close', symbols=[symbol for symbol in panel.symbols if symbol != MARKET])
+    valid = closes.notna() & closes.shift(1).notna()
+    returns = (closes / closes.shift(1) - 1).where(valid).iloc[1:]
+    assert breadth.index.equals(closes.index[1:])
+    np.testing.assert_array_equal(breadth['advancers'], (returns > 0).sum(axis=1))
+    np.testing.assert_array_equal(breadth['decliners'], (returns < 0).sum(axis=1))
+    np.testing.assert_array_equal(breadth['advance_decline_line'],
+                                  ((returns > 0).sum(axis=1) - (returns < 0).sum(axis=1)).cumsum())
+
+    filled = closes.ffill()
+    average = filled.rolling(20).mean()
+    has_average = average.notna() & filled.notna()
+    expected = ((filled > average) & has_average).sum(axis=1) / has_average.sum(axis=1)
+    np.testing.assert_allclose(breadth['pct_above_ma'], expected.iloc[1:].where(has_average.any(axis=1).iloc[1:]))
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers import enhanced_stock_analyzer
+from src.analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+from src.analyzers.pattern_detection import (_valley_pairs, build_pivot_index, find_breakout_runs,
+                                             find_double_bottoms, find_double_tops, find_head_shoulders,
+                                             find_local_extrema, find_price_levels, find_triangles_channels)
+from tests.conftest import synthetic_history
+
+
+def _brute_force_double_bottoms(lows, highs, minima, tolerance, min_separation, min_rebound):
+    found = []
+    for a in range(len(minima)):
+        for b in range(a + 1, len(minima)):
+            start, end = minima[a], minima[b]
+            low, high = sorted((lows[start], lows[end]))
+            if high >= low * (1 + tolerance) or end - start < max(min_separation, 2):
+                continue
+            if lows[start + 1:end].min() > high and highs[start + 1:end].max() >= high * (1 + min_rebound):
+                found.append((int(start), int(end), abs(lows[start] - lows[end]) / low))
+    return sorted(found)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_double_bottoms_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    # מחיר כמעט שטוח - הרבה שפלים בתוך טווח הסבילות
+    lows = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1500)))
+    lows = np.where(rng.random(1500) < 0.5, lows, 100 + rng.normal(0, 1, 1500))
+    highs = lows * (1 + np.abs(rng.normal(0, 0.03, 1500)))
+    minima, _ = find_local_extrema(lows, 3)
+
+    found = find_double_bottoms(lows, highs, minima=minima, tolerance=0.02, min_separation=5, min_rebound=0.03)
+    expected = _brute_force_double_bottoms(lows, highs, minima, 0.02, 5, 0.03)
+    assert [(a, b) for a, b, _ in found] == [(a, b) for a, b, _ in expected]
+    np.testing.assert_allclose([d for *_, d in found], [d for *_, d in expected])
+
+
+def test_valley_pairs_with_equal_prices():
+    first, second = _valley_pairs(np.array([3.0, 5.0, 3.0, 3.0, 4.0, 1.0]))
+    pairs = set(zip(first.tolist(), second.tolist()))
+    assert pairs == {(0, 1), (1, 2), (0, 2), (2, 3), (3, 4), (4, 5), (3, 5)}
+
+
+@pytest.mark.parametrize('bars', [0, 1, 5])
+def test_double_bottoms_on_short_input(bars):
+    assert find_double_bottoms(np.linspace(100, 90, bars)) == []
+
+
+def test_breakout_runs_merge_consecutive_bars_per_column():
+    closes = np.full((60, 2), 100.0)
+    volumes = np.full((60, 2), 1000.0)
+    closes[30:33, 0], volumes[30:33, 0] = 110.0, 5000.0      # רצף של שלושה נרות
+    closes[40, 1], volumes[40, 1] = 110.0, 5000.0            # נר בודד
+    closes[45, 1] = 110.0                                    # בלי נפח - לא פריצה
+
+    columns, starts, ends = find_breakout_runs(closes, volumes, window=20)
+    assert sorted(zip(columns.tolist(), starts.tolist(), ends.tolist())) == [(0, 30, 32), (1, 40, 40)]
+
+
+def test_breakout_runs_on_short_input():
+    columns, starts, ends = find_breakout_runs(np.full(5, 100.0), np.full(5, 1000.0), window=20)
+    assert len(columns) == len(starts) == len(ends) == 0
+
+
+def test_price_levels_do_not_chain_across_a_trend():
+    # מדרגות עולות - כל תנודה כ-1% מעל הקודמת, פחות מהסבילות
+    swing = np.tile(np.concatenate([np.linspace(0, 1, 11)[:-1], np.linspace(1, 0, 11)[:-1]]), 50)
+    trend = 100 * 1.01 ** (np.arange(len(swing)) / 20)
+    highs = trend * (1 + 0.01 * swing)
+    lows = trend * (1 - 0.01 * (1 - swing))
+
+    prices, touches, strength, _ = find_price_levels(highs, lows, order=5, tolerance=0.015)
+    assert len(prices) > 10
+    assert strength.max() == 1.0
+
+    # כל נגיעה שייכת לרמה שבטווח הסבילות ממנה
+    minima, _ = find_local_extrema(lows, 5)
+    _, maxima = find_local_extrema(highs, 5)
+    for price in np.concatenate([lows[minima], highs[maxima]]):
+        assert np.min(np.abs(prices / price - 1)) < 0.015
+
+
+def test_price_levels_merge_touches_of_one_level():
+    lows = 100 + 5 * (1 - np.cos(2 * np.pi * np.arange(130) / 20))
+    prices, touches, _, _ = find_price_levels(lows + 1, lows, order=5)
+    assert prices[0] == pytest.approx(100, rel=0.015)
+    assert touches[0] >= 5
+
+
+def _zigzag(points, step=10):
+    """מחיר ליניארי בקטעים דרך הנקודות, step נרות ביניהן - (highs, lows).
+
+    הנקודה הראשונה והאחרונה הן רק כניסה ויציאה; כל נקודה פנימית היא נקודת מפנה בנר k * step.
+    """
+    path = np.concatenate([np.linspace(a, b, step, endpoint=False) for a, b in zip(points[:-1], points[1:])]
+                          + [[points[-1]]])
+    return path * 1.001, path * 0.999
+
+
+def test_pivot_index_alternates_and_skips_small_swings():
+    highs, lows = _zigzag([80, 100, 99, 101, 90, 110, 100])
+    pivots = build_pivot_index(highs, lows, order=5, min_swing=0.03)
+    # השפל ב-99 קטן מ-min_swing ומדולג; שני השיאים מתאחדים לגבוה מביניהם
+    assert pivots.positions.tolist() == [30, 40, 50]
+    assert pivots.kinds.tolist() == [1, -1, 1]
+    np.testing.assert_allclose(pivots.prices, [101 * 1.001, 90 * 0.999, 110 * 1.001])
+
+
+def test_head_and_shoulders_and_inverse():
+    highs, lows = _zigzag([80, 100, 90, 120, 90, 100, 80])
+    pivots = build_pivot_index(highs, lows)
+    assert find_head_shoulders(pivots) == [("Head and Shoulders", 10, 50, pytest.approx(0.9))]
+    assert find_double_tops(pivots) == []
+
+    highs, lows = _zigzag([120, 100, 110, 80, 110, 100, 120])
+    assert find_head_shoulders(build_pivot_index(highs, lows)) == \
+        [("Inverse Head and Shoulders", 10, 50, pytest.approx(0.9))]
+
+    # כתפיים בגבהים שונים מדי אינן תבנית
+    highs, lows = _zigzag([80, 100, 90, 120, 90, 110, 80])
+    assert find_head_shoulders(build_pivot_index(highs, lows)) == []
+
+
+def test_double_top():
+    highs, lows = _zigzag([80, 100, 90, 100.5, 80])
+    found = find_double_tops(build_pivot_index(highs, lows))
+    assert [(name, start, end) for name, start, end, _ in found] == [("Double Top", 10, 30)]
+    assert 0.6 < found[0][3] < 0.8
+
+    # שפל רדוד מדי בין השיאים
+    highs, lows = _zigzag([80, 100, 98, 100, 80])
+    assert find_double_tops(build_pivot_index(highs, lows, min_swing=0.01)) == []
+
+
+@pytest.mark.parametrize('points, name', [
+    ([95, 80, 100, 85, 100, 90, 100, 95], "Ascending Triangle"),
+    ([90, 100, 80, 95, 80, 90, 80, 85], "Descending Triangle"),
+    ([85, 70, 100, 75, 95, 80, 90, 85], "Symmetrical Triangle"),
+    ([88, 80, 90, 85, 95, 90, 100, 92], "Rising Channel"),
+    ([92, 100, 90, 95, 85, 90, 80, 88], "Falling Channel"),
+    ([90, 80, 100, 80, 100, 80, 100, 90], "Horizontal Channel"),
+])
+def test_triangles_and_channels(points, name):
+    pivots = build_pivot_index(*_zigzag(points))
+    assert len(pivots.positions) == 6
+    assert find_triangles_channels(pivots) == [(name, 10, 60, pytest.approx(0.9))]
+
+
+def test_triangles_require_an_even_window():
+    with pytest.raises(ValueError):
+        find_triangles_channels(build_pivot_index(*_zigzag([80, 100, 90, 80])), size=5)
+
+
+def test_analyzer_builds_the_pivot_index_once_per_data_version(monkeypatch):
+    calls = []
+
+    def counting_build(highs, lows, *args, **kwargs):
+        calls.append(len(highs))
+        return build_pivot_index(highs, lows, *args, **kwargs)
+
+    monkeypatch.setattr(enhanced_stock_analyzer, 'build_pivot_index', counting_build)
+    highs, lows = _zigzag([80, 100, 90, 120, 90, 100, 80])
+    index = pd.bdate_range(end='2026-01-01', periods=len(highs), tz='Asia/Jerusalem')
+    close = (highs + lows) / 2
+    analyzer = EnhancedStockAnalyzer('HS.TA')
+    analyzer.hist = pd.DataFrame({'Open': close, 'High': highs, 'Low': lows, 'Close': close,
+                                  'Volume': 1000.0}, index=index)
+
+    patterns = analyzer.identify_technical_patterns()
+    analyzer.identify_technical_patterns()
+    assert calls == [len(highs)]
+    assert "Head and Shoulders" in {pattern.pattern_type for pattern in patterns}
+
+    analyzer.hist = synthetic_history(300)
+    analyzer.identify_technical_patterns()
+    assert calls == [len(highs), 300]
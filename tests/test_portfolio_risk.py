@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from statistics import NormalDist
+from src.analyzers.portfolio_risk import PortfolioRisk
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(5)
+    mixing = np.array([[1.0, 0.0, 0.0], [0.6, 0.8, 0.0], [-0.3, 0.2, 0.9]])
+    values = rng.normal(0.0005, 0.015, (1500, 3)) @ mixing.T
+    return pd.DataFrame(values, columns=['A', 'B', 'C'])
+
+
+POSITIONS = {'A': 100_000.0, 'B': 50_000.0, 'C': -30_000.0}
+
+
+def test_parametric_var_formula(returns):
+    risk = PortfolioRisk(returns, POSITIONS, confidence=0.99)
+    weights = np.array([POSITIONS[s] for s in returns.columns])
+    sigma = np.sqrt(weights @ returns.cov().to_numpy() @ weights)
+    mean = returns.mean().to_numpy() @ weights
+    z = NormalDist().inv_cdf(0.99)
+    assert risk.parametric()['var'] == pytest.approx(z * sigma - mean)
+
+
+def test_component_var_sums_to_parametric_without_mean(returns):
+    risk = PortfolioRisk(returns, POSITIONS)
+    weights = np.array([POSITIONS[s] for s in returns.columns])
+    sigma = np.sqrt(weights @ returns.cov().to_numpy() @ weights)
+    components = risk.components()
+    assert components['component_var'].sum() == pytest.approx(risk._z * sigma)
+    assert components['contribution'].sum() == pytest.approx(1.0)
+
+
+def test_monte_carlo_close_to_parametric(returns):
+    risk = PortfolioRisk(returns, POSITIONS)
+    parametric = risk.parametric()
+    simulated = risk.monte_carlo(n_paths=200_000, seed=2)
+    assert simulated['var'] == pytest.approx(parametric['var'], rel=0.02)
+    assert simulated['cvar'] == pytest.approx(parametric['cvar'], rel=0.02)
+
+
+def test_set_positions_rejects_unknown_symbols(returns):
+    risk = PortfolioRisk(returns, POSITIONS)
+    with pytest.raises(ValueError):
+        risk.set_positions({'Z': 1.0})
+
+
+def test_historical_var_is_the_empirical_tail(returns):
+    risk = PortfolioRisk(returns, POSITIONS, confidence=0.95)
+    pnl = returns.to_numpy() @ np.array([POSITIONS[s] for s in returns.columns])
+    cutoff = np.percentile(pnl, 5)
+    historical = risk.historical()
+    assert historical['var'] == pytest.approx(-cutoff)
+    assert historical['cvar'] == pytest.approx(-pnl[pnl <= cutoff].mean())
+
+
+def test_historical_var_uses_only_days_with_every_position(returns):
+    short = returns.copy()
+    short.iloc[:1300, 2] = np.nan                               # מניה עם היסטוריה קצרה
+    risk = PortfolioRisk(short, POSITIONS)
+    expected = PortfolioRisk(returns.iloc[1300:], POSITIONS).historical()
+    assert risk.historical() == pytest.approx(expected)
+
+    # פוזיציה אפס במניה הקצרה לא מקצרת את ההיסטוריה
+    flat = {'A': 100_000.0, 'B': 50_000.0}
+    assert risk.historical() != pytest.approx(PortfolioRisk(short, flat).historical())
+    assert PortfolioRisk(short, flat).historical() == pytest.approx(PortfolioRisk(returns, flat).historical())
+
+    short.iloc[:1490, 2] = np.nan
+    with pytest.raises(ValueError, match='Not enough days'):
+        PortfolioRisk(short, POSITIONS).historical()
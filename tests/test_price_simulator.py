@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from src.analyzers.price_simulator import SIMULATION_METHODS, _bootstrap_chunk, _gbm_chunk, simulate_prices
+
+
+@pytest.mark.parametrize('method', SIMULATION_METHODS)
+def test_seeded_simulation_is_reproducible(history, method):
+    first = simulate_prices(history['Close'], horizon=10, n_paths=2000, method=method, seed=7, chunk_size=300)
+    second = simulate_prices(history['Close'], horizon=10, n_paths=2000, method=method, seed=7, chunk_size=300)
+    np.testing.assert_array_equal(first.bands.to_numpy(), second.bands.to_numpy())
+
+
+@pytest.mark.parametrize('method', SIMULATION_METHODS)
+def test_bands_shape_and_ordering(history, method):
+    result = simulate_prices(history['Close'], horizon=15, n_paths=3000, method=method,
+                             quantiles=[0.05, 0.95], seed=1)
+    assert result.horizon == 15
+    # החציון תמיד נוסף לרצועות
+    assert list(result.bands.columns) == [0.05, 0.5, 0.95]
+    assert list(result.bands.index) == list(range(1, 16))
+    assert result.last_price == pytest.approx(history['Close'].iloc[-1])
+    values = result.bands.to_numpy()
+    assert np.all(np.diff(values, axis=1) >= 0)
+    # פיזור הרצועה גדל עם האופק
+    spread = result.band(15, 0.95) - result.band(15, 0.05)
+    assert spread > result.band(1, 0.95) - result.band(1, 0.05)
+
+
+def test_gbm_median_tracks_drift(history):
+    closes = history['Close']
+    log_returns = np.diff(np.log(closes.to_numpy()))
+    result = simulate_prices(closes, horizon=20, n_paths=20000, method='gbm', seed=3)
+    expected = closes.iloc[-1] * np.exp(20 * log_returns.mean())
+    assert result.band(20, 0.5) == pytest.approx(expected, rel=0.01)
+
+
+def test_rejects_unknown_method_and_short_history(history):
+    with pytest.raises(ValueError):
+        simulate_prices(history['Close'], method='heston')
+    with pytest.raises(ValueError):
+        simulate_prices(history['Close'].iloc[:2], n_paths=10)
+
+
+@pytest.mark.parametrize('method', SIMULATION_METHODS)
+def test_histogram_bands_match_exact_path_quantiles(history, method):
+    closes = history['Close']
+    quantiles = [0.05, 0.25, 0.5, 0.75, 0.95]
+    result = simulate_prices(closes, horizon=10, n_paths=5000, method=method, quantiles=quantiles,
+                             seed=11, chunk_size=1000)
+
+    # אותם מסלולים, נשמרים במלואם
+    log_returns = np.diff(np.log(closes.to_numpy()))
+    rng = np.random.default_rng(11)
+    chunks = [_gbm_chunk(log_returns, 1000, 10, rng) if method == 'gbm'
+              else _bootstrap_chunk(log_returns, 1000, 10, rng, block_size=5) for _ in range(5)]
+    cumulative = np.cumsum(np.concatenate(chunks), axis=1)
+    expected = closes.iloc[-1] * np.exp(np.quantile(cumulative, quantiles, axis=0).T)
+    np.testing.assert_allclose(result.bands.to_numpy(), expected, rtol=2e-3)
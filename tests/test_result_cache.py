@@ -0,0 +1,53 @@
+import pandas as pd
+from src.utils.result_cache import ResultCache, data_fingerprint, memoize_on_bars
+from tests.conftest import synthetic_history
+
+
+def test_fingerprint_tracks_new_and_corrected_bars(history):
+    fingerprint = data_fingerprint(history)
+    assert data_fingerprint(history.copy()) == fingerprint
+    assert data_fingerprint(history.iloc[:-1]) != fingerprint
+
+    corrected = history.copy()
+    corrected.iloc[-1, corrected.columns.get_loc('Close')] += 1
+    assert data_fingerprint(corrected) != fingerprint
+
+
+def test_fingerprint_ignores_indicator_columns(history):
+    with_indicator = history.assign(RSI=50.0)
+    assert data_fingerprint(with_indicator) == data_fingerprint(history)
+
+
+def test_fingerprint_of_empty_bars():
+    assert data_fingerprint(None) is None
+    assert data_fingerprint(synthetic_history(5).iloc[:0]) is None
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(max_items=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+
+
+class _Holder:
+    def __init__(self, hist: pd.DataFrame):
+        self.hist = hist
+        self.calls = 0
+
+    @memoize_on_bars('hist')
+    def compute(self):
+        self.calls += 1
+        return {'last': float(self.hist['Close'].iloc[-1])}
+
+
+def test_memoize_on_bars_reuses_result_for_same_bars(history):
+    first, second = _Holder(history), _Holder(history.copy())
+    assert first.compute() == second.compute()
+    assert first.calls + second.calls == 1
+
+    second.hist = history.iloc[:-1]
+    second.compute()
+    assert second.calls == 1
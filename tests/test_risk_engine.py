@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers.risk_engine import BENCHMARK, TRADING_DAYS_PER_YEAR, RiskEngine
+from tests.conftest import synthetic_history
+
+
+@pytest.fixture
+def engine_inputs():
+    histories = {f'S{i}.TA': synthetic_history(400, seed=i) for i in range(6)}
+    histories['S3.TA'] = histories['S3.TA'].iloc[150:]                       # מניה צעירה
+    histories['S4.TA'] = histories['S4.TA'].drop(histories['S4.TA'].index[::9])  # ימים חסרים
+    return histories, synthetic_history(400, seed=99)
+
+
+def test_metrics_match_pairwise_pandas(engine_inputs):
+    histories, benchmark = engine_inputs
+    engine = RiskEngine.from_histories(histories, benchmark, risk_free_rate=0.0)
+    metrics = engine.metrics()
+
+    returns = engine.returns
+    for symbol in histories:
+        pair = returns[[symbol, BENCHMARK]].dropna()
+        beta = pair[symbol].cov(pair[BENCHMARK]) / pair[BENCHMARK].var()
+        assert metrics.loc[symbol, 'beta'] == pytest.approx(beta, rel=1e-9)
+
+        own = returns[symbol].dropna()
+        assert metrics.loc[symbol, 'volatility'] == pytest.approx(own.std() * np.sqrt(TRADING_DAYS_PER_YEAR))
+        assert metrics.loc[symbol, 'sharpe'] == pytest.approx(np.sqrt(TRADING_DAYS_PER_YEAR) * own.mean() / own.std())
+        assert metrics.loc[symbol, 'observations'] == len(own)
+
+
+def test_covariance_and_correlation_match_pandas(engine_inputs):
+    histories, benchmark = engine_inputs
+    engine = RiskEngine.from_histories(histories, benchmark)
+    np.testing.assert_allclose(engine.covariance(), engine.returns.cov(), rtol=1e-9, atol=1e-15)
+    np.testing.assert_allclose(engine.correlation(), engine.returns.corr(), rtol=1e-9)
+
+
+def test_short_history_gives_nan_metrics():
+    benchmark = synthetic_history(10, seed=99)
+    engine = RiskEngine.from_histories({'A.TA': synthetic_history(1, seed=1), 'B.TA': synthetic_history(10)},
+                                       benchmark)
+    metrics = engine.metrics()
+    assert metrics[['beta', 'sharpe', 'volatility']].isna().all().all()
+    assert metrics.loc['A.TA', 'observations'] == 0
+
+
+def test_rolling_risk_matches_pandas_rolling(engine_inputs):
+    histories, benchmark = engine_inputs
+    engine = RiskEngine.from_histories(histories, benchmark, risk_free_rate=0.0)
+    window = 30
+    rolling = engine.rolling_metrics('S4.TA', window)
+
+    returns, market = engine.returns['S4.TA'], engine.returns[BENCHMARK]
+    beta = returns.rolling(window).cov(market) / market.rolling(window).var()
+    volatility = returns.rolling(window).std() * np.sqrt(TRADING_DAYS_PER_YEAR)
+    wealth = (1 + returns.fillna(0)).cumprod()
+    drawdown = pd.Series([
+        (wealth.iloc[end - window:end + 1] / wealth.iloc[end - window:end + 1].cummax() - 1).min()
+        if end >= window else np.nan for end in range(len(wealth))], index=wealth.index)
+    drawdown[returns.rolling(window).count() < window] = np.nan
+
+    np.testing.assert_allclose(rolling['beta'], beta, rtol=1e-6, atol=1e-10)
+    np.testing.assert_allclose(rolling['volatility'], volatility, rtol=1e-6)
+    np.testing.assert_allclose(rolling['var_95'], returns.rolling(window).quantile(0.05))
+    # חלון מלא ראשון: הדרודאון כולל את ערך הפתיחה שלפניו
+    np.testing.assert_allclose(rolling['max_drawdown'].iloc[window:], drawdown.iloc[window:], rtol=1e-9)
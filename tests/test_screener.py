@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+from src.analyzers.screener import Screener, compile_query, parse_sort
+from tests.conftest import synthetic_history
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(4)
+    frame = pd.DataFrame({
+        'RSI': rng.uniform(10, 90, 60),
+        'ADX': rng.uniform(5, 50, 60),
+        'close': rng.uniform(50, 150, 60),
+        'score': rng.uniform(0, 1, 60)
+    }, index=[f'S{i}.TA' for i in range(60)])
+    frame.iloc[::7, 3] = np.nan
+    return frame
+
+
+@pytest.fixture
+def screener(frame):
+    screener = Screener(capacity=4)
+    screener.update_columns(frame)
+    return screener
+
+
+def _evaluate(expression, **columns):
+    node, _ = compile_query(expression)
+    return node({name: np.asarray(value, dtype=float) for name, value in columns.items()})
+
+
+def test_operator_precedence():
+    assert _evaluate('1 + 2 * 3 == 7')
+    assert _evaluate('(1 + 2) * 3 == 9')
+    assert _evaluate('8 / 4 / 2 == 1')
+    assert _evaluate('10 - 4 - 3 == 3')
+    # and קושר חזק יותר מ-or
+    assert _evaluate('1 > 2 and 1 > 2 or 1 < 2')
+    assert not _evaluate('1 > 2 and (1 > 2 or 1 < 2)')
+
+
+def test_not_and_unary_minus():
+    assert _evaluate('not 1 > 2')
+    assert _evaluate('not not 1 < 2')
+    assert _evaluate('-2 * -3 == 6')
+    assert _evaluate('- x < 0', x=[5.0]).all()
+    assert _evaluate('2 - -x == 5', x=[3.0]).all()
+
+
+def test_compile_query_reports_column_names():
+    _, names = compile_query('RSI < 30 and (ADX > RSI or close > 10)')
+    assert names == ('RSI', 'ADX', 'close')
+
+
+@pytest.mark.parametrize('expression, message', [
+    ('RSI <', 'Unexpected end of query'),
+    ('(RSI < 30', 'Missing closing parenthesis'),
+    ('RSI < 30 30', 'Unexpected token'),
+    ('RSI $ 30', 'Invalid query'),
+])
+def test_malformed_queries_raise(expression, message):
+    with pytest.raises(ValueError, match=message):
+        compile_query(expression)
+
+
+def test_parse_sort():
+    assert parse_sort('score desc, RSI') == [('score', True), ('RSI', False)]
+    assert parse_sort('-score,ADX asc') == [('score', True), ('ADX', False)]
+    assert parse_sort(None) == []
+    with pytest.raises(ValueError):
+        parse_sort('score sideways')
+
+
+def test_query_matches_pandas(screener, frame):
+    result = screener.query('RSI < 50 and (ADX > 25 or close / 2 > 60)', '-score, RSI', 10)
+    mask = (frame['RSI'] < 50) & ((frame['ADX'] > 25) | (frame['close'] / 2 > 60))
+    expected = frame[mask].sort_values(['score', 'RSI'], ascending=[False, True], na_position='last').head(10)
+    assert list(result.index) == list(expected.index)
+    pd.testing.assert_frame_equal(result[frame.columns], expected, check_names=False)
+
+
+def test_nan_never_passes_a_filter(screener, frame):
+    assert set(screener.query('score >= 0').index) == set(frame.index[frame['score'].notna()])
+    assert set(screener.query('not score >= 0').index) == set(frame.index[frame['score'].isna()])
+
+
+def test_unknown_columns_raise(screener):
+    with pytest.raises(ValueError, match='Unknown columns'):
+        screener.query('PE < 10')
+    with pytest.raises(ValueError, match='Unknown sort columns'):
+        screener.query(sort='PE')
+    with pytest.raises(ValueError, match='Unknown columns'):
+        screener.query(columns=['RSI', 'PE'])
+
+
+def test_upsert_and_remove(screener, frame):
+    assert screener.upsert('NEW.TA', {'RSI': 20.0, 'score': None}, fingerprint=(1,))
+    assert not screener.upsert('NEW.TA', {'RSI': 99.0}, fingerprint=(1,))
+    row = screener.query('RSI == 20').loc['NEW.TA']
+    assert np.isnan(row['score']) and np.isnan(row['ADX'])
+
+    screener.remove('S0.TA')
+    screener.remove('NEW.TA')
+    assert len(screener) == len(frame) - 1
+    assert set(screener.symbols) == set(frame.index[1:])
+    pd.testing.assert_frame_equal(screener.query().loc[frame.index[1:], frame.columns], frame.iloc[1:],
+                                  check_names=False)
+
+
+def test_refresh_adds_fundamentals_and_tracks_their_changes():
+    analyzers = []
+    for i, pe_ratio in enumerate([8.0, 30.0]):
+        analyzer = EnhancedStockAnalyzer(f'S{i}.TA')
+        analyzer.hist = synthetic_history(120, seed=i)
+        analyzer.fundamental_metrics = {'pe_ratio': pe_ratio, 'fundamental_score': 0.5}
+        analyzers.append(analyzer)
+
+    screener = Screener()
+    assert screener.refresh(analyzers) == 2
+    assert list(screener.query('pe_ratio < 15 and RSI >= 0').index) == ['S0.TA']
+    assert screener.refresh(analyzers) == 0
+
+    analyzers[1].fundamental_metrics = {'pe_ratio': 12.0, 'fundamental_score': 0.7}
+    assert screener.refresh(analyzers) == 1
+    assert list(screener.query('pe_ratio < 15', sort='pe_ratio').index) == ['S0.TA', 'S1.TA']
@@ -0,0 +1,60 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers import enhanced_stock_analyzer, sector_index
+from src.analyzers.enhanced_stock_analyzer import EnhancedStockAnalyzer
+from src.analyzers.sector_index import SectorIndex
+
+SECTORS = {f'S{i}.TA': 'Banks' if i % 2 else 'Tech' for i in range(8)}
+
+
+@pytest.fixture
+def index(histories):
+    index = SectorIndex(weighting='equal')
+    index.set_constituents(SECTORS)
+    index.update(histories)
+    return index
+
+
+def test_equal_weighted_levels_chain_mean_returns(index, histories):
+    members = [symbol for symbol, sector in SECTORS.items() if sector == 'Tech']
+    closes = pd.DataFrame({symbol: histories[symbol]['Close'] for symbol in members})
+    returns = closes.pct_change().iloc[1:].mean(axis=1)
+    expected = 100 * (1 + returns).cumprod()
+    # היום הראשון בלי תשואה - המדד מתחיל מרמת הבסיס כפול התשואה הראשונה
+    np.testing.assert_allclose(index.index('Tech').to_numpy(), expected.to_numpy())
+
+
+def test_update_appends_only_new_days(histories):
+    index = SectorIndex(weighting='equal')
+    index.set_constituents(SECTORS)
+    index.update({symbol: hist.iloc[:-20] for symbol, hist in histories.items()})
+    assert index.update(histories) == 20
+
+    full = SectorIndex(weighting='equal')
+    full.set_constituents(SECTORS)
+    full.update(histories)
+    pd.testing.assert_frame_equal(index.levels, full.levels)
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.save(tmp_path / 'sectors.pickle')
+    loaded = SectorIndex.load(tmp_path / 'sectors.pickle')
+    assert loaded.sectors == index.sectors
+    pd.testing.assert_frame_equal(loaded.levels, index.levels)
+
+
+def test_fetch_sector_data_uses_the_index_without_network(index, histories, monkeypatch):
+    def no_network(*args, **kwargs):
+        raise AssertionError("network access")
+
+    monkeypatch.setattr(enhanced_stock_analyzer.yf, 'Ticker', no_network)
+    monkeypatch.setattr(sector_index, 'sector_index', index)
+    analyzer = EnhancedStockAnalyzer('S3.TA')
+    analyzer.hist = histories['S3.TA']
+    asyncio.run(analyzer.fetch_sector_data())
+
+    assert analyzer.sector_comparison['sector'] == 'Banks'
+    assert np.isfinite(analyzer.sector_comparison['beta'])
+    pd.testing.assert_series_equal(analyzer.sector_data, index.index('Banks'))
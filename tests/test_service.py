@@ -0,0 +1,158 @@
+import asyncio
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from src.config.settings import ANALYSIS_SETTINGS
+from src.service import CHART_COLUMNS, AnalysisService, create_app
+from src.utils.financial_store import FinancialStatementsStore
+from src.utils.service_client import ServiceClient, chart_frame, simulation_bands, trim_to_period
+from tests.conftest import synthetic_history, synthetic_statements
+
+SYMBOLS = ['S0.TA', 'S1.TA', 'S2.TA']
+
+
+class Loader:
+    """היסטוריות סינתטיות במקום yfinance, עם ספירת משיכות"""
+
+    def __init__(self):
+        self.histories = {symbol: synthetic_history(300, seed=i) for i, symbol in enumerate(SYMBOLS)}
+        self.histories[ANALYSIS_SETTINGS['risk']['beta_market_index']] = synthetic_history(300, seed=99)
+        self.calls = []
+
+    def __call__(self, symbol, period):
+        self.calls.append(symbol)
+        return self.histories.get(symbol, pd.DataFrame())
+
+
+@pytest.fixture(autouse=True)
+def small_simulation(monkeypatch):
+    monkeypatch.setitem(ANALYSIS_SETTINGS['simulation'], 'n_paths', 2000)
+
+
+def _run(test):
+    """הרצת בדיקה מול שרת בדיקות של aiohttp, עם מאגר דוחות סינתטי בתיקייה זמנית"""
+    async def main(directory):
+        loader = Loader()
+        financials = FinancialStatementsStore(Path(directory) / 'statements.pickle', synthetic_statements)
+        service = AnalysisService(loader=loader, financials=financials)
+        async with TestClient(TestServer(create_app(service))) as client:
+            await test(client, loader)
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(main(directory))
+
+
+def test_analyze_endpoint_is_cached_per_data_version():
+    async def test(client, loader):
+        response = await client.get('/analyze/S1.TA')
+        assert response.status == 200
+        result = await response.json()
+        assert result['symbol'] == 'S1.TA'
+        assert result['last_close'] == pytest.approx(loader.histories['S1.TA']['Close'].iloc[-1])
+        assert result['score']['המלצה']
+        assert {'pe_ratio', 'current_ratio', 'fundamental_score'} <= set(result['fundamental_metrics'])
+        assert set(result['chart']) == {'date', *CHART_COLUMNS}
+        assert len(result['chart']['date']) == 300
+
+        again = await (await client.get('/analyze/S1.TA')).json()
+        assert again == result
+        assert loader.calls.count('S1.TA') == 1
+        status = await (await client.get('/health')).json()
+        assert status['symbols'] == ['S1.TA'] and status['cache_hits'] >= 1
+
+        missing = await client.get('/analyze/NONE.TA')
+        assert missing.status == 400
+        assert 'No data' in (await missing.json())['error']
+    _run(test)
+
+
+def test_screen_endpoint_queries_analyzed_symbols():
+    async def test(client, loader):
+        for symbol in SYMBOLS:
+            assert (await client.get(f'/analyze/{symbol}')).status == 200
+
+        result = await (await client.get('/screen', params={'sort': '-score', 'limit': '2'})).json()
+        assert result['count'] == 2
+        scores = [row['score'] for row in result['rows']]
+        assert scores == sorted(scores, reverse=True)
+
+        everything = await (await client.get('/screen', params={'where': 'RSI >= 0'})).json()
+        rsi = {row['symbol']: row['RSI'] for row in everything['rows']}
+        assert set(rsi) == set(SYMBOLS)
+
+        fundamentals = await (await client.get('/screen', params={'where': 'fundamental_score >= 0'})).json()
+        assert fundamentals['count'] == len(SYMBOLS)
+
+        bad = await client.get('/screen', params={'where': 'PE < 10'})
+        assert bad.status == 400
+        assert 'Unknown columns' in (await bad.json())['error']
+    _run(test)
+
+
+def test_panel_feeds_screener_prices_and_breadth():
+    async def test(client, loader):
+        empty = await (await client.get('/breadth')).json()
+        assert empty == {'date': []}
+        for symbol in SYMBOLS:
+            assert (await client.get(f'/analyze/{symbol}')).status == 200
+
+        rows = (await (await client.get('/screen', params={'where': 'volume > 0'})).json())['rows']
+        assert {row['symbol']: row['high'] for row in rows} == \
+            {symbol: pytest.approx(loader.histories[symbol]['High'].iloc[-1]) for symbol in SYMBOLS}
+
+        service = ServiceClient(base_url=str(client.make_url('')))
+        breadth = await asyncio.to_thread(service.breadth, 5)
+        assert len(breadth['date']) == 5
+        assert all(up + down + flat == len(SYMBOLS) for up, down, flat in
+                   zip(breadth['advancers'], breadth['decliners'], breadth['unchanged']))
+    _run(test)
+
+
+def test_bad_requests_are_rejected_with_400():
+    async def test(client, loader):
+        added = await client.post('/alerts/S1.TA', json={'target_price': 1000, 'condition': 'below'})
+        assert added.status == 200 and (await added.json())['alerts'] == 1
+
+        bad_alerts = [{'condition': 'above'}, {'target_price': None}, {'target_price': 'abc'},
+                      {'target_price': [1]}, {'target_price': -5}, {'target_price': 10, 'condition': 'near'}, [10]]
+        for body in bad_alerts:
+            assert (await client.post('/alerts/S1.TA', json=body)).status == 400, body
+        malformed = await client.post('/alerts/S1.TA', data='{"target_price": ',
+                                      headers={'Content-Type': 'application/json'})
+        assert malformed.status == 400
+        assert 'valid JSON' in (await malformed.json())['error']
+
+        for path, name in (('/screen', 'limit'), ('/breadth', 'days')):
+            negative = await client.get(path, params={name: '-1'})
+            assert negative.status == 400
+            assert 'non-negative' in (await negative.json())['error']
+            assert (await client.get(path, params={name: 'x'})).status == 400
+    _run(test)
+
+
+def test_service_client_decodes_the_analysis():
+    async def test(client, loader):
+        service = ServiceClient(base_url=str(client.make_url('')))
+        assert await asyncio.to_thread(service.is_available)
+        result = await asyncio.to_thread(service.analyze, 'S2.TA')
+
+        chart = chart_frame(result)
+        history = loader.histories['S2.TA']
+        assert list(chart.columns) == CHART_COLUMNS
+        np.testing.assert_allclose(chart['Close'], history['Close'])
+        assert list(chart.index) == list(history.index.tz_localize(None))
+        assert len(trim_to_period(chart, '3mo')) < len(chart) == len(trim_to_period(chart, 'max'))
+
+        bands = simulation_bands(result)
+        assert bands.index[0] == 1 and 0.5 in bands.columns
+        assert np.all(np.diff(bands.to_numpy(), axis=1) >= 0)
+
+        with pytest.raises(ValueError):
+            await asyncio.to_thread(service.screen, 'RSI <')
+    _run(test)
+
+
+def test_service_client_reports_unavailable():
+    assert not ServiceClient(base_url='http://127.0.0.1:9', timeout=1).is_available()
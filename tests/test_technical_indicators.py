@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analyzers.technical_indicators import TechnicalIndicators
+
+
+def test_rsi_sweep_matches_single_period(history):
+    close = history['Close']
+    sweep = TechnicalIndicators.RSI_sweep(close, [7, 14, 21])
+    for period in (7, 14, 21):
+        single = TechnicalIndicators.RSI(close, period)
+        np.testing.assert_allclose(sweep[period].to_numpy(), single.to_numpy(), rtol=1e-12, equal_nan=True)
+
+
+def test_bbands_sweep_matches_single_period(history):
+    close = history['Close']
+    upper, middle, lower = TechnicalIndicators.BBANDS_sweep(close, [10, 20], [2, 3])
+    for period in (10, 20):
+        for num_std in (2, 3):
+            single_upper, single_middle, single_lower = TechnicalIndicators.BBANDS(close, period, num_std)
+            np.testing.assert_allclose(upper[(period, num_std)], single_upper, rtol=1e-9, equal_nan=True)
+            np.testing.assert_allclose(lower[(period, num_std)], single_lower, rtol=1e-9, equal_nan=True)
+        np.testing.assert_allclose(middle[period], single_middle, rtol=1e-9, equal_nan=True)
+
+
+def test_bbands_sweep_rejects_period_below_two(history):
+    with pytest.raises(ValueError):
+        TechnicalIndicators.BBANDS_sweep(history['Close'], [1, 20])
+
+
+def test_macd_sweep_matches_single_setting(history):
+    close = history['Close']
+    macd, signal, histogram = TechnicalIndicators.MACD_sweep(close, [8, 12], [26], [9])
+    for fast in (8, 12):
+        single_macd, single_signal, single_histogram = TechnicalIndicators.MACD(close, fast, 26, 9)
+        np.testing.assert_allclose(macd[(fast, 26)], single_macd, rtol=1e-12)
+        np.testing.assert_allclose(signal[(fast, 26, 9)], single_signal, rtol=1e-12)
+        np.testing.assert_allclose(histogram[(fast, 26, 9)], single_histogram, rtol=1e-9, atol=1e-9)
+
+
+def test_sweeps_on_empty_and_single_bar():
+    for bars in (0, 1):
+        close = pd.Series(np.full(bars, 100.0), index=pd.bdate_range('2026-01-01', periods=bars))
+        assert TechnicalIndicators.RSI_sweep(close, [14]).shape == (max(bars - 1, 0), 1)
+        upper, middle, _ = TechnicalIndicators.BBANDS_sweep(close, [20], [2])
+        assert upper.shape == (bars, 1) and middle.isna().all().all()
+        macd, _, _ = TechnicalIndicators.MACD_sweep(close, [12], [26], [9])
+        assert macd.shape == (bars, 1)
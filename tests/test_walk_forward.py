@@ -0,0 +1,56 @@
+import json
+import numpy as np
+import pytest
+from src.analyzers.backtester import run_backtest
+from src.analyzers.walk_forward import (COMPONENTS, _evaluate_block, candidate_grid, load_tuned_settings,
+                                        optimize_scoring, prepare_inputs, save_tuned_settings)
+from src.config.settings import ANALYSIS_SETTINGS
+
+
+def test_evaluate_block_matches_run_backtest(histories):
+    inputs = prepare_inputs(histories)
+    candidates = candidate_grid(weight_step=0.5, buy_thresholds=[0.55], sell_thresholds=[0.4])
+    grid = candidates[COMPONENTS + ['buy', 'weak_sell']].to_numpy(dtype=float)
+    start, end = np.datetime64('1900-01-01'), np.datetime64('2100-01-01')
+    sharpe, total = _evaluate_block(inputs, grid, start, end, cost=0.001, allow_short=False)
+
+    for k, row in enumerate(grid):
+        weights = dict(zip(COMPONENTS, row[:4]))
+        thresholds = {'strong_buy': 2.0, 'buy': row[4], 'sell': -1.0, 'weak_sell': row[5]}
+        results = [run_backtest(bars, weights=weights, thresholds=thresholds, cost_bps=10, slippage_bps=0,
+                                allow_short=False) for bars in histories.values()]
+        expected_return = np.mean([result.stats['total_return'] for result in results])
+        expected_sharpe = np.mean([np.nan_to_num(result.stats['sharpe']) for result in results])
+        assert total[k] == pytest.approx(expected_return)
+        assert sharpe[k] == pytest.approx(expected_sharpe)
+
+
+def test_optimize_scoring_picks_a_candidate_per_fold(histories):
+    candidates = candidate_grid(weight_step=0.5)
+    result = optimize_scoring(histories, candidates, workers=1, train_bars=120, test_bars=60)
+    assert len(result.folds) == (300 - 120) // 60
+    assert result.folds['test_start'].is_monotonic_increasing
+    assert sum(result.tuned['weights'].values()) == pytest.approx(1.0)
+    assert result.tuned['thresholds']['weak_sell'] < result.tuned['thresholds']['buy']
+
+
+def test_optimize_scoring_needs_a_full_fold(histories):
+    with pytest.raises(ValueError):
+        optimize_scoring(histories, candidate_grid(weight_step=0.5), workers=1, train_bars=300, test_bars=60)
+
+
+def test_tuned_settings_round_trip(tmp_path, monkeypatch):
+    scoring = {'weights': {'technical': 0.4, 'momentum': 0.2, 'advanced': 0.2, 'sentiment': 0.2},
+               'thresholds': {'strong_buy': 0.7, 'buy': 0.55, 'weak_sell': 0.45, 'sell': 0.3}}
+    path = tmp_path / 'tuned.json'
+    save_tuned_settings(scoring, path)
+    assert json.loads(path.read_text(encoding='utf-8')) == {'scoring': scoring}
+
+    original = {key: dict(value) for key, value in ANALYSIS_SETTINGS['scoring'].items()}
+    try:
+        assert load_tuned_settings(path)
+        assert ANALYSIS_SETTINGS['scoring'] == scoring
+    finally:
+        for key, value in original.items():
+            ANALYSIS_SETTINGS['scoring'][key] = value
+    assert not load_tuned_settings(tmp_path / 'missing.json')